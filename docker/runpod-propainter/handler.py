@@ -25,18 +25,24 @@ Output format:
 }
 """
 
+import hashlib
+import json
 import os
 import shutil
 import subprocess
 import sys
 import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
 import requests
 import runpod
 
+TRANSFER_CONCURRENCY = int(os.environ.get("TRANSFER_CONCURRENCY", "8"))
+TRANSFER_PART_SIZE = int(os.environ.get("TRANSFER_PART_SIZE_MB", "16")) * 1024 * 1024
+
 # ProPainter installation path (baked into Docker image)
 PROPAINTER_PATH = Path("/app/propainter")
 
@@ -111,23 +117,76 @@ def get_memory_profile(vram_gb: int) -> dict:
     return MEMORY_PROFILES[8].copy()
 
 
+def file_sha256(file_path) -> str:
+    """SHA-256 of a file, stored as R2 metadata to verify transfers."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _download_ranges(url: str, output_path: str, size: int) -> None:
+    """Fetch a file as parallel byte ranges written straight into place."""
+    ranges = [(start, min(start + TRANSFER_PART_SIZE, size) - 1) for start in range(0, size, TRANSFER_PART_SIZE)]
+    with open(output_path, "wb") as f:
+        f.truncate(size)
+
+    def fetch(byte_range: tuple[int, int]) -> None:
+        start, end = byte_range
+        response = requests.get(url, headers={"Range": f"bytes={start}-{end}"}, stream=True, timeout=300)
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise IOError("Server ignored range request")
+        written = 0
+        with open(output_path, "r+b") as f:
+            f.seek(start)
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                f.write(chunk)
+                written += len(chunk)
+        if written != end - start + 1:
+            raise IOError(f"Short read for bytes {start}-{end}")
+
+    log(f"  {len(ranges)} parts over {min(TRANSFER_CONCURRENCY, len(ranges))} connections")
+    with ThreadPoolExecutor(max_workers=TRANSFER_CONCURRENCY) as pool:
+        list(pool.map(fetch, ranges))
+
+
 def download_file(url: str, output_path: str, description: str = "file") -> bool:
-    """Download file from URL with progress logging."""
+    """Download file from URL, in parallel ranges when it is large.
+
+    Inputs uploaded by the toolkit carry a sha256 in their R2 metadata, which is
+    checked after the download.
+    """
     try:
         log(f"Downloading {description} from {url[:80]}...")
-        response = requests.get(url, stream=True, timeout=300)
-        response.raise_for_status()
+        probe = requests.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=300)
+        probe.raise_for_status()
+        probe.close()
 
-        total_size = int(response.headers.get('content-length', 0))
-        downloaded = 0
+        total = probe.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+        expected_sha256 = probe.headers.get("x-amz-meta-sha256")
 
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-                downloaded += len(chunk)
-                if total_size > 0 and downloaded % (1024 * 1024) == 0:
-                    pct = (downloaded / total_size) * 100
-                    log(f"  Downloaded {downloaded // (1024*1024)}MB ({pct:.0f}%)")
+        if probe.status_code == 206 and total.isdigit() and int(total) > TRANSFER_PART_SIZE:
+            _download_ranges(url, output_path, int(total))
+        else:
+            response = requests.get(url, stream=True, timeout=300)
+            response.raise_for_status()
+
+            total_size = int(response.headers.get('content-length', 0))
+            downloaded = 0
+
+            with open(output_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    if total_size > 0 and downloaded % (10 * 1024 * 1024) == 0:
+                        pct = (downloaded / total_size) * 100
+                        log(f"  Downloaded {downloaded // (1024*1024)}MB ({pct:.0f}%)")
+
+        if expected_sha256 and file_sha256(output_path) != expected_sha256:
+            log(f"Error downloading {description}: SHA-256 mismatch")
+            return False
 
         log(f"  Downloaded {description}: {Path(output_path).stat().st_size // (1024*1024)}MB")
         return True
@@ -136,10 +195,16 @@ def download_file(url: str, output_path: str, description: str = "file") -> bool
         return False
 
 
-def upload_to_r2(file_path: str, job_id: str, r2_config: dict) -> tuple[Optional[str], Optional[str]]:
-    """Upload file to Cloudflare R2 and return (presigned_url, object_key)."""
+def upload_to_r2(
+    file_path: str, job_id: str, r2_config: dict, metadata: Optional[dict] = None
+) -> tuple[Optional[str], Optional[str]]:
+    """Upload file to Cloudflare R2 and return (presigned_url, object_key).
+
+    ``metadata`` is stored on the object next to its sha256.
+    """
     try:
         import boto3
+        from boto3.s3.transfer import TransferConfig
         from botocore.config import Config
         import uuid
 
@@ -153,9 +218,19 @@ def upload_to_r2(file_path: str, job_id: str, r2_config: dict) -> tuple[Optional
             config=Config(signature_version="s3v4"),
         )
 
-        object_key = f"dewatermark/results/{job_id}_{uuid.uuid4().hex[:8]}.mp4"
-
-        client.upload_file(file_path, r2_config["bucket_name"], object_key)
+        object_key = r2_config.get("output_key") or f"dewatermark/results/{job_id}_{uuid.uuid4().hex[:8]}.mp4"
+
+        client.upload_file(
+            file_path,
+            r2_config["bucket_name"],
+            object_key,
+            ExtraArgs={"ContentType": "video/mp4", "Metadata": {**(metadata or {}), "sha256": file_sha256(file_path)}},
+            Config=TransferConfig(
+                multipart_threshold=TRANSFER_PART_SIZE,
+                multipart_chunksize=TRANSFER_PART_SIZE,
+                max_concurrency=TRANSFER_CONCURRENCY,
+            ),
+        )
 
         # Generate presigned URL (valid for 2 hours)
         presigned_url = client.generate_presigned_url(
@@ -174,7 +249,7 @@ def upload_to_r2(file_path: str, job_id: str, r2_config: dict) -> tuple[Optional
         return None, None
 
 
-def upload_file(file_path: str, job_id: str, r2_config: Optional[dict] = None) -> dict:
+def upload_file(file_path: str, job_id: str, r2_config: Optional[dict] = None, metadata: Optional[dict] = None) -> dict:
     """
     Upload file and return upload info.
 
@@ -184,7 +259,7 @@ def upload_file(file_path: str, job_id: str, r2_config: Optional[dict] = None) -
     """
     # Try R2 first if configured
     if r2_config:
-        url, r2_key = upload_to_r2(file_path, job_id, r2_config)
+        url, r2_key = upload_to_r2(file_path, job_id, r2_config, metadata)
         if url:
             return {"output_url": url, "r2_key": r2_key}
         log("R2 upload failed, falling back to RunPod storage")
@@ -256,6 +331,37 @@ def get_video_info(video_path: str) -> dict:
 # ProPainter uses ~6.5MB per frame at 720p for RGB tensors, flow, masks, etc.
 BYTES_PER_FRAME_720P = 6.5 * 1024 * 1024
 
+# A measured model ({"bytes_per_pixel_frame": ..., "base_bytes": ...}) from
+# `dewatermark.py --calibrate` replaces the constants. PROPAINTER_MEMORY_MODEL
+# (JSON), calibrated on the endpoint's own GPU class, takes precedence over the
+# "memory_model" a client sends. Either is only trusted when it was measured
+# with the ProPainter settings of the profile this worker runs.
+CALIBRATED_SAFETY_MARGIN = 0.85
+PROFILE_SETTINGS = ("subvideo_length", "neighbor_length", "ref_stride")
+
+
+def get_memory_model(job_input: dict, profile: dict) -> Optional[dict]:
+    """Calibrated memory model from the endpoint env or job input, if it fits ``profile``."""
+    candidates = []
+    if os.environ.get("PROPAINTER_MEMORY_MODEL"):
+        try:
+            candidates.append(("PROPAINTER_MEMORY_MODEL", json.loads(os.environ["PROPAINTER_MEMORY_MODEL"])))
+        except ValueError:
+            log("Warning: PROPAINTER_MEMORY_MODEL is not valid JSON, ignoring it")
+    if job_input.get("memory_model"):
+        candidates.append(("job memory_model", job_input["memory_model"]))
+
+    for source, model in candidates:
+        if not isinstance(model, dict) or model.get("bytes_per_pixel_frame", 0) <= 0:
+            continue
+        settings = model.get("settings") or {}
+        mismatched = [k for k in PROFILE_SETTINGS if settings.get(k) != profile[k]]
+        if mismatched:
+            log(f"Ignoring {source}: calibrated with {settings or 'unknown settings'}, worker runs {profile}")
+            continue
+        return {"bytes_per_pixel_frame": float(model["bytes_per_pixel_frame"]), "base_bytes": float(model.get("base_bytes", 0))}
+    return None
+
 
 def calculate_safe_resize_ratio(
     vram_gb: int,
@@ -264,6 +370,7 @@ def calculate_safe_resize_ratio(
     frame_count: int,
     requested_ratio: float = 1.0,
     safety_margin: float = 0.7,
+    memory_model: Optional[dict] = None,
 ) -> tuple[float, str]:
     """
     Calculate a safe resize_ratio based on available VRAM and video properties.
@@ -281,20 +388,26 @@ def calculate_safe_resize_ratio(
         frame_count: Number of frames in video
         requested_ratio: User's requested resize ratio (default 1.0 = full res)
         safety_margin: Use this fraction of VRAM (default 0.7 = 70%)
+        memory_model: Calibrated model; replaces BYTES_PER_FRAME_720P and the
+            2GB base, and raises the margin to CALIBRATED_SAFETY_MARGIN
 
     Returns:
         (resize_ratio, reason): The ratio to use and why
     """
     # Calculate memory needed at full resolution
     pixels = width * height
-    pixels_720p = 1280 * 720
-    scale_factor = pixels / pixels_720p
+    if memory_model:
+        bytes_per_frame = memory_model["bytes_per_pixel_frame"] * pixels
+        model_overhead_bytes = memory_model["base_bytes"]
+        safety_margin = max(safety_margin, CALIBRATED_SAFETY_MARGIN)
+    else:
+        pixels_720p = 1280 * 720
+        scale_factor = pixels / pixels_720p
+        bytes_per_frame = BYTES_PER_FRAME_720P * scale_factor
+        # Add overhead for model weights, intermediate tensors, etc. (~2GB base)
+        model_overhead_bytes = 2 * (1024 ** 3)
 
-    bytes_per_frame = BYTES_PER_FRAME_720P * scale_factor
     total_bytes_full_res = bytes_per_frame * frame_count
-
-    # Add overhead for model weights, intermediate tensors, etc. (~2GB base)
-    model_overhead_bytes = 2 * (1024 ** 3)
     total_needed_full_res = total_bytes_full_res + model_overhead_bytes
 
     # Available memory with safety margin
@@ -381,15 +494,441 @@ def create_mask_from_region(region: str, width: int, height: int, output_path: s
         return False
 
 
+# ROI mode: inpaint a padded window around the mask at full resolution and
+# composite it back, so VRAM and time scale with the watermark, not the frame
+ROI_MIN_CONTEXT = 64     # px of surrounding picture kept on each side for flow
+ROI_MIN_SIZE = 128       # RAFT's feature pyramid needs a minimum input size
+ROI_MAX_AREA = 0.6       # above this fraction of the frame, cropping saves little
+ROI_MASK_DILATION = 4    # matches ProPainter's default --mask_dilation
+
+
+def mask_bounding_box(mask_path: str) -> Optional[tuple]:
+    """Bounding box (x, y, w, h) of the white area of a mask image."""
+    try:
+        result = subprocess.run([
+            "ffmpeg", "-loop", "1", "-i", mask_path,
+            "-vf", "cropdetect=limit=24:round=2:reset=0",
+            "-frames:v", "4",
+            "-f", "null", "-",
+        ], capture_output=True, text=True, timeout=30)
+        crops = [line.rsplit("crop=", 1)[1].split()[0] for line in result.stderr.splitlines() if "crop=" in line]
+        if crops:
+            w, h, x, y = (int(v) for v in crops[-1].split(":"))
+            if w > 0 and h > 0:
+                return x, y, w, h
+    except Exception as e:
+        log(f"Warning: Could not measure mask: {e}")
+    return None
+
+
+def _roi_span(lo: int, hi: int, limit: int, pad: int) -> tuple:
+    """Pad [lo, hi) within [0, limit), at least ROI_MIN_SIZE long, a multiple of 8 if it fits."""
+    lo, hi = max(0, lo - pad), min(limit, hi + pad)
+    size = -(-max(hi - lo, ROI_MIN_SIZE) // 8) * 8
+    if size >= limit:
+        return 0, limit
+    start = min(max(0, lo - (size - (hi - lo)) // 2), limit - size)
+    start -= start % 2
+    return start, start + size
+
+
+def plan_roi(region: Optional[str], mask_path: str, width: int, height: int) -> Optional[tuple]:
+    """Crop window (x, y, w, h) around the mask, or None to process full frames."""
+    box = tuple(int(v.strip()) for v in region.split(",")) if region else mask_bounding_box(mask_path)
+    if not box:
+        log("ROI: could not find the mask area, processing full frames")
+        return None
+
+    x, y, w, h = box
+    pad = max(ROI_MIN_CONTEXT, w, h)
+    x0, x1 = _roi_span(x, x + w, width, pad)
+    y0, y1 = _roi_span(y, y + h, height, pad)
+    window = (x0, y0, x1 - x0, y1 - y0)
+
+    if window[2] * window[3] > ROI_MAX_AREA * width * height:
+        log(f"ROI: window {window[2]}x{window[3]} covers most of the frame, processing full frames")
+        return None
+    log(f"ROI: inpainting {window[2]}x{window[3]} window at ({x0},{y0}) of {width}x{height}")
+    return window
+
+
+def crop_to_roi(video_path: str, mask_path: str, window: tuple, work_dir: Path) -> Optional[tuple]:
+    """Crop video and mask to the ROI window. Returns (video, mask) paths."""
+    x, y, w, h = window
+    crop = f"crop={w}:{h}:{x}:{y}"
+    roi_video = str(work_dir / "roi_input.mp4")
+    roi_mask = str(work_dir / "roi_mask.png")
+
+    for cmd in (
+        ["ffmpeg", "-y", "-i", video_path, "-vf", crop, "-an",
+         "-c:v", "libx264", "-preset", "ultrafast", "-crf", "12", roi_video],
+        ["ffmpeg", "-y", "-i", mask_path, "-vf", crop, "-frames:v", "1", roi_mask],
+    ):
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=3600)
+        if result.returncode != 0:
+            log(f"ROI crop error: {result.stderr[-1000:]}")
+            return None
+    return roi_video, roi_mask
+
+
+def composite_roi(
+    original_path: str,
+    roi_path: str,
+    roi_mask_path: str,
+    window: tuple,
+    output_path: str,
+    size: Optional[tuple] = None,
+    audio_path: Optional[str] = None,
+) -> bool:
+    """Paste the inpainted (dilated, feathered) mask area back onto the original frames.
+
+    The composite is the final encode: it is scaled to ``size`` if given, and
+    takes its audio from ``audio_path`` (default: the original video).
+    """
+    x, y, w, h = window
+    duration = get_video_info(roi_path)["duration"]
+    alpha = "format=gray," + ",".join(["dilation"] * ROI_MASK_DILATION) + ",gblur=sigma=2"
+    scale = f",scale={size[0]}:{size[1]}:flags=lanczos" if size else ""
+    filter_complex = (
+        f"[2:v]{alpha}[alpha];"
+        f"[1:v]scale={w}:{h},format=yuva420p[roi];"
+        f"[roi][alpha]alphamerge[patch];"
+        f"[0:v][patch]overlay={x}:{y}:eof_action=pass{scale},format=yuv420p[outv]"
+    )
+    audio_args = ["-map", "0:a?", "-c:a", "copy"]
+    if audio_path and audio_path != original_path:
+        audio_args = ["-map", "3:a:0?", "-c:a", "aac", "-b:a", "192k"]
+    log("Compositing inpainted region onto original frames...")
+    result = subprocess.run([
+        "ffmpeg", "-y",
+        "-i", original_path,
+        "-i", roi_path,
+        "-loop", "1", *(["-t", str(duration)] if duration else []), "-i", roi_mask_path,
+        *(["-i", audio_path] if audio_path and audio_path != original_path else []),
+        "-filter_complex", filter_complex,
+        "-map", "[outv]",
+        *audio_args,
+        *video_encoder_args(),
+        "-movflags", "+faststart",
+        output_path,
+    ], capture_output=True, text=True, timeout=3600)
+    if result.returncode != 0:
+        log(f"ROI composite error: {result.stderr[-1000:]}")
+        return False
+    return True
+
+
+# Final encode. With NVENC the full-resolution encode stays on the GPU; the
+# container needs NVIDIA_DRIVER_CAPABILITIES to include "video" for it.
+_nvenc_available: Optional[bool] = None
+
+
+def nvenc_available() -> bool:
+    """Whether h264_nvenc can open an encoder session on this worker (checked once)."""
+    global _nvenc_available
+    if _nvenc_available is None:
+        try:
+            result = subprocess.run(
+                ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "color=black:s=256x256:d=0.1",
+                 "-c:v", "h264_nvenc", "-f", "null", "-"],
+                capture_output=True, text=True, timeout=60,
+            )
+            _nvenc_available = result.returncode == 0
+        except Exception:
+            _nvenc_available = False
+        log(f"NVENC {'available' if _nvenc_available else 'not available, encoding with libx264'}")
+    return _nvenc_available
+
+
+def video_encoder_args() -> list:
+    if nvenc_available():
+        return ["-c:v", "h264_nvenc", "-preset", "p5", "-tune", "hq", "-rc", "vbr", "-cq", "19", "-b:v", "0",
+                "-pix_fmt", "yuv420p"]
+    return ["-c:v", "libx264", "-preset", "medium", "-crf", "18", "-pix_fmt", "yuv420p"]
+
+
+def parse_output_size(upscale_to, width: int, height: int) -> Optional[tuple]:
+    """Resolve ``upscale_to`` ("original", "WxH" or [w, h]) to an even (w, h)."""
+    if not upscale_to:
+        return None
+    if upscale_to == "original":
+        w, h = width, height
+    elif isinstance(upscale_to, str):
+        w, h = (int(v) for v in upscale_to.lower().split("x"))
+    else:
+        w, h = (int(v) for v in upscale_to)
+    return w - w % 2, h - h % 2
+
+
+def finalize_output(
+    video_path: str,
+    output_path: str,
+    size: Optional[tuple] = None,
+    audio_path: Optional[str] = None,
+) -> Optional[str]:
+    """Scale the inpainted video to ``size`` and mux audio from ``audio_path``, in one encode.
+
+    When no scaling is needed the video stream is copied and only audio is
+    added. Returns the video encoder used ("copy" if none), or None on failure.
+    """
+    info = get_video_info(video_path)
+    if size and (info["width"], info["height"]) == tuple(size):
+        size = None
+
+    cmd = ["ffmpeg", "-y", "-i", video_path]
+    if audio_path:
+        cmd += ["-i", audio_path]
+    cmd += ["-map", "0:v:0"]
+    if audio_path:
+        cmd += ["-map", "1:a:0?", "-c:a", "aac", "-b:a", "192k", "-shortest"]
+    if size:
+        log(f"Scaling {info['width']}x{info['height']} -> {size[0]}x{size[1]} and encoding...")
+        encoder_args = video_encoder_args()
+        cmd += ["-vf", f"scale={size[0]}:{size[1]}:flags=lanczos", *encoder_args]
+    else:
+        encoder_args = ["-c:v", "copy"]
+        cmd += encoder_args
+    cmd += ["-movflags", "+faststart", output_path]
+
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=3600)
+    if result.returncode != 0:
+        log(f"Finalize error: {result.stderr[-1000:]}")
+        return None
+    return encoder_args[1]
+
+
+# In-process ProPainter. RAFT, the flow completion network and ProPainter
+# itself are loaded once per worker and stay on the GPU between jobs, so a
+# warm worker skips interpreter start-up, the torch import and reading ~1GB
+# of weights for every job. PROPAINTER_IN_PROCESS=0 goes back to running
+# inference_propainter.py as a subprocess.
+PROPAINTER_IN_PROCESS = os.environ.get("PROPAINTER_IN_PROCESS", "1") != "0"
+PROPAINTER_RAFT_ITERS = 20  # inference_propainter.py --raft_iter default
+
+_propainter_models: Optional[dict] = None
+
+
+def load_propainter_models() -> tuple:
+    """Load the three networks on first use. Returns (models, seconds spent loading now)."""
+    global _propainter_models
+    if _propainter_models is not None:
+        return _propainter_models, 0.0
+
+    start = time.time()
+    if str(PROPAINTER_PATH) not in sys.path:
+        sys.path.insert(0, str(PROPAINTER_PATH))
+    import torch
+    import inference_propainter  # helpers only; its CLI lives under __main__
+    from model.misc import get_device
+    from model.modules.flow_comp_raft import RAFT_bi
+    from model.propainter import InpaintGenerator
+    from model.recurrent_flow_completion import RecurrentFlowCompleteNet
+
+    device = get_device()
+    weights = PROPAINTER_PATH / "weights"
+    raft = RAFT_bi(str(weights / "raft-things.pth"), device)
+    flow_complete = RecurrentFlowCompleteNet(str(weights / "recurrent_flow_completion.pth"))
+    for param in flow_complete.parameters():
+        param.requires_grad = False
+    flow_complete.to(device).eval()
+    inpainter = InpaintGenerator(model_path=str(weights / "ProPainter.pth")).to(device).eval()
+
+    _propainter_models = {
+        "torch": torch,
+        "helpers": inference_propainter,
+        "device": device,
+        "raft": raft,
+        "flow_complete": flow_complete,
+        "inpainter": inpainter,
+    }
+    elapsed = time.time() - start
+    log(f"ProPainter models loaded in {elapsed:.1f}s")
+    return _propainter_models, elapsed
+
+
+def _inpaint_in_process(
+    models: dict,
+    video_path: str,
+    mask_path: str,
+    output_path: str,
+    profile: dict,
+    fp16: bool,
+    resize_ratio: float,
+) -> None:
+    """The inference half of inference_propainter.py, run on already-loaded models."""
+    import imageio
+    import numpy as np
+    from core.utils import to_tensors
+
+    torch = models["torch"]
+    helpers = models["helpers"]
+    device = models["device"]
+    raft, flow_complete, inpainter = models["raft"], models["flow_complete"], models["inpainter"]
+    subvideo_length = profile["subvideo_length"]
+    neighbor_length = profile["neighbor_length"]
+    ref_stride = profile["ref_stride"]
+    use_half = fp16 and device.type != "cpu"
+
+    frames, fps, size, _ = helpers.read_frame_from_videos(video_path)
+    if resize_ratio != 1.0:
+        size = (int(resize_ratio * size[0]), int(resize_ratio * size[1]))
+    frames, size, out_size = helpers.resize_frames(frames, size)
+    fps = fps or 24
+    w, h = size
+    video_length = len(frames)
+    flow_masks, masks_dilated = helpers.read_mask(
+        mask_path, video_length, size,
+        flow_mask_dilates=ROI_MASK_DILATION, mask_dilates=ROI_MASK_DILATION,
+    )
+    original = [np.array(f).astype(np.uint8) for f in frames]
+    frames = (to_tensors()(frames).unsqueeze(0) * 2 - 1).to(device)
+    flow_masks = to_tensors()(flow_masks).unsqueeze(0).to(device)
+    masks_dilated = to_tensors()(masks_dilated).unsqueeze(0).to(device)
+
+    # The networks stay resident, so precision is switched per job
+    flow_complete.half() if use_half else flow_complete.float()
+    inpainter.half() if use_half else inpainter.float()
+
+    with torch.no_grad():
+        # Optical flow (RAFT runs in fp32), in short clips to bound memory
+        short_clip_len = 12 if w <= 640 else 8 if w <= 720 else 4 if w <= 1280 else 2
+        if video_length > short_clip_len:
+            flows_f, flows_b = [], []
+            for f in range(0, video_length, short_clip_len):
+                end_f = min(video_length, f + short_clip_len)
+                flow_f, flow_b = raft(frames[:, max(0, f - 1):end_f], iters=PROPAINTER_RAFT_ITERS)
+                flows_f.append(flow_f)
+                flows_b.append(flow_b)
+                torch.cuda.empty_cache()
+            gt_flows = (torch.cat(flows_f, dim=1), torch.cat(flows_b, dim=1))
+        else:
+            gt_flows = raft(frames, iters=PROPAINTER_RAFT_ITERS)
+            torch.cuda.empty_cache()
+
+        if use_half:
+            frames, flow_masks, masks_dilated = frames.half(), flow_masks.half(), masks_dilated.half()
+            gt_flows = (gt_flows[0].half(), gt_flows[1].half())
+
+        # Flow completion, in padded sub-videos
+        flow_length = gt_flows[0].size(1)
+        if flow_length > subvideo_length:
+            pred_f, pred_b = [], []
+            pad = 5
+            for f in range(0, flow_length, subvideo_length):
+                s_f, e_f = max(0, f - pad), min(flow_length, f + subvideo_length + pad)
+                pad_s, pad_e = f - s_f, e_f - min(flow_length, f + subvideo_length)
+                sub_flows = (gt_flows[0][:, s_f:e_f], gt_flows[1][:, s_f:e_f])
+                completed, _ = flow_complete.forward_bidirect_flow(sub_flows, flow_masks[:, s_f:e_f + 1])
+                completed = flow_complete.combine_flow(sub_flows, completed, flow_masks[:, s_f:e_f + 1])
+                pred_f.append(completed[0][:, pad_s:e_f - s_f - pad_e])
+                pred_b.append(completed[1][:, pad_s:e_f - s_f - pad_e])
+                torch.cuda.empty_cache()
+            pred_flows = (torch.cat(pred_f, dim=1), torch.cat(pred_b, dim=1))
+        else:
+            pred_flows, _ = flow_complete.forward_bidirect_flow(gt_flows, flow_masks)
+            pred_flows = flow_complete.combine_flow(gt_flows, pred_flows, flow_masks)
+            torch.cuda.empty_cache()
+
+        # Image propagation
+        masked_frames = frames * (1 - masks_dilated)
+        prop_length = min(100, subvideo_length)
+        if video_length > prop_length:
+            updated_frames, updated_masks = [], []
+            pad = 10
+            for f in range(0, video_length, prop_length):
+                s_f, e_f = max(0, f - pad), min(video_length, f + prop_length + pad)
+                pad_s, pad_e = f - s_f, e_f - min(video_length, f + prop_length)
+                b, t = masks_dilated[:, s_f:e_f].shape[:2]
+                prop_imgs, local_masks = inpainter.img_propagation(
+                    masked_frames[:, s_f:e_f],
+                    (pred_flows[0][:, s_f:e_f - 1], pred_flows[1][:, s_f:e_f - 1]),
+                    masks_dilated[:, s_f:e_f],
+                    "nearest",
+                )
+                sub_frames = (frames[:, s_f:e_f] * (1 - masks_dilated[:, s_f:e_f])
+                              + prop_imgs.view(b, t, 3, h, w) * masks_dilated[:, s_f:e_f])
+                updated_frames.append(sub_frames[:, pad_s:e_f - s_f - pad_e])
+                updated_masks.append(local_masks.view(b, t, 1, h, w)[:, pad_s:e_f - s_f - pad_e])
+                torch.cuda.empty_cache()
+            updated_frames = torch.cat(updated_frames, dim=1)
+            updated_masks = torch.cat(updated_masks, dim=1)
+        else:
+            b, t = masks_dilated.shape[:2]
+            prop_imgs, local_masks = inpainter.img_propagation(masked_frames, pred_flows, masks_dilated, "nearest")
+            updated_frames = frames * (1 - masks_dilated) + prop_imgs.view(b, t, 3, h, w) * masks_dilated
+            updated_masks = local_masks.view(b, t, 1, h, w)
+            torch.cuda.empty_cache()
+
+        # Feature propagation + transformer over sliding neighbourhoods
+        comp_frames = [None] * video_length
+        neighbor_stride = neighbor_length // 2
+        ref_num = subvideo_length // ref_stride if video_length > subvideo_length else -1
+        for f in range(0, video_length, neighbor_stride):
+            neighbor_ids = list(range(max(0, f - neighbor_stride), min(video_length, f + neighbor_stride + 1)))
+            ref_ids = helpers.get_ref_index(f, neighbor_ids, video_length, ref_stride, ref_num)
+            selected = neighbor_ids + ref_ids
+            pred_img = inpainter(
+                updated_frames[:, selected],
+                (pred_flows[0][:, neighbor_ids[:-1]], pred_flows[1][:, neighbor_ids[:-1]]),
+                masks_dilated[:, selected],
+                updated_masks[:, selected],
+                len(neighbor_ids),
+            )
+            pred_img = ((pred_img.view(-1, 3, h, w) + 1) / 2).cpu().permute(0, 2, 3, 1).numpy() * 255
+            binary_masks = masks_dilated[0, neighbor_ids].cpu().permute(0, 2, 3, 1).numpy().astype(np.uint8)
+            for i, idx in enumerate(neighbor_ids):
+                img = pred_img[i].astype(np.uint8) * binary_masks[i] + original[idx] * (1 - binary_masks[i])
+                if comp_frames[idx] is not None:
+                    img = comp_frames[idx].astype(np.float32) * 0.5 + img.astype(np.float32) * 0.5
+                comp_frames[idx] = img.astype(np.uint8)
+            torch.cuda.empty_cache()
+
+    import cv2
+    comp_frames = [cv2.resize(f, out_size) for f in comp_frames]
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    imageio.mimwrite(output_path, comp_frames, fps=fps, quality=7)
+
+
 def run_propainter(
     video_path: str,
     mask_path: str,
     output_dir: str,
     profile: dict,
     fp16: bool = True,
-    resize_ratio: float = 1.0
+    resize_ratio: float = 1.0,
+    timings: Optional[dict] = None,
 ) -> Optional[str]:
-    """Run ProPainter inference and return path to output video."""
+    """Run ProPainter inference and return path to output video.
+
+    Uses the worker's resident models (see load_propainter_models) unless
+    PROPAINTER_IN_PROCESS=0 or they fail to load, in which case it falls back
+    to the inference script. ``timings`` receives model_load_seconds,
+    inference_seconds and whether the run was in_process.
+    """
+    timings = timings if timings is not None else {}
+
+    if PROPAINTER_IN_PROCESS:
+        try:
+            models, timings["model_load_seconds"] = load_propainter_models()
+        except Exception as e:
+            log(f"Could not load ProPainter in-process ({e}), falling back to the inference script")
+            models = None
+        if models:
+            output_path = str(Path(output_dir) / Path(video_path).stem / "inpaint_out.mp4")
+            log(f"Running ProPainter in-process with settings: {profile}, resize_ratio={resize_ratio}")
+            start_time = time.time()
+            try:
+                _inpaint_in_process(models, video_path, mask_path, output_path, profile, fp16, resize_ratio)
+            except Exception as e:
+                import traceback
+                log(f"ProPainter error: {e}")
+                log(traceback.format_exc())
+                models["torch"].cuda.empty_cache()
+                return None
+            timings["inference_seconds"] = round(time.time() - start_time, 2)
+            timings["in_process"] = True
+            log(f"ProPainter completed in {timings['inference_seconds']:.1f}s (warm models)")
+            return output_path
 
     inference_script = PROPAINTER_PATH / "inference_propainter.py"
 
@@ -424,6 +963,8 @@ def run_propainter(
 
     elapsed = time.time() - start_time
     log(f"ProPainter completed in {elapsed:.1f}s")
+    # The script loads its models on every run; that time is not separable here
+    timings.update({"model_load_seconds": None, "inference_seconds": round(elapsed, 2), "in_process": False})
 
     if result.returncode != 0:
         log(f"ProPainter error (exit {result.returncode}):")
@@ -473,6 +1014,14 @@ def handle_dewatermark(job_input: dict, job_id: str, work_dir: Path) -> dict:
         fp16: Use half precision (default: true, faster)
         resize_ratio: Scale factor for processing (default: "auto" - calculated based on VRAM)
                       Set to a specific value (0.25-1.0) to override auto-calculation
+        roi: Inpaint only a padded window around the mask and composite it back
+             (default: false). "auto" resize_ratio is then sized for the window.
+        memory_model: Calibrated {bytes_per_pixel_frame, base_bytes} from
+             `dewatermark.py --calibrate`, used to size "auto" resize_ratio
+        upscale_to: Final frame size, "original" or "WxH". The reduced-resolution
+             result is scaled back up here, in the same encode as the audio mux.
+        audio_source: "input" to mux the input video's audio into the result, or a
+             URL to take it from
         r2: R2 config for result upload (endpoint_url, access_key_id, secret_access_key, bucket_name)
     """
     start_time = time.time()
@@ -483,6 +1032,9 @@ def handle_dewatermark(job_input: dict, job_id: str, work_dir: Path) -> dict:
     mask_url = job_input.get("mask_url")
     fp16 = job_input.get("fp16", True)
     requested_resize_ratio = job_input.get("resize_ratio", "auto")  # Default to auto-calculation
+    roi = job_input.get("roi", False)
+    upscale_to = job_input.get("upscale_to")
+    audio_source = job_input.get("audio_source")
     r2_config = job_input.get("r2")  # Optional R2 config for result upload
 
     if not video_url:
@@ -492,7 +1044,8 @@ def handle_dewatermark(job_input: dict, job_id: str, work_dir: Path) -> dict:
 
     if r2_config:
         log("R2 config provided - will upload result to R2")
-    log(f"Processing options: fp16={fp16}, requested_resize_ratio={requested_resize_ratio}")
+    log(f"Processing options: fp16={fp16}, requested_resize_ratio={requested_resize_ratio}, roi={roi}, "
+        f"upscale_to={upscale_to}, audio_source={audio_source}")
 
     # Download video
     video_path = str(work_dir / "input_video.mp4")
@@ -510,22 +1063,58 @@ def handle_dewatermark(job_input: dict, job_id: str, work_dir: Path) -> dict:
 
     log(f"Video: {width}x{height}, {duration:.1f}s, {frame_count} frames")
 
+    try:
+        output_size = parse_output_size(upscale_to, width, height)
+    except ValueError:
+        return {"error": f"Invalid upscale_to: {upscale_to} (use \"original\" or \"WxH\")"}
+    audio_path = None
+    if audio_source == "input":
+        audio_path = video_path
+    elif audio_source:
+        audio_path = str(work_dir / "audio_source")
+        if not download_file(audio_source, audio_path, "audio source"):
+            return {"error": "Failed to download audio_source"}
+
     # Detect GPU and get optimal settings
     vram_gb = get_gpu_vram_gb()
     profile = get_memory_profile(vram_gb)
     log(f"GPU VRAM: {vram_gb}GB, using profile: {profile}")
 
+    # Prepare mask
+    mask_path = str(work_dir / "mask.png")
+
+    if mask_url:
+        if not download_file(mask_url, mask_path, "mask"):
+            return {"error": "Failed to download mask from URL"}
+    else:
+        if not create_mask_from_region(region, width, height, mask_path):
+            return {"error": f"Failed to create mask from region: {region}"}
+
+    # In ROI mode ProPainter only sees the cropped window
+    proc_video, proc_mask = video_path, mask_path
+    proc_width, proc_height = width, height
+    window = plan_roi(region, mask_path, width, height) if roi else None
+    if window:
+        cropped = crop_to_roi(video_path, mask_path, window, work_dir)
+        if not cropped:
+            return {"error": "Failed to crop video to ROI window"}
+        proc_video, proc_mask = cropped
+        proc_width, proc_height = window[2], window[3]
+
     # Calculate safe resize_ratio based on VRAM and video properties
+    memory_model = get_memory_model(job_input, profile)
+    if memory_model:
+        log(f"Using calibrated memory model: {memory_model}")
     if requested_resize_ratio == "auto":
         # Auto mode: calculate optimal ratio, aim for full resolution if possible
         resize_ratio, resize_reason = calculate_safe_resize_ratio(
-            vram_gb, width, height, frame_count, requested_ratio=1.0
+            vram_gb, proc_width, proc_height, frame_count, requested_ratio=1.0, memory_model=memory_model
         )
     else:
         # User specified a ratio - use it but warn if it might OOM
         user_ratio = float(requested_resize_ratio)
         safe_ratio, _ = calculate_safe_resize_ratio(
-            vram_gb, width, height, frame_count, requested_ratio=user_ratio
+            vram_gb, proc_width, proc_height, frame_count, requested_ratio=user_ratio, memory_model=memory_model
         )
         if safe_ratio < user_ratio:
             log(f"WARNING: Requested resize_ratio={user_ratio} may cause OOM. Safe ratio is {safe_ratio}")
@@ -534,27 +1123,46 @@ def handle_dewatermark(job_input: dict, job_id: str, work_dir: Path) -> dict:
 
     log(f"Using resize_ratio={resize_ratio} ({resize_reason})")
 
-    # Prepare mask
-    mask_path = str(work_dir / "mask.png")
-
-    if mask_url:
-        if not download_file(mask_url, mask_path, "mask"):
-            return {"error": "Failed to download mask from URL"}
-    else:
-        if not create_mask_from_region(region, width, height, mask_path):
-            return {"error": f"Failed to create mask from region: {region}"}
-
     # Run ProPainter
     output_dir = str(work_dir / "results")
     os.makedirs(output_dir, exist_ok=True)
 
-    result_path = run_propainter(video_path, mask_path, output_dir, profile, fp16, resize_ratio)
+    propainter_timings = {}
+    result_path = run_propainter(proc_video, proc_mask, output_dir, profile, fp16, resize_ratio, propainter_timings)
 
     if not result_path:
         return {"error": "ProPainter processing failed - check logs for details"}
 
-    # Upload result (to R2 if configured, otherwise RunPod storage)
-    upload_result = upload_file(result_path, job_id, r2_config)
+    # One final encode: the ROI composite, or scale + audio mux of the full frame
+    encoder = None
+    if window:
+        composited = str(work_dir / "roi_composited.mp4")
+        if not composite_roi(video_path, result_path, proc_mask, window, composited, output_size, audio_path):
+            return {"error": "Failed to composite ROI back onto the video"}
+        result_path = composited
+        encoder = video_encoder_args()[1]
+    elif output_size or audio_path:
+        final_path = str(work_dir / "final.mp4")
+        encoder = finalize_output(result_path, final_path, output_size, audio_path)
+        if not encoder:
+            return {"error": "Failed to scale and mux the result"}
+        result_path = final_path
+
+    finalized = None
+    if encoder:
+        final_info = get_video_info(result_path)
+        finalized = {
+            "dimensions": f"{final_info['width']}x{final_info['height']}",
+            "audio": bool(audio_path or window),
+            "encoder": encoder,
+        }
+
+    # Upload result (to R2 if configured, otherwise RunPod storage). The
+    # finalized info also goes on the object, so a client recovering the
+    # result from R2 after the job status expired doesn't finalize it again.
+    upload_result = upload_file(
+        result_path, job_id, r2_config, {"finalized": json.dumps(finalized)} if finalized else None
+    )
 
     if not upload_result.get("output_url"):
         return {"error": "Failed to upload result video"}
@@ -571,9 +1179,16 @@ def handle_dewatermark(job_input: dict, job_id: str, work_dir: Path) -> dict:
         "profile_used": profile,
         "resize_ratio": resize_ratio,
         "resize_reason": resize_reason,
+        "memory_model": "calibrated" if memory_model else "default",
+        "propainter_timings": propainter_timings,
         "processing_time_seconds": round(elapsed, 2),
     }
 
+    if window:
+        result["roi_window"] = list(window)
+    if finalized:
+        result["finalized"] = finalized
+
     # Include R2 key if result was uploaded to R2
     if upload_result.get("r2_key"):
         result["r2_key"] = upload_result["r2_key"]
@@ -623,5 +1238,11 @@ if __name__ == "__main__":
     log("Starting RunPod ProPainter handler...")
     log(f"ProPainter path: {PROPAINTER_PATH}")
     log(f"Weights exist: {(PROPAINTER_PATH / 'weights').exists()}")
+    if PROPAINTER_IN_PROCESS:
+        # Load during cold start so the first job already finds the models warm
+        try:
+            load_propainter_models()
+        except Exception as e:
+            log(f"Model preload failed ({e}); jobs will use the inference script")
 
     runpod.serverless.start({"handler": handler})
@@ -32,7 +32,8 @@ Input format:
             "endpoint_url": str,
             "access_key_id": str,
             "secret_access_key": str,
-            "bucket_name": str
+            "bucket_name": str,
+            "output_key": str       # Optional: result object key
         }
     }
 }
@@ -50,6 +51,9 @@ Output format:
 """
 
 import base64
+import hashlib
+import io
+import os
 import shutil
 import subprocess
 import sys
@@ -63,6 +67,9 @@ import runpod
 import requests
 import soundfile as sf
 
+TRANSFER_CONCURRENCY = int(os.environ.get("TRANSFER_CONCURRENCY", "8"))
+TRANSFER_PART_SIZE = int(os.environ.get("TRANSFER_PART_SIZE_MB", "16")) * 1024 * 1024
+
 # Lazy-loaded global models (kept in GPU memory between requests)
 _custom_voice_model = None
 _base_model = None
@@ -117,7 +124,7 @@ def download_file(url: str, output_path: Path, timeout: int = 300) -> bool:
         response.raise_for_status()
 
         with open(output_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
                 f.write(chunk)
 
         log(f"  Downloaded: {output_path.name} ({output_path.stat().st_size // 1024}KB)")
@@ -142,51 +149,28 @@ def decode_base64_file(data: str, output_path: Path) -> bool:
         return False
 
 
-def encode_file_base64(file_path: Path) -> str:
-    """Encode file to base64 string."""
-    return base64.b64encode(file_path.read_bytes()).decode("utf-8")
-
-
-def get_audio_duration(audio_path: Path) -> float:
-    """Get audio duration in seconds using ffprobe."""
+def wav_to_mp3(wav_bytes: bytes) -> Optional[bytes]:
+    """Convert WAV to MP3 using ffmpeg, piping through stdin/stdout."""
     try:
         result = subprocess.run(
-            [
-                "ffprobe",
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                str(audio_path),
-            ],
-            capture_output=True,
-            text=True,
-            timeout=30,
-        )
-        return float(result.stdout.strip())
-    except Exception as e:
-        log(f"Error getting audio duration: {e}")
-        return 0.0
-
-
-def wav_to_mp3(wav_path: Path, mp3_path: Path) -> bool:
-    """Convert WAV to MP3 using ffmpeg."""
-    try:
-        subprocess.run(
             [
                 "ffmpeg", "-y",
-                "-i", str(wav_path),
+                "-f", "wav",
+                "-i", "pipe:0",
                 "-codec:a", "libmp3lame",
                 "-b:a", "192k",
-                str(mp3_path),
+                "-f", "mp3",
+                "pipe:1",
             ],
+            input=wav_bytes,
             capture_output=True,
             timeout=120,
             check=True,
         )
-        return mp3_path.exists()
+        return result.stdout or None
     except Exception as e:
         log(f"WAV to MP3 conversion error: {e}")
-        return False
+        return None
 
 
 def generate_custom_voice(text: str, speaker: str, language: str, instruct: str = "", **kwargs) -> tuple:
@@ -228,10 +212,11 @@ def generate_clone_voice(text: str, language: str, ref_audio_path: Path, ref_tex
     return wavs[0], sr
 
 
-def upload_to_r2(file_path: Path, job_id: str, r2_config: dict, content_type: str = "audio/mpeg") -> tuple[Optional[str], Optional[str]]:
+def upload_to_r2(audio: bytes, ext: str, job_id: str, r2_config: dict, content_type: str = "audio/mpeg") -> tuple[Optional[str], Optional[str]]:
     """Upload audio to Cloudflare R2 and return (presigned_url, object_key)."""
     try:
         import boto3
+        from boto3.s3.transfer import TransferConfig
         from botocore.config import Config
 
         log("Uploading to R2...")
@@ -244,14 +229,18 @@ def upload_to_r2(file_path: Path, job_id: str, r2_config: dict, content_type: st
             config=Config(signature_version="s3v4"),
         )
 
-        ext = file_path.suffix
-        object_key = f"qwen3-tts/results/{job_id}_{uuid.uuid4().hex[:8]}{ext}"
+        object_key = r2_config.get("output_key") or f"qwen3-tts/results/{job_id}_{uuid.uuid4().hex[:8]}{ext}"
 
-        client.upload_file(
-            str(file_path),
+        client.upload_fileobj(
+            io.BytesIO(audio),
             r2_config["bucket_name"],
             object_key,
-            ExtraArgs={"ContentType": content_type},
+            ExtraArgs={"ContentType": content_type, "Metadata": {"sha256": hashlib.sha256(audio).hexdigest()}},
+            Config=TransferConfig(
+                multipart_threshold=TRANSFER_PART_SIZE,
+                multipart_chunksize=TRANSFER_PART_SIZE,
+                max_concurrency=TRANSFER_CONCURRENCY,
+            ),
         )
 
         presigned_url = client.generate_presigned_url(
@@ -297,8 +286,6 @@ def handler(job: dict) -> dict:
     log(f"Working directory: {work_dir}")
 
     try:
-        wav_path = work_dir / "output.wav"
-
         if mode == "clone":
             # Voice cloning mode - need reference audio
             ref_audio_path = work_dir / "ref_audio.wav"
@@ -339,24 +326,25 @@ def handler(job: dict) -> dict:
                 **gen_kwargs,
             )
 
-        # Write WAV
-        sf.write(str(wav_path), audio_data, sr)
-        log(f"WAV generated: {wav_path.stat().st_size // 1024}KB")
+        # Encode in memory; the audio goes from the model to R2 without touching disk
+        wav_buffer = io.BytesIO()
+        sf.write(wav_buffer, audio_data, sr, format="WAV")
+        audio = wav_buffer.getvalue()
+        log(f"WAV generated: {len(audio) // 1024}KB")
 
         # Convert to output format
         if output_format == "mp3":
-            output_path = work_dir / "output.mp3"
-            if not wav_to_mp3(wav_path, output_path):
+            audio = wav_to_mp3(audio)
+            if not audio:
                 return {"error": "Failed to convert WAV to MP3"}
-            content_type = "audio/mpeg"
+            content_type, ext = "audio/mpeg", ".mp3"
         else:
-            output_path = wav_path
-            content_type = "audio/wav"
+            content_type, ext = "audio/wav", ".wav"
 
-        duration = get_audio_duration(output_path)
+        duration = len(audio_data) / sr
         elapsed = time.time() - start_time
 
-        log(f"Output: {output_path.name} ({output_path.stat().st_size // 1024}KB, {duration:.1f}s)")
+        log(f"Output: {ext[1:]} ({len(audio) // 1024}KB, {duration:.1f}s)")
 
         result = {
             "success": True,
@@ -367,14 +355,14 @@ def handler(job: dict) -> dict:
 
         # Upload to R2 if configured
         if r2_config:
-            url, r2_key = upload_to_r2(output_path, job_id, r2_config, content_type)
+            url, r2_key = upload_to_r2(audio, ext, job_id, r2_config, content_type)
             if url:
                 result["audio_url"] = url
                 result["r2_key"] = r2_key
             else:
                 return {"error": "Failed to upload to R2"}
         else:
-            result["audio_base64"] = encode_file_base64(output_path)
+            result["audio_base64"] = base64.b64encode(audio).decode("utf-8")
             log("Warning: Returning audio as base64 (consider using R2)")
 
         return result
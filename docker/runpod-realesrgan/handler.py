@@ -26,6 +26,7 @@ Output format:
 }
 """
 
+import hashlib
 import os
 import shutil
 import sys
@@ -41,6 +42,9 @@ import runpod
 import torch
 from PIL import Image
 
+TRANSFER_CONCURRENCY = int(os.environ.get("TRANSFER_CONCURRENCY", "8"))
+TRANSFER_PART_SIZE = int(os.environ.get("TRANSFER_PART_SIZE_MB", "16")) * 1024 * 1024
+
 # Model paths (baked into Docker image)
 WEIGHTS_DIR = Path("/app/weights")
 MODEL_PATHS = {
@@ -128,7 +132,7 @@ def download_file(url: str, output_path: str, description: str = "file") -> bool
         downloaded = 0
 
         with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
                 f.write(chunk)
                 downloaded += len(chunk)
 
@@ -139,10 +143,20 @@ def download_file(url: str, output_path: str, description: str = "file") -> bool
         return False
 
 
+def file_sha256(file_path) -> str:
+    """Hex SHA-256 of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 def upload_to_r2(file_path: str, job_id: str, r2_config: dict, extension: str = "png") -> tuple[Optional[str], Optional[str]]:
     """Upload file to Cloudflare R2 and return (presigned_url, object_key)."""
     try:
         import boto3
+        from boto3.s3.transfer import TransferConfig
         from botocore.config import Config
         import uuid
 
@@ -156,7 +170,7 @@ def upload_to_r2(file_path: str, job_id: str, r2_config: dict, extension: str =
             config=Config(signature_version="s3v4"),
         )
 
-        object_key = f"upscale/results/{job_id}_{uuid.uuid4().hex[:8]}.{extension}"
+        object_key = r2_config.get("output_key") or f"upscale/results/{job_id}_{uuid.uuid4().hex[:8]}.{extension}"
 
         # Set content type based on extension
         content_types = {
@@ -171,7 +185,12 @@ def upload_to_r2(file_path: str, job_id: str, r2_config: dict, extension: str =
             file_path,
             r2_config["bucket_name"],
             object_key,
-            ExtraArgs={"ContentType": content_type}
+            ExtraArgs={"ContentType": content_type, "Metadata": {"sha256": file_sha256(file_path)}},
+            Config=TransferConfig(
+                multipart_threshold=TRANSFER_PART_SIZE,
+                multipart_chunksize=TRANSFER_PART_SIZE,
+                max_concurrency=TRANSFER_CONCURRENCY,
+            ),
         )
 
         # Generate presigned URL (valid for 2 hours)
@@ -21,13 +21,16 @@ Input format:
         "size": int,                # Output resolution: 256 or 512 (default: 256)
         "expression_scale": float,  # Expression intensity (default: 1.0)
         "pose_style": int,          # Pose variation (0-45, default: 0)
+        "face_cache": bool,         # Reuse/save the preprocessed face in R2 (default: false)
+        "enhance_skip_static": bool,  # Reuse GFPGAN output while mouth/eyes are still (default: true)
 
         # R2 config for result upload
         "r2": {
             "endpoint_url": str,
             "access_key_id": str,
             "secret_access_key": str,
-            "bucket_name": str
+            "bucket_name": str,
+            "output_key": str       # Optional: result object key
         }
     }
 }
@@ -40,30 +43,45 @@ Output format:
     "r2_key": str,              # R2 object key
     "duration_seconds": float,
     "chunks_processed": int,
+    "model_load_seconds": float,  # Loading models this job (0 on a warm worker)
+    "render_seconds": float,      # Time spent rendering chunks, summed over concurrent renders
+    "enhance_seconds": float,     # Time in the batched GFPGAN stage, summed likewise
+    "frames_enhanced": int,       # Frames sent through GFPGAN
+    "frames_reused": int,         # Frames that reused the previous restored face
+    "concurrency": int,           # Chunks rendered at once after the first
+    "in_process": bool,           # False when falling back to inference.py
+    "source_face": str,           # "worker", "r2" or "computed" (in-process only)
     "processing_time_seconds": float
 }
 
 Chunking:
-- Audio >45s is split into chunks to prevent drift
-- Each chunk processed independently
+- Audio >45s is split into chunks to prevent drift, in one ffmpeg pass
+- Each chunk processed independently, several at once when GPU memory allows
 - Results concatenated with ffmpeg
 """
 
 import base64
+import hashlib
 import io
+import json
 import os
 import shutil
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import Optional
 
 import runpod
 import requests
 
+TRANSFER_CONCURRENCY = int(os.environ.get("TRANSFER_CONCURRENCY", "8"))
+TRANSFER_PART_SIZE = int(os.environ.get("TRANSFER_PART_SIZE_MB", "16")) * 1024 * 1024
+
 # SadTalker paths
 SADTALKER_DIR = Path("/app/SadTalker")
 CHECKPOINT_DIR = SADTALKER_DIR / "checkpoints"
@@ -71,6 +89,16 @@ CHECKPOINT_DIR = SADTALKER_DIR / "checkpoints"
 # Chunk size in seconds (to prevent drift)
 CHUNK_DURATION = 45
 
+# Concurrent chunk renders. Each in-process render needs roughly this much
+# GPU memory on top of the resident models; GFPGAN adds its own copy and
+# activations per rendering thread, and an inference.py subprocess also loads
+# every model itself. SADTALKER_MAX_CONCURRENCY caps the automatic figure.
+RENDER_VRAM_GB = {256: 2.5, 512: 6.0}
+GFPGAN_VRAM_GB = 2.5
+SUBPROCESS_VRAM_GB = 3.0
+VRAM_HEADROOM_GB = 2.0
+MAX_CONCURRENCY = int(os.environ.get("SADTALKER_MAX_CONCURRENCY", "0"))
+
 
 def log(message: str) -> None:
     """Log message to stderr (visible in RunPod logs)."""
@@ -85,7 +113,7 @@ def download_file(url: str, output_path: Path, timeout: int = 300) -> bool:
         response.raise_for_status()
 
         with open(output_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
                 f.write(chunk)
 
         log(f"  Downloaded: {output_path.name} ({output_path.stat().st_size // 1024}KB)")
@@ -138,47 +166,433 @@ def get_audio_duration(audio_path: Path) -> float:
 
 
 def split_audio_chunks(audio_path: Path, work_dir: Path, chunk_duration: int = CHUNK_DURATION) -> list[Path]:
-    """Split audio into chunks to prevent drift."""
+    """Split audio into chunks to prevent drift, in one pass with ffmpeg's segment muxer."""
     duration = get_audio_duration(audio_path)
     log(f"Audio duration: {duration:.1f}s")
 
     if duration <= chunk_duration:
         return [audio_path]
 
-    chunks = []
-    start = 0.0
-    chunk_idx = 0
+    result = subprocess.run(
+        [
+            "ffmpeg", "-y",
+            "-i", str(audio_path),
+            "-map", "0:a:0",
+            "-c:a", "pcm_s16le",
+            "-f", "segment",
+            "-segment_time", str(chunk_duration),
+            "-reset_timestamps", "1",
+            str(work_dir / "audio_chunk_%03d.wav"),
+        ],
+        capture_output=True,
+        timeout=300,
+    )
+    if result.returncode != 0:
+        log(f"Audio split failed: {result.stderr.decode(errors='replace')[-500:]}")
+        return []
+
+    # PCM splits on sample boundaries, so chunk i starts at i * chunk_duration
+    chunks = sorted(work_dir.glob("audio_chunk_*.wav"))
+    for chunk_idx in range(len(chunks)):
+        start = chunk_idx * chunk_duration
+        log(f"  Chunk {chunk_idx}: {start:.1f}s - {min(start + chunk_duration, duration):.1f}s")
 
-    while start < duration:
-        chunk_path = work_dir / f"audio_chunk_{chunk_idx:03d}.wav"
-        end = min(start + chunk_duration, duration)
+    log(f"Split into {len(chunks)} chunks")
+    return chunks
 
-        subprocess.run(
-            [
-                "ffmpeg", "-y",
-                "-i", str(audio_path),
-                "-ss", str(start),
-                "-t", str(end - start),
-                "-c:a", "pcm_s16le",
-                str(chunk_path),
-            ],
-            capture_output=True,
-            timeout=60,
+
+# Last error per rendering thread, for better reporting
+_render_state = threading.local()
+
+# In-process SadTalker. The preprocessing (face detector + 3DMM), audio2coeff,
+# face renderer and GFPGAN networks are loaded once per worker and reused for
+# every chunk and job, instead of `python inference.py` reloading all of them
+# per chunk. SADTALKER_IN_PROCESS=0 restores the subprocess.
+SADTALKER_IN_PROCESS = os.environ.get("SADTALKER_IN_PROCESS", "1") != "0"
+SADTALKER_BATCH_SIZE = 2  # inference.py --batch_size default
+GFPGAN_WEIGHTS = SADTALKER_DIR / "gfpgan" / "weights" / "GFPGANv1.4.pth"
+
+_sadtalker_models: Optional[dict] = None
+_models_lock = threading.Lock()
+
+
+def _cached_gfpganer(model_path, upscale, arch, channel_multiplier, bg_upsampler=None):
+    """Stand-in for GFPGANer inside SadTalker's face_enhancer that builds each restorer once.
+
+    GFPGANer keeps per-image face state, so every rendering thread gets its own.
+    """
+    from gfpgan import GFPGANer
+
+    if not hasattr(_render_state, "restorers"):
+        _render_state.restorers = {}
+    restorers = _render_state.restorers
+    key = (str(model_path), upscale, arch, channel_multiplier, id(bg_upsampler))
+    if key not in restorers:
+        restorers[key] = GFPGANer(
+            model_path=model_path, upscale=upscale, arch=arch,
+            channel_multiplier=channel_multiplier, bg_upsampler=bg_upsampler,
         )
+    return restorers[key]
 
-        if chunk_path.exists():
-            chunks.append(chunk_path)
-            log(f"  Chunk {chunk_idx}: {start:.1f}s - {end:.1f}s")
 
-        start = end
-        chunk_idx += 1
+def load_sadtalker_models(size: int = 256, preprocess: str = "crop", enhancer: str = "gfpgan") -> tuple[dict, float]:
+    """Load the SadTalker networks for this size/preprocess on first use.
 
-    log(f"Split into {len(chunks)} chunks")
-    return chunks
+    Returns (models, seconds spent loading now). The checkpoints depend on the
+    output size and on whether preprocess is "full", so asking for another
+    combination replaces the resident set rather than adding to it.
+    """
+    with _models_lock:
+        return _load_sadtalker_models(size, preprocess, enhancer)
+
+
+def _load_sadtalker_models(size: int, preprocess: str, enhancer: str) -> tuple[dict, float]:
+    global _sadtalker_models
+    key = (size, "full" in preprocess)
+    start = time.time()
+
+    if _sadtalker_models is None or _sadtalker_models["key"] != key:
+        # SadTalker resolves gfpgan/weights and its configs relative to its checkout
+        os.chdir(SADTALKER_DIR)
+        if str(SADTALKER_DIR) not in sys.path:
+            sys.path.insert(0, str(SADTALKER_DIR))
+        import torch
+        from src.facerender.animate import AnimateFromCoeff
+        from src.test_audio2coeff import Audio2Coeff
+        from src.utils import face_enhancer
+        from src.utils.init_path import init_path
+        from src.utils.preprocess import CropAndExtract
+
+        face_enhancer.GFPGANer = _cached_gfpganer
+        _sadtalker_models = None
+        torch.cuda.empty_cache()
+
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        paths = init_path(str(CHECKPOINT_DIR), str(SADTALKER_DIR / "src" / "config"), size, False, preprocess)
+        _sadtalker_models = {
+            "key": key,
+            "device": device,
+            "preprocess": CropAndExtract(paths, device),
+            "audio_to_coeff": Audio2Coeff(paths, device),
+            "animate": AnimateFromCoeff(paths, device),
+        }
+
+    if enhancer == "gfpgan":
+        _gfpgan_restorer()
+
+    elapsed = time.time() - start
+    if elapsed > 0.5:
+        log(f"SadTalker models loaded in {elapsed:.1f}s (size={size}, preprocess={preprocess})")
+    return _sadtalker_models, elapsed
 
 
-# Global to store last error for better reporting
-_last_sadtalker_error = None
+# Source-face cache. Face detection, cropping and 3DMM extraction depend only on
+# the portrait, the size and the preprocess mode, so their output is kept per
+# image hash on the worker's disk and, when the job opts in with face_cache,
+# under cache/ in R2, where the client's cache sweep expires it. R2 hits are
+# copied onto themselves so faces still in use keep outliving the TTL.
+FACE_CACHE_DIR = Path(os.environ.get("SADTALKER_FACE_CACHE_DIR", "/tmp/sadtalker-faces"))
+FACE_CACHE_R2_PREFIX = "cache/sadtalker-faces/"
+FACE_CACHE_FILES = ("coeff.mat", "face.png", "crop_info.json")
+
+_face_lock = threading.Lock()
+
+
+def _touch_r2_object(client, bucket: str, key: str):
+    """Restart an object's LastModified, keeping its content type and metadata."""
+    head = client.head_object(Bucket=bucket, Key=key)
+    client.copy_object(
+        Bucket=bucket,
+        Key=key,
+        CopySource={"Bucket": bucket, "Key": key},
+        MetadataDirective="REPLACE",
+        Metadata=head.get("Metadata", {}),
+        ContentType=head.get("ContentType", "binary/octet-stream"),
+    )
+
+
+def _load_cached_face(face_dir: Path) -> Optional[tuple]:
+    if not all((face_dir / name).exists() for name in FACE_CACHE_FILES):
+        return None
+    crop_info = json.loads((face_dir / "crop_info.json").read_text())
+    return str(face_dir / "coeff.mat"), str(face_dir / "face.png"), crop_info
+
+
+def prepare_source_face(
+    models: dict,
+    image_path: Path,
+    size: int,
+    preprocess: str,
+    r2_config: Optional[dict] = None,
+) -> tuple[tuple, str]:
+    """Cropped face, crop info and 3DMM coefficients for the portrait.
+
+    Returns ((first_coeff_path, crop_pic_path, crop_info), source), where
+    source is "worker", "r2" or "computed".
+    """
+    cache_id = f"{file_sha256(image_path)}/{size}-{preprocess}"
+    with _face_lock:  # concurrent chunks of one job wait for the first to preprocess
+        return _prepare_source_face(models, image_path, size, preprocess, r2_config, cache_id)
+
+
+def _prepare_source_face(models, image_path, size, preprocess, r2_config, cache_id) -> tuple[tuple, str]:
+    face_dir = FACE_CACHE_DIR / cache_id
+    face = _load_cached_face(face_dir)
+    if face:
+        return face, "worker"
+
+    FACE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    face_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=FACE_CACHE_DIR))
+    r2_prefix = FACE_CACHE_R2_PREFIX + cache_id
+    if r2_config:
+        try:
+            client = _r2_client(r2_config)
+            for name in FACE_CACHE_FILES:
+                client.download_file(r2_config["bucket_name"], f"{r2_prefix}/{name}", str(staging / name))
+            staging.replace(face_dir)
+        except Exception:
+            # Not persisted yet, or R2 unreachable: compute it here
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir()
+        else:
+            try:
+                for name in FACE_CACHE_FILES:
+                    _touch_r2_object(client, r2_config["bucket_name"], f"{r2_prefix}/{name}")
+            except Exception as e:
+                log(f"Could not refresh cached source face in R2: {e}")
+            return _load_cached_face(face_dir), "r2"
+
+    first_coeff_path, crop_pic_path, crop_info = models["preprocess"].generate(
+        str(image_path), str(staging), preprocess, source_image_flag=True, pic_size=size,
+    )
+    if first_coeff_path is None:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise RuntimeError("Can't get the coeffs of the input image (no face found?)")
+
+    Path(first_coeff_path).replace(staging / "coeff.mat")
+    Path(crop_pic_path).replace(staging / "face.png")
+    (staging / "crop_info.json").write_text(
+        json.dumps(crop_info, default=lambda value: value.tolist())  # numpy values
+    )
+    for extra in staging.iterdir():
+        if extra.name not in FACE_CACHE_FILES:
+            shutil.rmtree(extra) if extra.is_dir() else extra.unlink()
+    try:
+        staging.replace(face_dir)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)  # another job cached it first
+
+    if r2_config:
+        try:
+            client = _r2_client(r2_config)
+            for name in FACE_CACHE_FILES:
+                client.upload_file(str(face_dir / name), r2_config["bucket_name"], f"{r2_prefix}/{name}")
+        except Exception as e:
+            log(f"Could not persist source face to R2: {e}")
+
+    return _load_cached_face(face_dir), "computed"
+
+
+# Batched GFPGAN stage. SadTalker's own enhancer detects the face and runs
+# GFPGAN one frame at a time; instead the handler renders without it and
+# restores the frames here, ENHANCE_BATCH aligned faces per GFPGAN call.
+ENHANCE_BATCH = int(os.environ.get("SADTALKER_ENHANCE_BATCH", "8"))
+ENHANCE_UPSCALE = 2            # SadTalker's GFPGANer(upscale=2)
+ENHANCE_REALIGN_EVERY = 25     # frames between face detections; the portrait barely moves
+ENHANCE_SKIP_THRESHOLD = 1.5   # mean abs difference (0-255) below which a restored face is reused
+# Mouth and eye regions of the 512px FFHQ-aligned face GFPGAN works on
+ENHANCE_WATCH_REGIONS = (
+    (slice(330, 430), slice(170, 345)),
+    (slice(205, 275), slice(150, 360)),
+)
+
+
+def _gfpgan_restorer():
+    """This thread's GFPGANer, with the arguments SadTalker uses for "gfpgan"."""
+    return _cached_gfpganer(GFPGAN_WEIGHTS, ENHANCE_UPSCALE, "clean", 2)
+
+
+def enhance_video(video_path: Path, output_path: Path, skip_static: bool = True) -> dict:
+    """Restore the face in every frame of a rendered chunk with GFPGAN, in batches.
+
+    Landmarks are detected every ENHANCE_REALIGN_EVERY frames and the
+    alignment is reused in between. With ``skip_static``, a frame whose mouth
+    and eyes barely differ from the last restored face reuses that face
+    instead of going through GFPGAN. The audio is copied from video_path.
+    Returns frame counts.
+    """
+    import cv2
+    import numpy as np
+    import torch
+    from basicsr.utils import img2tensor, tensor2img
+    from torchvision.transforms.functional import normalize
+
+    restorer = _gfpgan_restorer()
+    helper = restorer.face_helper
+    capture = cv2.VideoCapture(str(video_path))
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25
+    width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)) * ENHANCE_UPSCALE
+    height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)) * ENHANCE_UPSCALE
+    encoder = subprocess.Popen(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "pipe:0",
+            "-i", str(video_path),
+            "-map", "0:v", "-map", "1:a?",
+            "-c:v", "libx264", "-preset", "medium", "-crf", "18", "-pix_fmt", "yuv420p",
+            "-c:a", "copy", "-shortest",
+            str(output_path),
+        ],
+        stdin=subprocess.PIPE,
+    )
+
+    stats = {"frames": 0, "restored": 0, "reused": 0}
+    pending: list[dict] = []
+    affine = inverse = last_restored = None
+
+    def flush() -> None:
+        todo = [entry for entry in pending if entry.get("aligned") is not None]
+        if todo:
+            batch = []
+            for entry in todo:
+                tensor = img2tensor(entry["aligned"] / 255.0, bgr2rgb=True, float32=True)
+                normalize(tensor, (0.5, 0.5, 0.5), (0.5, 0.5, 0.5), inplace=True)
+                batch.append(tensor)
+            with torch.no_grad():
+                output = restorer.gfpgan(torch.stack(batch).to(restorer.device), return_rgb=False, weight=0.5)[0]
+            for entry, face in zip(todo, output):
+                entry["restored"] = tensor2img(face, rgb2bgr=True, min_max=(-1, 1)).astype("uint8")
+                entry["aligned"] = None
+
+        for entry in pending:
+            frame = entry["frame"]
+            upscaled = cv2.resize(frame, (width, height), interpolation=cv2.INTER_LANCZOS4)
+            if entry["inverse"] is not None:
+                helper.clean_all()
+                helper.read_image(frame)
+                helper.restored_faces = [entry["source"]["restored"]]
+                helper.inverse_affine_matrices = [entry["inverse"]]
+                upscaled = helper.paste_faces_to_input_image(upsample_img=upscaled)
+            encoder.stdin.write(np.ascontiguousarray(upscaled, dtype=np.uint8).tobytes())
+        pending.clear()
+
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            entry = {"frame": frame, "inverse": None}
+
+            if stats["frames"] % ENHANCE_REALIGN_EVERY == 0:
+                helper.clean_all()
+                helper.read_image(frame)
+                if helper.get_face_landmarks_5(only_center_face=True, eye_dist_threshold=5):
+                    helper.align_warp_face()
+                    helper.get_inverse_affine(None)
+                    affine, inverse = helper.affine_matrices[0], helper.inverse_affine_matrices[0]
+                    last_restored = None  # a new alignment invalidates the comparison
+
+            if affine is not None:
+                aligned = cv2.warpAffine(
+                    frame, affine, helper.face_size,
+                    borderMode=cv2.BORDER_CONSTANT, borderValue=(135, 133, 132),
+                )
+                gray = cv2.cvtColor(aligned, cv2.COLOR_BGR2GRAY).astype(np.int16)
+                watch = [gray[region] for region in ENHANCE_WATCH_REGIONS]
+                entry["inverse"] = inverse
+                if skip_static and last_restored is not None and max(
+                    np.abs(current - previous).mean() for current, previous in zip(watch, last_restored["watch"])
+                ) < ENHANCE_SKIP_THRESHOLD:
+                    entry["source"] = last_restored
+                    stats["reused"] += 1
+                else:
+                    entry.update(aligned=aligned, watch=watch)
+                    entry["source"] = entry
+                    last_restored = entry
+                    stats["restored"] += 1
+
+            pending.append(entry)
+            stats["frames"] += 1
+            if len(pending) >= ENHANCE_BATCH:
+                flush()
+        flush()
+    finally:
+        capture.release()
+        encoder.stdin.close()
+        encoder.wait()
+
+    if encoder.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to encode {output_path.name}")
+    return stats
+
+
+def _render_in_process(
+    models: dict,
+    image_path: Path,
+    audio_path: Path,
+    output_dir: Path,
+    still_mode: bool,
+    enhancer: str,
+    preprocess: str,
+    size: int,
+    expression_scale: float,
+    pose_style: int,
+    face: tuple,
+) -> Path:
+    """inference.py's main() on already-loaded models and a prepared source face."""
+    from src.generate_batch import get_data
+    from src.generate_facerender_batch import get_facerender_data
+
+    device = models["device"]
+    first_coeff_path, crop_pic_path, crop_info = face
+    batch = get_data(first_coeff_path, str(audio_path), device, None, still=still_mode)
+    coeff_path = models["audio_to_coeff"].generate(batch, str(output_dir), pose_style, None)
+
+    data = get_facerender_data(
+        coeff_path, crop_pic_path, first_coeff_path, str(audio_path), SADTALKER_BATCH_SIZE,
+        None, None, None,
+        expression_scale=expression_scale, still_mode=still_mode, preprocess=preprocess, size=size,
+    )
+    result = models["animate"].generate(
+        data, str(output_dir), str(image_path), crop_info,
+        enhancer=None if enhancer == "none" else enhancer,
+        background_enhancer=None, preprocess=preprocess, img_size=size,
+    )
+    return Path(result)
+
+
+def render_slots(chunk_count: int, size: int, enhancer: str, in_process: bool) -> int:
+    """How many chunks to render at once, from the GPU memory still free."""
+    try:
+        import torch
+        free_gb = torch.cuda.mem_get_info()[0] / 1024**3
+    except Exception:
+        return 1
+    per_render = RENDER_VRAM_GB.get(size, RENDER_VRAM_GB[512])
+    if enhancer != "none":
+        per_render += GFPGAN_VRAM_GB
+    if not in_process:
+        per_render += SUBPROCESS_VRAM_GB
+    slots = max(1, int((free_gb - VRAM_HEADROOM_GB) // per_render))
+    if MAX_CONCURRENCY > 0:
+        slots = min(slots, MAX_CONCURRENCY)
+    return max(1, min(slots, chunk_count))
+
+
+# Rendering threads outlive jobs so their GFPGAN restorers stay loaded
+_render_pool: Optional[ThreadPoolExecutor] = None
+_render_pool_size = 0
+
+
+def get_render_pool(slots: int) -> ThreadPoolExecutor:
+    global _render_pool, _render_pool_size
+    if _render_pool is None or _render_pool_size < slots:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False)
+        _render_pool = ThreadPoolExecutor(max_workers=slots, thread_name_prefix="render")
+        _render_pool_size = slots
+    return _render_pool
 
 
 def run_sadtalker(
@@ -191,23 +605,79 @@ def run_sadtalker(
     size: int = 256,
     expression_scale: float = 1.0,
     pose_style: int = 0,
+    timings: Optional[dict] = None,
+    r2_config: Optional[dict] = None,
+    enhance_skip_static: bool = True,
 ) -> Optional[Path]:
-    """Run SadTalker inference on a single image/audio pair."""
-    global _last_sadtalker_error
-    _last_sadtalker_error = None
+    """Run SadTalker inference on a single image/audio pair.
+
+    Renders with the worker's resident models unless SADTALKER_IN_PROCESS=0 or
+    they fail to load; "gfpgan" enhancement then runs as the batched
+    enhance_video stage. ``timings`` accumulates model_load_seconds,
+    render_seconds and enhance_seconds across calls, and records where the
+    source face came from. With ``r2_config`` the preprocessed face is also
+    looked up in and saved to R2.
+    """
+    _render_state.error = None
+    timings = timings if timings is not None else {}
 
     # Verify checkpoints exist
     if not CHECKPOINT_DIR.exists():
-        _last_sadtalker_error = f"Checkpoint dir not found: {CHECKPOINT_DIR}"
-        log(_last_sadtalker_error)
+        _render_state.error = f"Checkpoint dir not found: {CHECKPOINT_DIR}"
+        log(_render_state.error)
         return None
 
     bfm_dir = CHECKPOINT_DIR / "BFM_Fitting"
     if not bfm_dir.exists():
-        _last_sadtalker_error = f"BFM_Fitting dir not found: {bfm_dir}"
-        log(_last_sadtalker_error)
+        _render_state.error = f"BFM_Fitting dir not found: {bfm_dir}"
+        log(_render_state.error)
         return None
 
+    if SADTALKER_IN_PROCESS:
+        try:
+            models, load_seconds = load_sadtalker_models(size, preprocess, enhancer)
+        except Exception as e:
+            log(f"Could not load SadTalker in-process ({e}), falling back to inference.py")
+            models = None
+        if models:
+            timings["model_load_seconds"] = round(timings.get("model_load_seconds", 0) + load_seconds, 2)
+            timings["in_process"] = True
+            start = time.time()
+            try:
+                face, source = prepare_source_face(models, image_path, size, preprocess, r2_config)
+                timings.setdefault("source_face", source)
+                video = _render_in_process(
+                    models, image_path, audio_path, output_dir, still_mode,
+                    "none" if enhancer == "gfpgan" else enhancer,
+                    preprocess, size, expression_scale, pose_style, face,
+                )
+                timings["render_seconds"] = round(timings.get("render_seconds", 0) + time.time() - start, 2)
+                log(f"Rendered {video.name} in {time.time() - start:.1f}s")
+
+                if enhancer == "gfpgan":
+                    start = time.time()
+                    enhanced = output_dir / f"{video.stem}_enhanced.mp4"
+                    stats = enhance_video(video, enhanced, enhance_skip_static)
+                    video = enhanced
+                    timings["enhance_seconds"] = round(timings.get("enhance_seconds", 0) + time.time() - start, 2)
+                    for name, count in stats.items():
+                        timings[f"enhance_{name}"] = timings.get(f"enhance_{name}", 0) + count
+                    log(
+                        f"Enhanced {stats['frames']} frames in {time.time() - start:.1f}s "
+                        f"({stats['reused']} reused a previous face)"
+                    )
+            except Exception as e:
+                import traceback
+                _render_state.error = f"Exception: {e}"
+                log(f"SadTalker exception: {e}")
+                log(traceback.format_exc())
+                return None
+            return video
+
+    timings["in_process"] = False
+    timings["model_load_seconds"] = None  # paid inside every inference.py run
+    subprocess_start = time.time()
+
     cmd = [
         "python", str(SADTALKER_DIR / "inference.py"),
         "--driven_audio", str(audio_path),
@@ -239,6 +709,7 @@ def run_sadtalker(
             text=True,
             timeout=600,  # 10 min timeout per chunk
         )
+        timings["render_seconds"] = round(timings.get("render_seconds", 0) + time.time() - subprocess_start, 2)
 
         # Log stdout/stderr regardless of return code
         if result.stdout:
@@ -247,8 +718,8 @@ def run_sadtalker(
             log(f"SadTalker stderr: {result.stderr[-1000:]}")
 
         if result.returncode != 0:
-            _last_sadtalker_error = f"Exit code {result.returncode}: {result.stderr[-500:]}"
-            log(f"SadTalker failed: {_last_sadtalker_error}")
+            _render_state.error = f"Exit code {result.returncode}: {result.stderr[-500:]}"
+            log(f"SadTalker failed: {_render_state.error}")
             return None
 
         # Debug: List all files in output directory
@@ -274,40 +745,40 @@ def run_sadtalker(
                     log(f"Found video (subdir): {f}")
                     return f
 
-        _last_sadtalker_error = f"No output video found. All files: {list(output_dir.rglob('*'))}"
-        log(_last_sadtalker_error)
+        _render_state.error = f"No output video found. All files: {list(output_dir.rglob('*'))}"
+        log(_render_state.error)
         return None
 
     except subprocess.TimeoutExpired:
-        _last_sadtalker_error = "SadTalker timed out after 600s"
-        log(_last_sadtalker_error)
+        _render_state.error = "SadTalker timed out after 600s"
+        log(_render_state.error)
         return None
     except Exception as e:
-        _last_sadtalker_error = f"Exception: {e}"
+        _render_state.error = f"Exception: {e}"
         log(f"SadTalker exception: {e}")
         return None
 
 
+def concat_args(video_paths: list[Path], work_dir: Path) -> list[str]:
+    """ffmpeg input arguments that stream-copy the chunk videos back to back."""
+    concat_file = work_dir / "concat.txt"
+    with open(concat_file, "w") as f:
+        for vp in video_paths:
+            f.write(f"file '{vp}'\n")
+    return ["-f", "concat", "-safe", "0", "-i", str(concat_file), "-c", "copy"]
+
+
 def concatenate_videos(video_paths: list[Path], output_path: Path) -> bool:
     """Concatenate multiple videos using ffmpeg."""
     if len(video_paths) == 1:
         shutil.copy(video_paths[0], output_path)
         return True
 
-    # Create concat file
-    concat_file = output_path.parent / "concat.txt"
-    with open(concat_file, "w") as f:
-        for vp in video_paths:
-            f.write(f"file '{vp}'\n")
-
     try:
         subprocess.run(
             [
                 "ffmpeg", "-y",
-                "-f", "concat",
-                "-safe", "0",
-                "-i", str(concat_file),
-                "-c", "copy",
+                *concat_args(video_paths, output_path.parent),
                 str(output_path),
             ],
             capture_output=True,
@@ -320,29 +791,54 @@ def concatenate_videos(video_paths: list[Path], output_path: Path) -> bool:
         return False
 
 
+def file_sha256(file_path) -> str:
+    """SHA-256 of a file, stored as R2 metadata so clients can verify downloads."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _r2_client(r2_config: dict):
+    """boto3 S3 client for the R2 credentials passed with the job."""
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        endpoint_url=r2_config["endpoint_url"],
+        aws_access_key_id=r2_config["access_key_id"],
+        aws_secret_access_key=r2_config["secret_access_key"],
+        config=Config(signature_version="s3v4"),
+    )
+
+
+def _result_key(job_id: str, r2_config: dict) -> str:
+    """The client's output_key if it chose one, else a fresh results/ key."""
+    return r2_config.get("output_key") or f"sadtalker/results/{job_id}_{uuid.uuid4().hex[:8]}.mp4"
+
+
 def upload_to_r2(file_path: Path, job_id: str, r2_config: dict) -> tuple[Optional[str], Optional[str]]:
     """Upload video to Cloudflare R2 and return (presigned_url, object_key)."""
     try:
-        import boto3
-        from botocore.config import Config
+        from boto3.s3.transfer import TransferConfig
 
         log("Uploading to R2...")
 
-        client = boto3.client(
-            "s3",
-            endpoint_url=r2_config["endpoint_url"],
-            aws_access_key_id=r2_config["access_key_id"],
-            aws_secret_access_key=r2_config["secret_access_key"],
-            config=Config(signature_version="s3v4"),
-        )
-
-        object_key = f"sadtalker/results/{job_id}_{uuid.uuid4().hex[:8]}.mp4"
+        client = _r2_client(r2_config)
+        object_key = _result_key(job_id, r2_config)
 
         client.upload_file(
             str(file_path),
             r2_config["bucket_name"],
             object_key,
-            ExtraArgs={"ContentType": "video/mp4"},
+            ExtraArgs={"ContentType": "video/mp4", "Metadata": {"sha256": file_sha256(file_path)}},
+            Config=TransferConfig(
+                multipart_threshold=TRANSFER_PART_SIZE,
+                multipart_chunksize=TRANSFER_PART_SIZE,
+                max_concurrency=TRANSFER_CONCURRENCY,
+            ),
         )
 
         presigned_url = client.generate_presigned_url(
@@ -358,6 +854,111 @@ def upload_to_r2(file_path: Path, job_id: str, r2_config: dict) -> tuple[Optiona
         return None, None
 
 
+def stream_ffmpeg_to_r2(ffmpeg_args: list[str], job_id: str, r2_config: dict) -> tuple[Optional[str], Optional[str]]:
+    """Encode a fragmented MP4 to ffmpeg's stdout and upload it to R2 as it is produced.
+
+    Each TRANSFER_PART_SIZE block goes up as a multipart part while ffmpeg keeps
+    writing, so the upload ends right after the encode and the result never
+    touches local disk. The SHA-256 is computed over the parts as they are
+    read and stored as the object's sha256 metadata, like every other upload.
+    Returns (presigned_url, object_key).
+    """
+    cmd = [
+        "ffmpeg", "-y",
+        *ffmpeg_args,
+        "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+        "-f", "mp4",
+        "pipe:1",
+    ]
+    client = _r2_client(r2_config)
+    bucket = r2_config["bucket_name"]
+    object_key = _result_key(job_id, r2_config)
+    upload_id = None
+    digest = hashlib.sha256()
+
+    log("Streaming result to R2...")
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+        try:
+            data = proc.stdout.read(TRANSFER_PART_SIZE)
+            digest.update(data)
+            if len(data) < TRANSFER_PART_SIZE:
+                # Everything fit in one part
+                if proc.wait() != 0:
+                    raise RuntimeError(f"ffmpeg exited with {proc.returncode}")
+                client.put_object(
+                    Bucket=bucket,
+                    Key=object_key,
+                    Body=data,
+                    ContentType="video/mp4",
+                    Metadata={"sha256": digest.hexdigest()},
+                )
+            else:
+                upload_id = client.create_multipart_upload(
+                    Bucket=bucket, Key=object_key, ContentType="video/mp4"
+                )["UploadId"]
+                futures = []
+                with ThreadPoolExecutor(max_workers=TRANSFER_CONCURRENCY) as pool:
+                    while data:
+                        futures.append(pool.submit(
+                            client.upload_part,
+                            Bucket=bucket,
+                            Key=object_key,
+                            UploadId=upload_id,
+                            PartNumber=len(futures) + 1,
+                            Body=data,
+                            ContentMD5=base64.b64encode(hashlib.md5(data).digest()).decode(),
+                        ))
+                        # Bound memory to the parts actually in flight
+                        in_flight = [f for f in futures if not f.done()]
+                        if len(in_flight) >= TRANSFER_CONCURRENCY:
+                            wait(in_flight, return_when=FIRST_COMPLETED)
+                        data = proc.stdout.read(TRANSFER_PART_SIZE)
+                        digest.update(data)
+                    parts = [
+                        {"PartNumber": n, "ETag": f.result()["ETag"]}
+                        for n, f in enumerate(futures, start=1)
+                    ]
+                if proc.wait() != 0:
+                    raise RuntimeError(f"ffmpeg exited with {proc.returncode}")
+                client.complete_multipart_upload(
+                    Bucket=bucket,
+                    Key=object_key,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+                upload_id = None  # completed; nothing left to abort
+                # The digest is only known once the stream has ended
+                client.copy_object(
+                    Bucket=bucket,
+                    Key=object_key,
+                    CopySource={"Bucket": bucket, "Key": object_key},
+                    MetadataDirective="REPLACE",
+                    ContentType="video/mp4",
+                    Metadata={"sha256": digest.hexdigest()},
+                )
+        except Exception as e:
+            proc.kill()
+            proc.wait()
+            if upload_id:
+                try:
+                    client.abort_multipart_upload(Bucket=bucket, Key=object_key, UploadId=upload_id)
+                except Exception:
+                    pass
+            stderr.seek(0)
+            log(f"Error streaming to R2: {e}")
+            log(stderr.read()[-2000:].decode(errors="replace"))
+            return None, None
+
+    presigned_url = client.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": bucket, "Key": object_key},
+        ExpiresIn=7200,
+    )
+    log(f"  R2 upload complete: {object_key}")
+    return presigned_url, object_key
+
+
 def handler(job: dict) -> dict:
     """Main RunPod handler for SadTalker."""
     job_id = job.get("id", "unknown")
@@ -370,6 +971,11 @@ def handler(job: dict) -> dict:
     work_dir = Path(tempfile.mkdtemp(prefix=f"sadtalker_{job_id}_"))
     log(f"Working directory: {work_dir}")
 
+    # Renders on the shared pool can outlive a failed job; they check this and
+    # are waited for before work_dir goes away
+    cancelled = threading.Event()
+    futures = []
+
     try:
         # Get image
         image_path = work_dir / "input_image.png"
@@ -401,18 +1007,22 @@ def handler(job: dict) -> dict:
         expression_scale = job_input.get("expression_scale", 1.0)
         pose_style = job_input.get("pose_style", 0)
         r2_config = job_input.get("r2")
+        face_cache_r2 = r2_config if job_input.get("face_cache", False) else None
+        enhance_skip_static = job_input.get("enhance_skip_static", True)
 
         # Split audio into chunks if needed
         audio_chunks = split_audio_chunks(audio_path, work_dir)
+        if not audio_chunks:
+            return {"error": "Failed to split audio into chunks"}
         total_duration = get_audio_duration(audio_path)
 
-        # Process each chunk
-        video_chunks = []
-        for i, chunk_path in enumerate(audio_chunks):
+        def render_chunk(i: int, chunk_path: Path) -> tuple[Optional[Path], dict, Optional[str]]:
+            if cancelled.is_set():
+                return None, {}, "cancelled"
             log(f"Processing chunk {i + 1}/{len(audio_chunks)}...")
             chunk_output_dir = work_dir / f"output_{i:03d}"
             chunk_output_dir.mkdir()
-
+            chunk_timings = {}
             video_path = run_sadtalker(
                 image_path=image_path,
                 audio_path=chunk_path,
@@ -423,21 +1033,47 @@ def handler(job: dict) -> dict:
                 size=size,
                 expression_scale=expression_scale,
                 pose_style=pose_style,
+                timings=chunk_timings,
+                r2_config=face_cache_r2,
+                enhance_skip_static=enhance_skip_static,
             )
-
-            if video_path:
-                video_chunks.append(video_path)
-                log(f"  Chunk {i + 1} complete: {video_path.name}")
+            return video_path, chunk_timings, _render_state.error
+
+        # The first chunk loads models and preprocesses the face; the GPU memory
+        # left after that decides how many of the others render at once
+        first = render_chunk(0, audio_chunks[0])
+        if not first[0]:
+            return {"error": f"Failed to process chunk 1: {first[2] or 'Unknown error'}"}
+        slots = render_slots(len(audio_chunks) - 1, size, enhancer, bool(first[1].get("in_process")))
+        if len(audio_chunks) > 1:
+            log(f"Rendering {len(audio_chunks) - 1} more chunks, {slots} at a time")
+        pool = get_render_pool(slots) if slots > 1 else None
+        futures += [
+            pool.submit(render_chunk, i, chunk_path) if pool else None
+            for i, chunk_path in enumerate(audio_chunks[1:], start=1)
+        ]
+
+        timings = {}
+        video_chunks = []
+        for i, chunk_path in enumerate(audio_chunks):
+            if i == 0:
+                video_path, chunk_timings, error = first
+            elif futures[i - 1] is not None:
+                video_path, chunk_timings, error = futures[i - 1].result()
             else:
-                error_detail = _last_sadtalker_error or "Unknown error"
-                return {"error": f"Failed to process chunk {i + 1}: {error_detail}"}
-
-        # Concatenate chunks
-        final_video = work_dir / "final_output.mp4"
-        if not concatenate_videos(video_chunks, final_video):
-            return {"error": "Failed to concatenate video chunks"}
-
-        log(f"Final video: {final_video} ({final_video.stat().st_size // 1024}KB)")
+                video_path, chunk_timings, error = render_chunk(i, chunk_path)
+
+            if not video_path:
+                return {"error": f"Failed to process chunk {i + 1}: {error or 'Unknown error'}"}
+            video_chunks.append(video_path)
+            log(f"  Chunk {i + 1} complete: {video_path.name}")
+            timings.setdefault("source_face", chunk_timings.get("source_face"))
+            timings["in_process"] = chunk_timings.get("in_process")
+            for name in ("model_load_seconds", "render_seconds", "enhance_seconds",
+                         "enhance_frames", "enhance_restored", "enhance_reused"):
+                if chunk_timings.get(name) is not None:
+                    timings[name] = round(timings.get(name, 0) + chunk_timings[name], 2)
+        timings["concurrency"] = slots
 
         elapsed = time.time() - start_time
 
@@ -445,18 +1081,34 @@ def handler(job: dict) -> dict:
             "success": True,
             "duration_seconds": total_duration,
             "chunks_processed": len(audio_chunks),
+            "model_load_seconds": timings.get("model_load_seconds"),
+            "render_seconds": timings.get("render_seconds"),
+            "enhance_seconds": timings.get("enhance_seconds"),
+            "in_process": timings.get("in_process"),
+            "source_face": timings.get("source_face"),
+            "concurrency": timings["concurrency"],
+            "frames_enhanced": timings.get("enhance_restored"),
+            "frames_reused": timings.get("enhance_reused"),
             "processing_time_seconds": round(elapsed, 2),
         }
 
-        # Upload to R2 if configured
+        # Upload to R2 if configured; chunks are concatenated straight into the upload
         if r2_config:
-            url, r2_key = upload_to_r2(final_video, job_id, r2_config)
+            if len(video_chunks) == 1:
+                url, r2_key = upload_to_r2(video_chunks[0], job_id, r2_config)
+            else:
+                url, r2_key = stream_ffmpeg_to_r2(concat_args(video_chunks, work_dir), job_id, r2_config)
             if url:
                 result["video_url"] = url
                 result["r2_key"] = r2_key
             else:
                 return {"error": "Failed to upload to R2"}
         else:
+            final_video = work_dir / "final_output.mp4"
+            if not concatenate_videos(video_chunks, final_video):
+                return {"error": "Failed to concatenate video chunks"}
+            log(f"Final video: {final_video} ({final_video.stat().st_size // 1024}KB)")
+
             # Return video as base64 (warning: large!)
             result["video_base64"] = encode_file_base64(final_video)
             log("Warning: Returning video as base64 (consider using R2 for large files)")
@@ -469,6 +1121,12 @@ def handler(job: dict) -> dict:
         log(traceback.format_exc())
         return {"error": f"Internal error: {str(e)}"}
     finally:
+        cancelled.set()
+        pending = [f for f in futures if f is not None and not f.cancel()]
+        if pending:
+            log(f"Waiting for {len(pending)} in-flight chunk renders")
+            wait(pending)
+
         # Cleanup temp files
         try:
             shutil.rmtree(work_dir, ignore_errors=True)
@@ -503,4 +1161,11 @@ if __name__ == "__main__":
     except ImportError:
         log("Warning: torch not imported for CUDA check")
 
+    if SADTALKER_IN_PROCESS:
+        # Load the default size/preprocess set during cold start
+        try:
+            load_sadtalker_models()
+        except Exception as e:
+            log(f"Model preload failed ({e}); jobs will use inference.py")
+
     runpod.serverless.start({"handler": handler})
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from dewatermark import _worker_slot_env, plan_chunk_workers, plan_presence_chunks
+
+
+def output_seconds(chunks):
+    return sum(chunk["trim_end"] - chunk["trim_start"] for chunk in chunks)
+
+
+def test_presence_chunks_ignore_cached_window_outside_range():
+    cached = [{"start": 0, "end": 30, "path": "/c/0.mp4"}]
+    chunks = plan_presence_chunks(60.0, [(10.0, 25.0)], 30.0, 5.0, "/src.mp4", cached, None)
+
+    assert not any(chunk["cached"] for chunk in chunks)
+    assert abs(output_seconds(chunks) - 60.0) < 1e-6
+    starts = [chunk["start"] + chunk["trim_start"] for chunk in chunks]
+    ends = [chunk["start"] + chunk["trim_end"] for chunk in chunks]
+    assert starts[0] == 0.0 and ends[-1] == 60.0
+    assert all(abs(end - start) < 1e-6 for end, start in zip(ends, starts[1:]))
+
+
+def test_presence_chunks_reuse_cached_window_inside_range():
+    cached = [{"start": 10, "end": 25, "path": "/c/1.mp4"}]
+    chunks = plan_presence_chunks(60.0, [(10.0, 25.0)], 30.0, 5.0, "/src.mp4", cached, None)
+
+    assert [chunk["cached"] for chunk in chunks] == [False, True, False]
+    assert abs(output_seconds(chunks) - 60.0) < 1e-6
+
+
+def test_chunk_workers_fit_per_process_memory(monkeypatch):
+    monkeypatch.setattr("os.cpu_count", lambda: 32)
+    model = {"base_bytes": 3 * 1024 ** 3, "bytes_per_pixel_frame": 40}
+    video = {"duration": 600.0, "width": 1280, "height": 720, "fps": 30.0}
+    plan = plan_chunk_workers({"device": "cpu", "memory_gb": 256}, video, 170.0, 2.0, None, model)
+
+    assert plan["workers"] > 1
+    assert plan["workers"] * plan["chunk_memory_gb"] <= 256 * 0.7
+
+
+def test_worker_slots_keep_user_cuda_devices(monkeypatch):
+    monkeypatch.setenv("CUDA_VISIBLE_DEVICES", "2,3")
+    video = {"duration": 600.0, "width": 1280, "height": 720, "fps": 30.0}
+    plan = plan_chunk_workers({"device": "cuda", "gpu_count": 4}, video, 120.0, 2.0)
+
+    assert plan["workers"] == 2
+    assert [_worker_slot_env(slot, plan, "cuda")[0]["CUDA_VISIBLE_DEVICES"] for slot in range(2)] == ["2", "3"]
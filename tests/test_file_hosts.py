@@ -0,0 +1,115 @@
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from file_hosts import MB, FileHost, hedged_upload
+
+# Larger than the loopback socket buffers, so a host that stops reading stops
+# the upload's progress instead of swallowing the whole body
+FILE_SIZE = 32 * MB
+
+
+class _Hosts(BaseHTTPRequestHandler):
+    """Routes: /fast reads the body at once, /slow trickles it, /stall never reads."""
+
+    hits: list = []
+    aborted: list = []
+    release = threading.Event()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        route = self.path.strip("/")
+        self.hits.append(route)
+        remaining = int(self.headers["Content-Length"])
+        if route == "stall":
+            self.release.wait(30)
+            return
+        while remaining:
+            chunk = self.rfile.read(min(remaining, 64 * 1024 if route == "slow" else MB))
+            if not chunk:
+                self.aborted.append(route)
+                return
+            remaining -= len(chunk)
+            if route == "slow":
+                time.sleep(0.05)
+        body = f"http://{self.headers['Host']}/{route}-file".encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    _Hosts.hits, _Hosts.aborted = [], []
+    _Hosts.release.clear()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Hosts)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    _Hosts.release.set()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(scope="module")
+def upload_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("upload") / "clip.bin"
+    path.write_bytes(b"\0" * FILE_SIZE)
+    return str(path)
+
+
+def host(server, route, max_bytes=1024 * MB):
+    return FileHost(route, f"{server}/{route}", max_bytes)
+
+
+def test_skips_host_too_small_for_file(server, upload_file):
+    hosts = [FileHost("tiny", f"{server}/tiny", 1 * MB), host(server, "fast")]
+    url, name = hedged_upload(upload_file, hosts, verbose=False)
+
+    assert (url, name) == (f"{server}/fast-file", "fast")
+    assert _Hosts.hits == ["fast"]
+
+
+def test_slow_host_gets_hedged_and_first_url_wins(server, upload_file):
+    start = time.monotonic()
+    url, name = hedged_upload(
+        upload_file,
+        [host(server, "slow"), host(server, "fast")],
+        hedge_after=0.2,
+        min_throughput=1024 * MB,  # anything still sending counts as slow
+        verbose=False,
+    )
+
+    assert (url, name) == (f"{server}/fast-file", "fast")
+    assert _Hosts.hits == ["slow", "fast"]
+    assert time.monotonic() - start < 10  # the slow host alone needs ~25s
+
+    # The losing upload is cancelled mid-body
+    deadline = time.monotonic() + 5
+    while "slow" not in _Hosts.aborted and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert "slow" in _Hosts.aborted
+
+
+def test_stalled_host_is_abandoned(server, upload_file):
+    start = time.monotonic()
+    url, name = hedged_upload(
+        upload_file,
+        [host(server, "stall"), host(server, "fast")],
+        hedge_after=60,  # only the stall may bring in the second host
+        stall_timeout=0.5,
+        verbose=False,
+    )
+
+    assert (url, name) == (f"{server}/fast-file", "fast")
+    assert _Hosts.hits == ["stall", "fast"]
+    assert time.monotonic() - start < 10
@@ -124,3 +124,57 @@ def get_r2_config() -> dict | None:
             "endpoint_url": f"https://{account_id}.r2.cloudflarestorage.com",
         }
     return None
+
+
+def get_r2_cache_ttl_days() -> float:
+    """Days to keep uploaded job inputs in R2 (R2_CACHE_TTL_DAYS, default 7).
+
+    0 disables the upload cache: inputs get a one-off key and are deleted
+    after each job.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    try:
+        return max(0.0, float(os.getenv("R2_CACHE_TTL_DAYS", "7")))
+    except ValueError:
+        return 7.0
+
+
+def get_transfer_settings() -> dict:
+    """Get parallel transfer tuning for R2 and URL downloads.
+
+    Returns dict with concurrency (TRANSFER_CONCURRENCY, default 8) and
+    part_size in bytes (TRANSFER_PART_SIZE_MB, default 16).
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    try:
+        concurrency = int(os.getenv("TRANSFER_CONCURRENCY", "8"))
+    except ValueError:
+        concurrency = 8
+    try:
+        part_size_mb = float(os.getenv("TRANSFER_PART_SIZE_MB", "16"))
+    except ValueError:
+        part_size_mb = 16.0
+
+    return {
+        "concurrency": max(1, concurrency),
+        "part_size": int(part_size_mb * 1024 * 1024),
+    }
+
+
+def get_state_dir() -> Path:
+    """Get the directory for local runtime state (job journal, caches, stats).
+
+    Defaults to .video-toolkit/ in the workspace root; override with
+    VIDEO_TOOLKIT_STATE_DIR. Created on first use.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    override = os.getenv("VIDEO_TOOLKIT_STATE_DIR")
+    state_dir = Path(override).expanduser() if override else find_workspace_root() / ".video-toolkit"
+    state_dir.mkdir(parents=True, exist_ok=True)
+    return state_dir
@@ -40,16 +40,27 @@ Cost (RunPod):
 
 import argparse
 import json
+import math
 import os
+import re
 import shutil
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 from pathlib import Path
 
 import requests
 
+sys.path.insert(0, str(Path(__file__).parent))
+from config import get_state_dir
+from file_hosts import hedged_upload
+from job_journal import COLLECTED, COMPLETED, FAILED, JobJournal, hash_inputs, new_output_key, reattach_job
+from r2_storage import delete_objects, get_r2_client, object_metadata, upload_input
+from runpod_client import RunPodClient
+from transfer import download_object
+
 # Default installation path
 PROPAINTER_HOME = Path.home() / ".video-toolkit" / "propainter"
 PROPAINTER_REPO = "https://github.com/sczhou/ProPainter.git"
@@ -152,20 +163,38 @@ def get_nvidia_vram_gb() -> int | None:
     return None
 
 
+def get_nvidia_gpu_count() -> int:
+    """Count NVIDIA GPUs visible to nvidia-smi. Returns 0 if none."""
+    try:
+        result = subprocess.run(
+            ["nvidia-smi", "--query-gpu=index", "--format=csv,noheader"],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode == 0:
+            return len([line for line in result.stdout.splitlines() if line.strip()])
+    except Exception:
+        pass
+    return 0
+
+
 def detect_compute_device() -> dict:
     """Detect available compute device and memory."""
     result = {
         "device": "cpu",
         "memory_gb": None,
+        "gpu_count": 0,
         "description": "CPU (no GPU detected)",
     }
 
     # Check for NVIDIA GPU first
     nvidia_vram = get_nvidia_vram_gb()
     if nvidia_vram:
+        gpu_count = max(1, get_nvidia_gpu_count())
         result["device"] = "cuda"
         result["memory_gb"] = nvidia_vram
-        result["description"] = f"NVIDIA GPU ({nvidia_vram}GB VRAM)"
+        result["gpu_count"] = gpu_count
+        result["description"] = f"NVIDIA GPU ({nvidia_vram}GB VRAM)" + (f" x{gpu_count}" if gpu_count > 1 else "")
         return result
 
     # Check for Apple Silicon (MPS)
@@ -207,8 +236,81 @@ def get_memory_profile(memory_gb: int | None) -> dict:
 BYTES_PER_FRAME_720P = 6.5 * 1024 * 1024  # ~6.5 MB per frame at 1280x720
 
 
-def estimate_frame_memory_gb(width: int, height: int, frame_count: int) -> float:
+# A memory model measured by --calibrate replaces the constants above. It is
+# stored per device in <state dir>/propainter-memory.json and predicts
+#     peak_bytes = base_bytes + bytes_per_pixel_frame * width * height * frames
+MEMORY_MODEL_FILE = "propainter-memory.json"
+CALIBRATED_HEADROOM = {"cuda": 0.85, "mps": 0.6, "cpu": 0.7}  # share of memory a measured run may use
+CALIBRATION_RESOLUTIONS = [(320, 180), (640, 360), (960, 540)]
+CALIBRATION_FRAMES = [16, 32]
+CALIBRATION_SUBVIDEOS = 2  # the longest probe spans this many subvideo_length batches
+
+# Runs inference_propainter.py in-process and reports its peak memory on the
+# last stderr line: RSS, CUDA reserved bytes, and sampled MPS driver memory.
+PROBE_WRAPPER = """
+import json, resource, runpy, sys, threading, time
+peak = {"mps": 0}
+try:
+    import torch
+except ImportError:
+    torch = None
+def sample_mps():
+    while True:
+        peak["mps"] = max(peak["mps"], torch.mps.driver_allocated_memory())
+        time.sleep(0.05)
+if torch is not None and torch.backends.mps.is_available():
+    threading.Thread(target=sample_mps, daemon=True).start()
+sys.argv = sys.argv[1:]
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+finally:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    cuda = torch.cuda.max_memory_reserved() if torch is not None and torch.cuda.is_available() else 0
+    print("PROBE_PEAK " + json.dumps({"rss": rss, "cuda": cuda, "mps": peak["mps"]}), file=sys.stderr)
+"""
+
+
+def load_memory_model(device: str) -> dict | None:
+    """Calibrated memory model for ``device``, if --calibrate has been run."""
+    try:
+        return json.loads((get_state_dir() / MEMORY_MODEL_FILE).read_text()).get(device)
+    except (OSError, ValueError):
+        return None
+
+
+def save_memory_model(device: str, model: dict) -> Path:
+    path = get_state_dir() / MEMORY_MODEL_FILE
+    try:
+        models = json.loads(path.read_text())
+    except (OSError, ValueError):
+        models = {}
+    models[device] = model
+    path.write_text(json.dumps(models, indent=2))
+    return path
+
+
+def fit_memory_model(samples: list[dict]) -> dict | None:
+    """Least-squares fit of peak bytes against width * height * frames."""
+    xs = [s["width"] * s["height"] * s["frames"] for s in samples]
+    ys = [s["peak_bytes"] for s in samples]
+    if len(set(xs)) < 2:
+        return None
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum((x - mean_x) ** 2 for x in xs)
+    if slope <= 0:
+        return None
+    return {
+        "bytes_per_pixel_frame": slope,
+        "base_bytes": max(0.0, mean_y - slope * mean_x),
+    }
+
+
+def estimate_frame_memory_gb(width: int, height: int, frame_count: int, model: dict | None = None) -> float:
     """Estimate memory required to load all frames into ProPainter."""
+    if model:
+        total_bytes = model["base_bytes"] + model["bytes_per_pixel_frame"] * width * height * frame_count
+        return total_bytes / (1024 ** 3)
+
     # Scale from 720p baseline
     pixels = width * height
     pixels_720p = 1280 * 720
@@ -272,20 +374,33 @@ def get_video_info(video_path: str) -> dict | None:
     return None
 
 
-def calculate_max_duration(memory_gb: float, width: int, height: int, fps: float, device: str = "cpu") -> float:
+def calculate_max_duration(
+    memory_gb: float,
+    width: int,
+    height: int,
+    fps: float,
+    device: str = "cpu",
+    model: dict | None = None,
+) -> float:
     """Calculate maximum video duration that fits in available memory and hardware limits.
 
     Constraints:
-    1. Memory: On unified memory systems (Apple Silicon), only ~50% is available
+    1. Memory: On unified memory systems (Apple Silicon), only ~50% is available.
+       With a calibrated ``model`` the measured cost per frame is used instead,
+       against CALIBRATED_HEADROOM of memory.
     2. MPS INT_MAX: Apple Silicon MPS cannot handle tensors > 2^31 elements
     """
     # Memory constraint
-    available_for_frames = memory_gb * 0.50
     pixels = width * height
-    pixels_720p = 1280 * 720
-    scale_factor = pixels / pixels_720p
-    bytes_per_frame = BYTES_PER_FRAME_720P * scale_factor
-    max_frames_memory = int((available_for_frames * 1024 ** 3) / bytes_per_frame)
+    if model:
+        available_bytes = memory_gb * CALIBRATED_HEADROOM.get(device.lower(), 0.5) * 1024 ** 3 - model["base_bytes"]
+        max_frames_memory = max(1, int(available_bytes / (model["bytes_per_pixel_frame"] * pixels)))
+    else:
+        available_for_frames = memory_gb * 0.50
+        pixels_720p = 1280 * 720
+        scale_factor = pixels / pixels_720p
+        bytes_per_frame = BYTES_PER_FRAME_720P * scale_factor
+        max_frames_memory = int((available_for_frames * 1024 ** 3) / bytes_per_frame)
 
     # MPS INT_MAX constraint (Apple Silicon specific)
     # MPS cannot handle tensor dimensions > INT_MAX (2^31-1)
@@ -304,6 +419,248 @@ def calculate_max_duration(memory_gb: float, width: int, height: int, fps: float
     return max_frames / fps
 
 
+def has_audio_stream(video_path: str) -> bool:
+    """Check whether a file has at least one audio stream."""
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-select_streams", "a",
+                "-show_entries", "stream=index",
+                "-of", "csv=p=0",
+                video_path,
+            ],
+            capture_output=True,
+            text=True,
+        )
+        return result.returncode == 0 and bool(result.stdout.strip())
+    except Exception:
+        return False
+
+
+# Shot changes. A chunk boundary on a hard cut needs no overlap: ProPainter
+# has nothing to borrow from frames of another shot.
+SCENE_CUT_THRESHOLD = 0.4     # ffmpeg scene score (0-1) that counts as a cut
+SCENE_DETECT_WIDTH = 320      # frames are scored at this width, for speed
+SCENE_CUT_MIN_FRACTION = 0.5  # only end a chunk on a cut this far into its window
+
+
+def detect_scene_cuts(video_path: str, threshold: float = SCENE_CUT_THRESHOLD) -> list[float] | None:
+    """Timestamps of hard cuts, from ffmpeg's scene change score.
+
+    Each timestamp is that of the first frame of the new shot. Returns None if
+    ffmpeg fails.
+    """
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", video_path,
+        "-map", "0:v:0",
+        "-vf", f"scale={SCENE_DETECT_WIDTH}:-2,select='gt(scene,{threshold})',showinfo",
+        "-f", "null", "-",
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return [float(match) for match in re.findall(r"Parsed_showinfo.*?pts_time:\s*([\d.]+)", result.stderr)]
+
+
+def stream_copy_compatible(video_path: str) -> bool:
+    """Whether the video stream can be concatenated with ProPainter's output (H.264, yuv420p)."""
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-select_streams", "v:0",
+                "-show_entries", "stream=codec_name,pix_fmt",
+                "-of", "csv=p=0",
+                video_path,
+            ],
+            capture_output=True,
+            text=True,
+        )
+        return result.returncode == 0 and result.stdout.strip().split(",")[:2] == ["h264", "yuv420p"]
+    except Exception:
+        return False
+
+
+def plan_chunks(
+    duration: float,
+    chunk_duration: float,
+    overlap: float = 5.0,
+    cached: list[dict] | None = None,
+    cuts: list[float] | None = None,
+    origin: float = 0.0,
+) -> list[dict]:
+    """Lay out overlapping chunk windows from ``origin`` to ``duration`` seconds.
+
+    Returns chunk info dicts with start, end, trim points and duration. Nothing
+    is extracted yet; see extract_chunks().
+
+    ``cuts`` are scene cut timestamps (detect_scene_cuts). A window that
+    contains one far enough in ends there instead, and the next window starts
+    on the cut with no overlap, so nothing around that seam is inpainted twice.
+
+    ``cached`` lists windows an earlier run already inpainted (see
+    ChunkCache.windows). A cached window is used instead of a new one wherever
+    it overlaps the previous window by at least ``overlap`` (or meets it on a
+    cut), reaches further, and lies within [origin, duration]; those chunks
+    come back with ``cached`` set and
+    ``output_path`` pointing at the stored result, so only the gaps between
+    them need ProPainter.
+    """
+    eps = 1e-3
+    cuts = sorted(cuts or [])
+
+    def on_cut(t: float) -> bool:
+        return any(abs(t - cut) < eps for cut in cuts)
+
+    windows: list[tuple[float, float, str | None]] = []
+    while not windows or windows[-1][1] < duration - eps:
+        if windows:
+            prev_start, prev_end, _ = windows[-1]
+            start = prev_end if on_cut(prev_end) else prev_end - overlap
+        else:
+            prev_start, prev_end, start = float("-inf"), origin, origin
+        reusable = [
+            window for window in cached or []
+            if prev_start + eps < window["start"] <= start + eps
+            and window["end"] > prev_end + eps
+            and window["start"] >= origin - eps
+            and window["end"] <= duration + eps
+        ]
+        if reusable:
+            best = max(reusable, key=lambda window: window["end"])
+            windows.append((best["start"], best["end"], best["path"]))
+            continue
+
+        end = min(start + chunk_duration, duration)
+        if end < duration - eps:
+            inside = [cut for cut in cuts if start + chunk_duration * SCENE_CUT_MIN_FRACTION <= cut <= end]
+            if inside:
+                end = inside[-1]
+        windows.append((start, end, None))
+
+    # Cut each seam halfway through the overlap. With fresh windows that is
+    # overlap/2 into the later chunk and overlap/2 before the earlier one ends;
+    # on a scene cut the windows just meet.
+    seams = [(windows[i + 1][0] + windows[i][1]) / 2 for i in range(len(windows) - 1)]
+    chunks = []
+    for index, (start, end, cached_path) in enumerate(windows):
+        chunks.append({
+            "index": index,
+            "input_path": None,          # Set by extract_chunks
+            "output_path": cached_path,  # Set after processing, unless cached
+            "cached": cached_path is not None,
+            "start": start,
+            "end": end,
+            "trim_start": seams[index - 1] - start if index > 0 else max(origin - start, 0.0),
+            "trim_end": seams[index] - start if index < len(seams) else min(end, duration) - start,
+            "duration": end - start,
+        })
+    return chunks
+
+
+def plan_presence_chunks(
+    duration: float,
+    ranges: list[tuple[float, float]],
+    chunk_duration: float,
+    overlap: float,
+    source_path: str,
+    cached: list[dict] | None = None,
+    cuts: list[float] | None = None,
+) -> list[dict]:
+    """Chunks covering only the watermarked ``ranges``, with the source passed through in between.
+
+    Each range is laid out with plan_chunks(). The clean spans between ranges
+    become ``passthrough`` chunks whose output is the source itself, so
+    SegmentWriter stream-copies them without ProPainter ever seeing them.
+    """
+    def passthrough(start: float, end: float) -> dict:
+        return {
+            "index": 0,
+            "input_path": None,
+            "output_path": source_path,
+            "cached": False,
+            "passthrough": True,
+            "file_start": 0.0,  # frames are counted from the start of the source
+            "start": start,
+            "end": end,
+            "trim_start": 0.0,
+            "trim_end": end - start,
+            "duration": end - start,
+        }
+
+    chunks = []
+    position = 0.0
+    for start, end in ranges:
+        if start > position:
+            chunks.append(passthrough(position, start))
+        chunks.extend(plan_chunks(end, chunk_duration, overlap, cached, cuts, origin=start))
+        position = end
+    if position < duration:
+        chunks.append(passthrough(position, duration))
+    for index, chunk in enumerate(chunks):
+        chunk["index"] = index
+    return chunks
+
+
+# Chunks written per ffmpeg pass. Each output holds an encoder in memory, so
+# very long videos are cut in a few passes, each seeking to its first chunk.
+CHUNKS_PER_PASS = 16
+
+
+def extract_chunks(input_path: str, chunks: list[dict], output_dir: str, verbose: bool = True) -> bool:
+    """Write every chunk in ``chunks`` from a single decode of the source.
+
+    One ffmpeg process decodes the source once, fans the frames out with
+    split/asplit, and trims each branch to its chunk window. Chunks are
+    re-encoded (not stream-copied) so they start on a keyframe and carry the
+    fps metadata torchvision.io.read_video needs. They are transient
+    ProPainter input, so x264 runs at its ultrafast preset.
+    Sets each chunk's ``input_path``.
+    """
+    with_audio = has_audio_stream(input_path)
+
+    for first in range(0, len(chunks), CHUNKS_PER_PASS):
+        batch = chunks[first:first + CHUNKS_PER_PASS]
+        origin = batch[0]["start"]
+        span = batch[-1]["end"] - origin
+
+        count = len(batch)
+        filters = [f"[0:v]setpts=PTS-STARTPTS,split={count}" + "".join(f"[vs{i}]" for i in range(count))]
+        if with_audio:
+            filters.append(f"[0:a]asetpts=PTS-STARTPTS,asplit={count}" + "".join(f"[as{i}]" for i in range(count)))
+
+        outputs = []
+        for i, chunk in enumerate(batch):
+            start, end = chunk["start"] - origin, chunk["end"] - origin
+            filters.append(f"[vs{i}]trim=start={start}:end={end},setpts=PTS-STARTPTS[v{i}]")
+            chunk_path = str(Path(output_dir) / f"chunk_{chunk['index']:03d}.mp4")
+            chunk["input_path"] = chunk_path
+            outputs.extend(["-map", f"[v{i}]"])
+            if with_audio:
+                filters.append(f"[as{i}]atrim=start={start}:end={end},asetpts=PTS-STARTPTS[a{i}]")
+                outputs.extend(["-map", f"[a{i}]", "-c:a", "aac", "-b:a", "192k"])
+            outputs.extend(["-c:v", "libx264", "-preset", "ultrafast", "-crf", "18", chunk_path])
+
+        cmd = [
+            "ffmpeg", "-y",
+            "-ss", str(origin),
+            "-t", str(span),
+            "-i", input_path,
+            "-filter_complex", ";".join(filters),
+            *outputs,
+        ]
+
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            if verbose:
+                print(f"Error extracting chunks {batch[0]['index']}-{batch[-1]['index']}: {result.stderr[-1000:]}", file=sys.stderr)
+            return False
+
+    return True
+
+
 def split_video_with_overlap(
     input_path: str,
     output_dir: str,
@@ -313,107 +670,246 @@ def split_video_with_overlap(
 ) -> list[dict]:
     """Split video into chunks with overlap for seamless processing.
 
-    Returns list of chunk info dicts with start, end, output_path, and trim points.
+    Returns list of chunk info dicts with start, end, input_path, and trim points.
     """
     info = get_video_info(input_path)
     if not info:
         return []
 
-    duration = info["duration"]
-    chunks = []
+    chunks = plan_chunks(info["duration"], chunk_duration, overlap)
+    if verbose:
+        for chunk in chunks:
+            print(
+                f"  Chunk {chunk['index']}: {chunk['start']:.1f}s - {chunk['end']:.1f}s "
+                f"(use {chunk['trim_start']:.1f}s - {chunk['trim_end']:.1f}s)"
+            )
 
-    # Calculate chunk boundaries
-    effective_chunk = chunk_duration - overlap  # Usable portion per chunk
-    current_start = 0.0
-    chunk_idx = 0
+    if not extract_chunks(input_path, chunks, output_dir, verbose=verbose):
+        return []
+    return chunks
 
-    while current_start < duration:
-        chunk_end = min(current_start + chunk_duration, duration)
 
-        # Determine trim points (where to cut when concatenating)
-        # First chunk: use from start to (end - overlap/2)
-        # Middle chunks: use from (overlap/2) to (end - overlap/2)
-        # Last chunk: use from (overlap/2) to end
+def probe_frames(video_path: str) -> dict | None:
+    """Presentation timestamps of every video frame, and which are keyframes.
 
-        is_first = chunk_idx == 0
-        is_last = chunk_end >= duration
+    Reads packet headers only, so it is fast even for long chunks.
+    """
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+        video_path,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
 
-        if is_first:
-            trim_start = 0.0
-        else:
-            trim_start = overlap / 2
+    packets = []
+    for line in result.stdout.splitlines():
+        pts, _, flags = line.partition(",")
+        try:
+            packets.append((float(pts), "K" in flags))
+        except ValueError:
+            continue
+    if not packets:
+        return None
+    packets.sort()
+    return {
+        "pts": [pts for pts, _ in packets],
+        "keyframes": [index for index, (_, key) in enumerate(packets) if key],
+    }
 
-        if is_last:
-            trim_end = chunk_end - current_start
-        else:
-            trim_end = chunk_duration - (overlap / 2)
 
-        chunk_path = str(Path(output_dir) / f"chunk_{chunk_idx:03d}.mp4")
+def _frame_at(seconds: float, fps: float) -> int:
+    """Index of the first frame at or after ``seconds`` (as trim=start picks it)."""
+    return math.ceil(seconds * fps - 1e-6)
+
+
+class SegmentWriter:
+    """Cut processed chunks, in order, into segments join_segments() can stream-copy.
+
+    Between keyframes an inpainted chunk is copied as is. Only the frames
+    around each seam are decoded and re-encoded: from the last keyframe before
+    the cut in one chunk to the first keyframe after it in the next. A chunk
+    whose usable part holds no keyframe is re-encoded whole, together with the
+    seam frames on either side; so is one marked ``reencode``, scaled to its
+    ``scale`` size if set.
+    """
+
+    def __init__(self, segments_dir: str, fps: float, verbose: bool = True):
+        self.segments_dir = Path(segments_dir)
+        self.fps = fps
+        self.verbose = verbose
+        self.paths: list[str] = []
+        self.copied_frames = 0
+        self.encoded_frames = 0
+        self._pending: list[tuple[dict, int, int]] = []  # (chunk, first frame, end frame) to re-encode
+        self._held: list[dict] = []
+        self._probed: dict[str, dict] = {}  # passthrough chunks share the source's frame list
+
+    def _next_path(self) -> str:
+        return str(self.segments_dir / f"segment_{len(self.paths):04d}.ts")
+
+    def _run(self, cmd: list[str], what: str) -> bool:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            if self.verbose:
+                print(f"Error writing {what}: {result.stderr[-500:]}", file=sys.stderr)
+            return False
+        return True
 
-        # Extract chunk using ffmpeg
-        # Must re-encode (not -c copy) to ensure fps metadata is preserved
-        # torchvision.io.read_video requires video_fps in metadata
+    def _copy(self, chunk: dict, first: int, end: int) -> bool:
+        path = self._next_path()
+        # Seek a fraction of a frame past the keyframe; stream copy starts at the keyframe itself
         cmd = [
             "ffmpeg", "-y",
-            "-ss", str(current_start),
-            "-i", input_path,
-            "-t", str(chunk_end - current_start),
+            "-ss", f"{chunk['frames']['pts'][first] + 0.25 / self.fps:.6f}",
+            "-i", chunk["output_path"],
+            "-map", "0:v:0",
+            "-c:v", "copy",
+            "-frames:v", str(end - first),
+            "-avoid_negative_ts", "make_zero",
+            "-an",
+            "-f", "mpegts",
+            path,
+        ]
+        if not self._run(cmd, f"chunk {chunk['index']}"):
+            return False
+        self.paths.append(path)
+        self.copied_frames += end - first
+        return True
+
+    def _encode_pending(self) -> bool:
+        pieces, self._pending = self._pending, []
+        path = self._next_path()
+        cmd = ["ffmpeg", "-y"]
+        filters = []
+        for i, (chunk, first, end) in enumerate(pieces):
+            cmd += ["-ss", f"{chunk['frames']['pts'][first] - 0.5 / self.fps:.6f}", "-i", chunk["output_path"]]
+            scale = f",scale={chunk['scale'][0]}:{chunk['scale'][1]}" if chunk.get("scale") else ""
+            filters.append(f"[{i}:v]trim=end_frame={end - first},setpts=PTS-STARTPTS{scale}[v{i}]")
+        labels = "".join(f"[v{i}]" for i in range(len(pieces)))
+        filters.append(f"{labels}concat=n={len(pieces)}:v=1:a=0[v]")
+        cmd += [
+            "-filter_complex", ";".join(filters),
+            "-map", "[v]",
             "-c:v", "libx264",
-            "-preset", "fast",
+            "-preset", "medium",
             "-crf", "18",
-            "-c:a", "aac",
-            "-b:a", "192k",
-            chunk_path,
+            "-pix_fmt", "yuv420p",
+            "-an",
+            "-f", "mpegts",
+            path,
         ]
+        seam = " / ".join(str(chunk["index"]) for chunk, _, _ in pieces)
+        if not self._run(cmd, f"seam at chunk {seam}"):
+            return False
+        self.paths.append(path)
+        self.encoded_frames += sum(end - first for _, first, end in pieces)
+        return True
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            if verbose:
-                print(f"Error extracting chunk {chunk_idx}: {result.stderr}", file=sys.stderr)
-            return []
+    def add(self, chunk: dict) -> list[dict] | None:
+        """Write what can be written of the next chunk.
+
+        Returns the chunks whose processed outputs are no longer needed (this
+        one included, unless its tail waits for the next seam), or None if
+        something failed.
+        """
+        if chunk["output_path"] not in self._probed:
+            self._probed[chunk["output_path"]] = probe_frames(chunk["output_path"])
+        frames = self._probed[chunk["output_path"]]
+        if not frames:
+            if self.verbose:
+                print(f"Error: Could not read frames of chunk {chunk['index']}", file=sys.stderr)
+            return None
+        chunk["frames"] = frames
+        frame_count = len(frames["pts"])
 
-        chunks.append({
-            "index": chunk_idx,
-            "input_path": chunk_path,
-            "output_path": None,  # Will be set after processing
-            "start": current_start,
-            "end": chunk_end,
-            "trim_start": trim_start,
-            "trim_end": trim_end,
-            "duration": chunk_end - current_start,
-        })
+        origin = _frame_at(chunk.get("file_start", chunk["start"]), self.fps)
+        head = _frame_at(chunk["start"] + chunk["trim_start"], self.fps) - origin
+        if chunk["trim_end"] >= chunk["duration"] - 1e-3 and not chunk.get("passthrough"):
+            tail = frame_count
+        else:
+            tail = min(_frame_at(chunk["start"] + chunk["trim_end"], self.fps) - origin, frame_count)
+
+        # Copy from the first keyframe in the usable part up to the last
+        # keyframe (or the end of the file) before the cut
+        starts = [index for index in frames["keyframes"] if head <= index < tail]
+        ends = [index for index in frames["keyframes"] + [frame_count] if index <= tail]
+        self._held.append(chunk)
+        if starts and ends and starts[0] < ends[-1] and not chunk.get("reencode"):
+            first, end = starts[0], ends[-1]
+            if first > head:
+                self._pending.append((chunk, head, first))
+            if self._pending and not self._encode_pending():
+                return None
+            if not self._copy(chunk, first, end):
+                return None
+            if tail > end:
+                self._pending.append((chunk, end, tail))
+        elif tail > head:
+            self._pending.append((chunk, head, tail))
+
+        waiting = [id(piece[0]) for piece in self._pending]
+        released = [held for held in self._held if id(held) not in waiting]
+        self._held = [held for held in self._held if id(held) in waiting]
+        return released
+
+    def finish(self) -> list[str] | None:
+        """Flush the last seam and return every segment path, in order."""
+        if self._pending and not self._encode_pending():
+            return None
+        if self.verbose:
+            total = self.copied_frames + self.encoded_frames
+            if total:
+                print(f"Stitched {total} frames: {100 * self.copied_frames / total:.0f}% stream-copied, "
+                      f"{self.encoded_frames} re-encoded at seams")
+        return self.paths
 
-        if verbose:
-            print(f"  Chunk {chunk_idx}: {current_start:.1f}s - {chunk_end:.1f}s (use {trim_start:.1f}s - {trim_end:.1f}s)")
 
-        chunk_idx += 1
-        current_start += effective_chunk
+def join_segments(
+    segment_paths: list[str],
+    output_path: str,
+    audio_source: str | None = None,
+    verbose: bool = True,
+) -> bool:
+    """Stream-copy video segments into output_path.
 
-        # Avoid tiny final chunks
-        if duration - current_start < overlap:
-            break
+    The audio track, if any, is taken once from ``audio_source`` (the
+    original video) instead of being stitched from the chunks.
+    """
+    list_path = Path(output_path).with_name(Path(output_path).name + ".segments.txt")
+    list_path.write_text("".join(f"file '{Path(p).resolve()}'\n" for p in segment_paths))
 
-    return chunks
+    cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(list_path)]
+    if audio_source:
+        cmd += ["-i", audio_source, "-map", "0:v:0", "-map", "1:a:0?", "-c:a", "aac", "-b:a", "192k", "-shortest"]
+    cmd += ["-c:v", "copy", "-movflags", "+faststart", output_path]
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    finally:
+        list_path.unlink(missing_ok=True)
+    if result.returncode != 0:
+        if verbose:
+            print(f"Error joining segments: {result.stderr[-500:]}", file=sys.stderr)
+        return False
+    return True
 
 
 def concatenate_chunks(
     chunks: list[dict],
     output_path: str,
-    crossfade_duration: float = 0.5,
+    audio_source: str | None = None,
     verbose: bool = True,
 ) -> bool:
-    """Concatenate processed chunks with crossfade at boundaries."""
+    """Trim processed chunks at their seams and join them into output_path."""
     if not chunks:
         return False
 
-    if len(chunks) == 1:
-        # Single chunk, just copy
-        shutil.copy(chunks[0]["output_path"], output_path)
-        return True
-
-    # Build ffmpeg filter for trimming and concatenating
-    filter_parts = []
-    inputs = []
+    if verbose:
+        print(f"Concatenating {len(chunks)} chunks...")
 
     for i, chunk in enumerate(chunks):
         if not chunk["output_path"] or not Path(chunk["output_path"]).exists():
@@ -421,50 +917,370 @@ def concatenate_chunks(
                 print(f"Error: Missing processed chunk {i}", file=sys.stderr)
             return False
 
-        inputs.extend(["-i", chunk["output_path"]])
+    info = get_video_info(chunks[0]["output_path"])
+    if not info:
+        return False
 
-        # Trim each chunk to its usable portion
-        trim_start = chunk["trim_start"]
-        trim_end = chunk["trim_end"]
-        filter_parts.append(
-            f"[{i}:v]trim=start={trim_start}:end={trim_end},setpts=PTS-STARTPTS[v{i}];"
-            f"[{i}:a]atrim=start={trim_start}:end={trim_end},asetpts=PTS-STARTPTS[a{i}]"
-        )
+    segments_dir = tempfile.mkdtemp(prefix="segments_", dir=Path(output_path).parent)
+    try:
+        writer = SegmentWriter(segments_dir, info["fps"], verbose=verbose)
+        if any(writer.add(chunk) is None for chunk in chunks):
+            return False
+        segment_paths = writer.finish()
+        return segment_paths is not None and join_segments(segment_paths, output_path, audio_source, verbose=verbose)
+    finally:
+        shutil.rmtree(segments_dir, ignore_errors=True)
 
-    # Concatenate all trimmed segments
-    video_inputs = "".join(f"[v{i}]" for i in range(len(chunks)))
-    audio_inputs = "".join(f"[a{i}]" for i in range(len(chunks)))
 
-    filter_complex = (
-        ";".join(filter_parts) + ";"
-        f"{video_inputs}concat=n={len(chunks)}:v=1:a=0[outv];"
-        f"{audio_inputs}concat=n={len(chunks)}:v=0:a=1[outa]"
-    )
+# Inpainted chunks are kept across runs so an interrupted or re-tuned run only
+# redoes what is missing. Entries unused for CHUNK_CACHE_TTL_DAYS are dropped.
+CHUNK_CACHE_DIR = "dewatermark-chunks"
+CHUNK_CACHE_TTL_DAYS = 7
+CHUNK_DURATION_TOLERANCE = 0.5  # seconds a stored result may differ from its window
+LAST_USED_MARKER = ".last-used"
 
-    cmd = [
-        "ffmpeg", "-y",
-        *inputs,
-        "-filter_complex", filter_complex,
-        "-map", "[outv]",
-        "-map", "[outa]",
-        "-c:v", "libx264",
-        "-preset", "medium",
-        "-crf", "18",
-        "-c:a", "aac",
-        "-b:a", "192k",
-        output_path,
-    ]
 
-    if verbose:
-        print(f"Concatenating {len(chunks)} chunks...")
+class ChunkCache:
+    """ProPainter results for chunk windows, persisted under the state dir.
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        if verbose:
-            print(f"Error concatenating: {result.stderr[-500:]}", file=sys.stderr)
+    Each distinct job gets <state dir>/dewatermark-chunks/<key>/, where the key
+    (from hash_inputs) covers everything that changes the inpainted pixels:
+    source and mask contents, region, ROI window and ProPainter settings.
+    Overlap, worker count and output encoding only decide which windows are
+    requested and how they are stitched, so they are not part of it. Results
+    are named by their window bounds in milliseconds.
+    """
+
+    def __init__(self, key: str, root: Path | None = None):
+        self.root = root or get_state_dir() / CHUNK_CACHE_DIR
+        self.prune(self.root)
+        self.dir = self.root / key[:24]
+        self.dir.mkdir(parents=True, exist_ok=True)
+        (self.dir / LAST_USED_MARKER).touch()
+
+    def path_for(self, start: float, end: float) -> Path:
+        return self.dir / f"{round(start * 1000):09d}-{round(end * 1000):09d}.mp4"
+
+    def windows(self) -> list[dict]:
+        """Stored windows that still probe as complete videos.
+
+        Results that fail the check (e.g. written by a run that was killed
+        mid-copy) are deleted so their chunks get redone.
+        """
+        found = []
+        for path in sorted(self.dir.glob("*.mp4")):
+            try:
+                start_ms, end_ms = (int(part) for part in path.stem.split("-"))
+            except ValueError:
+                continue
+            start, end = start_ms / 1000, end_ms / 1000
+            info = get_video_info(str(path))
+            if not info or abs(info["duration"] - (end - start)) > CHUNK_DURATION_TOLERANCE:
+                path.unlink(missing_ok=True)
+                continue
+            found.append({"start": start, "end": end, "path": str(path)})
+        return found
+
+    def store(self, chunk: dict, result_path: str) -> str:
+        """Move a finished ProPainter result into the cache and return its new path."""
+        path = self.path_for(chunk["start"], chunk["end"])
+        partial = path.with_suffix(".partial")
+        shutil.move(result_path, partial)
+        partial.replace(path)
+        return str(path)
+
+    @staticmethod
+    def prune(root: Path, ttl_days: float = CHUNK_CACHE_TTL_DAYS) -> int:
+        """Remove cached jobs not used within ``ttl_days``."""
+        if not root.is_dir():
+            return 0
+        cutoff = time.time() - ttl_days * 86400
+        removed = 0
+        for job_dir in root.iterdir():
+            if not job_dir.is_dir():
+                continue
+            marker = job_dir / LAST_USED_MARKER
+            if (marker if marker.exists() else job_dir).stat().st_mtime < cutoff:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+# Parallel chunk processing. Each worker is a separate ProPainter process; on
+# CPU they share the machine's cores and RAM, on CUDA each one gets a GPU.
+MIN_THREADS_PER_WORKER = 4        # below this, torch's intra-op parallelism beats more processes
+MIN_PARALLEL_CHUNK_SECONDS = 30.0  # shorter chunks spend too much time on overlap
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+LOOKAHEAD_PER_WORKER = 2           # chunks extracted or inpainted but not yet stitched
+CANCEL_POLL_INTERVAL = 1.0         # seconds between checks for a cancelled ProPainter run
+
+
+def plan_chunk_workers(
+    compute: dict,
+    video_info: dict,
+    max_duration: float,
+    overlap: float,
+    workers: int | None = None,
+    model: dict | None = None,
+) -> dict:
+    """Decide how many chunks to inpaint at once, and how long each chunk is.
+
+    CPU workers split the cores and the memory budget between them, and every
+    worker pays ProPainter's fixed per-process memory, so chunks get shorter
+    as workers are added and workers are dropped when too little is left for
+    frames. CUDA workers get one GPU each and keep the full per-GPU chunk
+    length. An explicit ``workers`` is kept even if its chunks get short.
+    Returns workers, chunk_duration, threads_per_worker and
+    chunk_memory_gb.
+    """
+    cpus = os.cpu_count() or 1
+    device = compute.get("device", "cpu")
+    duration = video_info["duration"]
+    fps = video_info["fps"]
+    max_chunk = max_duration * 0.9  # 90% of max for safety margin
+
+    def chunk_memory_gb(seconds: float) -> float:
+        return estimate_frame_memory_gb(video_info["width"], video_info["height"], int(seconds * fps), model)
+
+    headroom = CALIBRATED_HEADROOM.get(device, 0.5) if model else 0.5
+    budget_gb = (compute.get("memory_gb") or 16) * headroom
+    base_gb = chunk_memory_gb(0)
+    per_second_gb = (chunk_memory_gb(1000) - base_gb) / 1000
+
+    def shared_chunk_cap(count: int) -> float:
+        """Longest chunk that lets ``count`` workers fit in shared memory together."""
+        if count == 1:
+            return max_chunk
+        return min(max_chunk, 0.9 * max(0.0, budget_gb / count - base_gb) / per_second_gb)
+
+    if device == "cuda":
+        by_device = compute.get("gpu_count") or 1
+        if _visible_cuda_devices():
+            by_device = min(by_device, len(_visible_cuda_devices()))
+    elif device == "mps":
+        by_device = 1
+    else:
+        by_device = max(1, cpus // MIN_THREADS_PER_WORKER)
+
+    requested = workers
+    if not workers:
+        # Parallel chunks still have to be long enough to amortise their overlap
+        workers = min(by_device, max(1, int(duration // MIN_PARALLEL_CHUNK_SECONDS)))
+        if device != "cuda":
+            workers = min(workers, max(1, int(max_chunk // MIN_PARALLEL_CHUNK_SECONDS)))
+    workers = max(1, workers)
+
+    # Shared memory is divided between concurrent chunks; each GPU has its own
+    if device == "cuda":
+        chunk_cap = max_chunk
+    else:
+        while not requested and workers > 1 and shared_chunk_cap(workers) < MIN_PARALLEL_CHUNK_SECONDS:
+            workers -= 1
+        chunk_cap = shared_chunk_cap(workers)
+    if workers > 1:
+        chunk_duration = min(chunk_cap, duration / workers + overlap)
+    else:
+        chunk_duration = chunk_cap
+    chunk_duration = max(chunk_duration, overlap * 2)
+
+    return {
+        "workers": workers,
+        "chunk_duration": chunk_duration,
+        "threads_per_worker": max(1, cpus // workers) if device != "cuda" else None,
+        "chunk_memory_gb": chunk_memory_gb(chunk_duration),
+    }
+
+
+def _visible_cuda_devices() -> list[str]:
+    """Devices the user already restricted CUDA to, in CUDA_VISIBLE_DEVICES order."""
+    return [d.strip() for d in os.environ.get("CUDA_VISIBLE_DEVICES", "").split(",") if d.strip()]
+
+
+def _worker_slot_env(slot: int, plan: dict, device: str) -> tuple[dict, set[int] | None]:
+    """Environment and CPU affinity for the worker running in ``slot``."""
+    env = os.environ.copy()
+    cpu_set = None
+    if device == "cuda":
+        visible = _visible_cuda_devices()
+        env["CUDA_VISIBLE_DEVICES"] = visible[slot % len(visible)] if visible else str(slot)
+    threads = plan.get("threads_per_worker")
+    if threads and plan["workers"] > 1:
+        for var in THREAD_ENV_VARS:
+            env[var] = str(threads)
+        if hasattr(os, "sched_getaffinity"):
+            cores = sorted(os.sched_getaffinity(0))
+            cpu_set = set(cores[slot * threads:(slot + 1) * threads]) or None
+    return env, cpu_set
+
+
+def run_chunk_pipeline(
+    input_path: str,
+    chunks: list[dict],
+    output_path: str,
+    propainter_path: Path,
+    mask_path: str,
+    temp_dir: str,
+    plan: dict,
+    device: str = "cpu",
+    keep_temp: bool = False,
+    cache: ChunkCache | None = None,
+    verbose: bool = True,
+    **propainter_args,
+) -> bool:
+    """Split, inpaint and stitch ``chunks`` as overlapping pipeline stages.
+
+    A producer thread extracts chunks a pass at a time (extract_chunks) while
+    a pool of ``plan["workers"]`` ProPainter processes inpaints the ones
+    already on disk. The calling thread cuts each finished chunk into
+    segments (SegmentWriter), in order, as soon as it arrives. Chunk inputs
+    and ProPainter results are deleted once consumed. Extraction stays at most
+    LOOKAHEAD chunks ahead of stitching, so disk use is bounded by a few
+    chunks rather than the whole video.
+
+    With a ``cache``, each ProPainter result is moved into it as soon as it is
+    done instead of being deleted. Chunks that already have an output (cached
+    or passthrough) skip straight to stitching.
+    """
+    import queue
+    from concurrent.futures import ThreadPoolExecutor
+
+    todo = [chunk for chunk in chunks if not chunk["output_path"]]  # not cached or passed through
+    inpainted = {chunk["index"] for chunk in todo}
+    workers = max(1, min(plan["workers"], len(todo)))
+    info = get_video_info(input_path)
+    if not info:
+        print("Error: Could not read video info", file=sys.stderr)
+        return False
+    lookahead = threading.Semaphore(workers * LOOKAHEAD_PER_WORKER)
+    ready: queue.Queue[dict | None] = queue.Queue()
+    slots: queue.Queue[int] = queue.Queue()
+    for slot in range(workers):
+        slots.put(slot)
+    done = threading.Condition()
+    results: dict[int, str | None] = {}
+    stop = threading.Event()
+
+    chunks_dir = Path(temp_dir) / "chunks"
+    segments_dir = Path(temp_dir) / "segments"
+    chunks_dir.mkdir(parents=True, exist_ok=True)
+    segments_dir.mkdir(parents=True, exist_ok=True)
+
+    def finish(chunk: dict, result_path: str | None) -> None:
+        with done:
+            results[chunk["index"]] = result_path
+            if result_path is None:
+                stop.set()
+            done.notify_all()
+
+    def abort() -> None:
+        with done:
+            stop.set()
+            done.notify_all()
+
+    def produce() -> None:
+        # Whatever happens, the workers get their sentinels and the stitcher wakes up
+        try:
+            for first in range(0, len(todo), workers):
+                batch = todo[first:first + workers]
+                for _ in batch:
+                    lookahead.acquire()
+                if stop.is_set():
+                    break
+                if not extract_chunks(input_path, batch, str(chunks_dir), verbose=verbose):
+                    for chunk in batch:
+                        finish(chunk, None)
+                    break
+                for chunk in batch:
+                    ready.put(chunk)
+        except Exception as e:
+            print(f"Error: Chunk extraction failed: {e}", file=sys.stderr)
+            abort()
+        finally:
+            for _ in range(workers):
+                ready.put(None)
+
+    def inpaint() -> None:
+        env = cpu_set = None
+        try:
+            env, cpu_set = _worker_slot_env(slots.get(), plan, device)
+        except Exception as e:
+            print(f"Error: Could not set up a ProPainter worker: {e}", file=sys.stderr)
+            abort()
+        while (chunk := ready.get()) is not None:
+            result_path = None
+            try:
+                if stop.is_set():
+                    continue
+                if verbose:
+                    print(f"\n--- Chunk {chunk['index'] + 1}/{len(chunks)} ({chunk['start']:.1f}s - {chunk['end']:.1f}s) ---")
+                result_path = run_propainter(
+                    propainter_path,
+                    chunk["input_path"],
+                    mask_path,
+                    str(Path(temp_dir) / f"results_{chunk['index']:03d}"),
+                    verbose=verbose and workers == 1,
+                    env=env,
+                    cpu_affinity=cpu_set,
+                    cancel=stop,
+                    **propainter_args,
+                )
+                if not result_path:
+                    if not stop.is_set():  # otherwise it was cancelled after another chunk failed
+                        print(f"Error: Failed to process chunk {chunk['index']}", file=sys.stderr)
+                elif cache:
+                    result_path = cache.store(chunk, result_path)
+                if not keep_temp:
+                    Path(chunk["input_path"]).unlink(missing_ok=True)
+            except Exception as e:
+                print(f"Error: Chunk {chunk['index']} failed: {e}", file=sys.stderr)
+                result_path = None
+            finally:
+                finish(chunk, result_path)
+
+    if verbose and workers > 1:
+        threads = plan.get("threads_per_worker")
+        print(f"Running {workers} chunks in parallel" + (f" ({threads} threads each)" if threads else ""))
+
+    producer = threading.Thread(target=produce, name="chunk-extract", daemon=True)
+    producer.start()
+    writer = SegmentWriter(str(segments_dir), info["fps"], verbose=verbose)
+    stitched = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(workers):
+            pool.submit(inpaint)
+
+        for chunk in chunks:
+            if chunk["index"] in inpainted:
+                with done:
+                    done.wait_for(lambda: chunk["index"] in results or stop.is_set())
+                    chunk["output_path"] = results.get(chunk["index"])
+            released = writer.add(chunk) if chunk["output_path"] else None
+            if released is None:
+                stop.set()
+                break
+            stitched += 1
+            if not keep_temp:
+                # A chunk's tail is kept until the seam after it has been encoded
+                for finished in released:
+                    if finished["index"] in inpainted:
+                        shutil.rmtree(Path(temp_dir) / f"results_{finished['index']:03d}", ignore_errors=True)
+            if chunk["index"] in inpainted:
+                lookahead.release()
+            if verbose and workers > 1:
+                print(f"  Chunk {chunk['index'] + 1}/{len(chunks)} stitched")
+
+        if stop.is_set():
+            # Unblock the producer so the pool can wind down
+            for _ in todo:
+                lookahead.release()
+
+    segment_paths = writer.finish() if stitched == len(chunks) and not stop.is_set() else None
+    if segment_paths is None:
         return False
 
-    return True
+    if verbose:
+        print(f"\nJoining {len(segment_paths)} segments...")
+    return join_segments(segment_paths, output_path, audio_source=input_path, verbose=verbose)
 
 
 def parse_args():
@@ -546,12 +1362,41 @@ Examples:
         action="store_true",
         help="Disable auto-splitting even if video exceeds memory (may fail)",
     )
+    parser.add_argument(
+        "--roi",
+        action="store_true",
+        help="Inpaint only a padded window around the watermark at full resolution and composite it back "
+             "(much less memory and time for small watermarks)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Chunks to inpaint in parallel (default: auto from cores, GPUs and memory)",
+    )
     parser.add_argument(
         "--overlap",
         type=float,
         default=5.0,
         help="Overlap duration in seconds between chunks (default: 5.0)",
     )
+    parser.add_argument(
+        "--detect-presence",
+        action="store_true",
+        help="Find the time ranges where the watermark is visible and inpaint only those; "
+             "clean spans are copied through untouched",
+    )
+    parser.add_argument(
+        "--no-scene-cuts",
+        action="store_true",
+        help="Split chunks on fixed windows only, instead of ending them on shot changes where possible",
+    )
+    parser.add_argument(
+        "--no-chunk-cache",
+        action="store_true",
+        help="Do not reuse or keep inpainted chunks between runs "
+             f"(default: kept for {CHUNK_CACHE_TTL_DAYS} days so reruns only redo missing chunks)",
+    )
 
     # Installation/status
     parser.add_argument(
@@ -564,6 +1409,11 @@ Examples:
         action="store_true",
         help="Check ProPainter installation status",
     )
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help="Measure ProPainter's memory use on this machine and save a model for chunk sizing",
+    )
     parser.add_argument(
         "--propainter-path",
         type=str,
@@ -599,6 +1449,11 @@ Examples:
         default=1800,
         help="RunPod job timeout in seconds (default: 1800 = 30 min)",
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Collect an earlier RunPod job for the same input instead of resubmitting (see tools/job_journal.py)",
+    )
     parser.add_argument(
         "--setup",
         action="store_true",
@@ -625,7 +1480,8 @@ Examples:
     parser.add_argument(
         "--upscale",
         action="store_true",
-        help="Upscale output to original resolution using FFmpeg lanczos (useful with resize-ratio < 1.0)",
+        help="Upscale output to original resolution using FFmpeg lanczos (useful with resize-ratio < 1.0); "
+             "done on the RunPod worker together with the audio mux",
     )
     parser.add_argument(
         "--chunk",
@@ -895,11 +1751,266 @@ def create_mask_from_region(
             text=True,
         )
 
-        return result.returncode == 0
+        return result.returncode == 0
+
+    except ValueError as e:
+        print(f"Error: Invalid region format: {e}", file=sys.stderr)
+        return False
+
+
+# Region-of-interest mode: inpaint only a padded window around the mask and
+# composite it back, so cost scales with the watermark area, not the frame.
+ROI_MIN_CONTEXT = 64     # px of surrounding picture kept on each side for flow
+ROI_MIN_SIZE = 128       # RAFT's feature pyramid needs a minimum input size
+ROI_MAX_AREA = 0.6       # above this fraction of the frame, cropping saves little
+ROI_MASK_DILATION = 4    # matches ProPainter's default --mask_dilation
+
+
+def mask_bounding_box(mask_path: str) -> tuple[int, int, int, int] | None:
+    """Bounding box (x, y, w, h) of the white area of a mask image."""
+    try:
+        result = subprocess.run(
+            [
+                "ffmpeg", "-loop", "1", "-i", mask_path,
+                "-vf", "cropdetect=limit=24:round=2:reset=0",
+                "-frames:v", "4",
+                "-f", "null", "-",
+            ],
+            capture_output=True,
+            text=True,
+        )
+        crops = [line.rsplit("crop=", 1)[1].split()[0] for line in result.stderr.splitlines() if "crop=" in line]
+        if crops:
+            w, h, x, y = (int(v) for v in crops[-1].split(":"))
+            if w > 0 and h > 0:
+                return x, y, w, h
+    except Exception:
+        pass
+    return None
+
+
+def _roi_span(lo: int, hi: int, limit: int, pad: int) -> tuple[int, int]:
+    """Pad [lo, hi) within [0, limit), at least ROI_MIN_SIZE long, a multiple of 8 if it fits."""
+    lo, hi = max(0, lo - pad), min(limit, hi + pad)
+    size = -(-max(hi - lo, ROI_MIN_SIZE) // 8) * 8
+    if size >= limit:
+        return 0, limit
+    start = min(max(0, lo - (size - (hi - lo)) // 2), limit - size)
+    start -= start % 2  # chroma-aligned for yuv420 crops
+    return start, start + size
+
+
+def plan_roi(
+    region: str | None,
+    mask_path: str,
+    width: int,
+    height: int,
+    verbose: bool = True,
+) -> tuple[int, int, int, int] | None:
+    """Pick the crop window (x, y, w, h) for ROI mode.
+
+    The box comes from ``region`` if given, otherwise from the mask image. It
+    is padded by its own size (at least ROI_MIN_CONTEXT px) so flow
+    completion has surrounding motion to work from. Returns None when the
+    window would cover most of the frame anyway.
+    """
+    if region:
+        box = tuple(int(v.strip()) for v in region.split(","))
+    else:
+        box = mask_bounding_box(mask_path)
+    if not box:
+        if verbose:
+            print("Could not find the mask area, processing full frames", file=sys.stderr)
+        return None
+
+    x, y, w, h = box
+    pad = max(ROI_MIN_CONTEXT, w, h)
+    x0, x1 = _roi_span(x, x + w, width, pad)
+    y0, y1 = _roi_span(y, y + h, height, pad)
+    window = (x0, y0, x1 - x0, y1 - y0)
+
+    if window[2] * window[3] > ROI_MAX_AREA * width * height:
+        if verbose:
+            print(f"ROI window {window[2]}x{window[3]} covers most of the frame, processing full frames")
+        return None
+    if verbose:
+        print(f"ROI mode: inpainting {window[2]}x{window[3]} window at ({x0},{y0}) of {width}x{height}")
+    return window
+
+
+def crop_to_roi(
+    input_path: str,
+    mask_path: str,
+    window: tuple[int, int, int, int],
+    work_dir: str,
+    verbose: bool = True,
+) -> tuple[str, str] | None:
+    """Crop the video and mask to the ROI window. Returns (video, mask) paths."""
+    x, y, w, h = window
+    crop = f"crop={w}:{h}:{x}:{y}"
+    roi_video = str(Path(work_dir) / "roi_input.mp4")
+    roi_mask = str(Path(work_dir) / "roi_mask.png")
+
+    for cmd in (
+        ["ffmpeg", "-y", "-i", input_path, "-vf", crop, "-an",
+         "-c:v", "libx264", "-preset", "ultrafast", "-crf", "12", roi_video],
+        ["ffmpeg", "-y", "-i", mask_path, "-vf", crop, "-frames:v", "1", roi_mask],
+    ):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            if verbose:
+                print(f"Error cropping to ROI: {result.stderr[-500:]}", file=sys.stderr)
+            return None
+    return roi_video, roi_mask
+
+
+def composite_roi(
+    original_path: str,
+    roi_path: str,
+    roi_mask_path: str,
+    window: tuple[int, int, int, int],
+    output_path: str,
+    verbose: bool = True,
+) -> bool:
+    """Paste the inpainted ROI back onto the untouched original frames.
+
+    Only the (dilated, feathered) mask area is taken from the ROI video, so
+    the rest of the picture is the original, one encode away from the source.
+    """
+    x, y, w, h = window
+    info = get_video_info(roi_path)
+    alpha = "format=gray," + ",".join(["dilation"] * ROI_MASK_DILATION) + ",gblur=sigma=2"
+    filter_complex = (
+        f"[2:v]{alpha}[alpha];"
+        f"[1:v]scale={w}:{h},format=yuva420p[roi];"
+        f"[roi][alpha]alphamerge[patch];"
+        f"[0:v][patch]overlay={x}:{y}:eof_action=pass,format=yuv420p[outv]"
+    )
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", original_path,
+        "-i", roi_path,
+        "-loop", "1", *(["-t", str(info["duration"])] if info else []), "-i", roi_mask_path,
+        "-filter_complex", filter_complex,
+        "-map", "[outv]",
+        "-map", "0:a?",
+        "-c:v", "libx264",
+        "-preset", "medium",
+        "-crf", "18",
+        "-c:a", "copy",
+        output_path,
+    ]
+    if verbose:
+        print("Compositing inpainted region onto original frames...")
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        if verbose:
+            print(f"Error compositing ROI: {result.stderr[-500:]}", file=sys.stderr)
+        return False
+    return True
+
+
+# Watermark presence. Intros, outros and periodic overlays leave most of a
+# video clean; only the spans where the watermark is visible need ProPainter.
+PROPAINTER_MACRO_BLOCK = 16    # imageio, which writes ProPainter's output, pads frames to multiples of this
+PRESENCE_SAMPLE_FPS = 2.0
+PRESENCE_THUMB_WIDTH = 96      # the box plus its surroundings are scored at this width
+PRESENCE_MOTION_MIN = 4.0      # mean grey-level change around the box that counts as motion
+PRESENCE_STATIC_RATIO = 0.25   # box change below this share of the surroundings' = overlay held still
+PRESENCE_MIN_DISTANCE = 6.0    # floor for the template distance that still counts as present
+PRESENCE_PAD = 1.0             # seconds added either side of a detected range (fades)
+PRESENCE_MIN_CLEAN = 4.0       # shorter clean gaps are inpainted anyway
+
+
+def _gray_frames(video_path: str, vf: str, frames: int | None = None) -> bytes | None:
+    cmd = ["ffmpeg", "-v", "error", "-i", video_path, "-vf", vf, "-pix_fmt", "gray"]
+    if frames:
+        cmd += ["-frames:v", str(frames)]
+    cmd += ["-f", "rawvideo", "-"]
+    result = subprocess.run(cmd, capture_output=True)
+    return result.stdout if result.returncode == 0 and result.stdout else None
+
+
+def _mean_abs_diff(a: bytes, b: bytes, pixels: list[int]) -> float:
+    return sum(abs(a[i] - b[i]) for i in pixels) / len(pixels)
+
 
-    except ValueError as e:
-        print(f"Error: Invalid region format: {e}", file=sys.stderr)
-        return False
+def detect_watermark_presence(
+    video_path: str,
+    mask_path: str,
+    duration: float,
+    verbose: bool = True,
+) -> list[tuple[float, float]] | None:
+    """Time ranges in which the watermark is visible.
+
+    Samples small greyscale thumbnails of the mask box and its surroundings.
+    Samples where the surroundings move but the masked pixels hold still show
+    the overlay; their per-pixel median becomes the watermark template. Every
+    sample is then scored by its distance to that template. Ranges are padded
+    by PRESENCE_PAD and clean gaps shorter than PRESENCE_MIN_CLEAN are closed.
+
+    Returns None when the overlay could not be learned (no motion around it,
+    or no mask area), in which case the whole video should be processed.
+    """
+    box = mask_bounding_box(mask_path)
+    dimensions = get_video_dimensions(video_path)
+    if not box or not dimensions:
+        return None
+    x, y, w, h = box
+    width, height = dimensions
+    margin = max(16, w // 2, h // 2)
+    x0, y0 = max(0, x - margin), max(0, y - margin)
+    x1, y1 = min(width, x + w + margin), min(height, y + h + margin)
+    scale = min(1.0, PRESENCE_THUMB_WIDTH / (x1 - x0))
+    tw, th = max(2, round((x1 - x0) * scale)), max(2, round((y1 - y0) * scale))
+    crop = f"crop={x1 - x0}:{y1 - y0}:{x0}:{y0},scale={tw}:{th}:flags=area"
+
+    mask = _gray_frames(mask_path, crop, frames=1)
+    data = _gray_frames(video_path, f"fps={PRESENCE_SAMPLE_FPS},{crop}")
+    if not mask or not data:
+        return None
+    size = tw * th
+    inner = [i for i in range(size) if mask[i] > 127]
+    bx0, by0 = int((x - x0) * scale), int((y - y0) * scale)
+    bx1, by1 = int((x + w - x0) * scale + 0.999), int((y + h - y0) * scale + 0.999)
+    ring = [i for i in range(size) if not (bx0 <= i % tw < bx1 and by0 <= i // tw < by1)]
+    if not inner or not ring:
+        return None
+    samples = [data[i:i + size] for i in range(0, len(data) - size + 1, size)]
+
+    # Overlay held still while the picture around it moves
+    confident = [
+        t for t in range(1, len(samples))
+        if (moving := _mean_abs_diff(samples[t], samples[t - 1], ring)) >= PRESENCE_MOTION_MIN
+        and _mean_abs_diff(samples[t], samples[t - 1], inner) <= PRESENCE_STATIC_RATIO * moving
+    ]
+    if len(confident) < 3:
+        if verbose:
+            print("Could not learn the watermark's appearance (too little motion around it)", file=sys.stderr)
+        return None
+
+    template = bytearray(size)
+    for i in inner:
+        template[i] = sorted(samples[t][i] for t in confident)[len(confident) // 2]
+    distances = [_mean_abs_diff(sample, template, inner) for sample in samples]
+    reference = sorted(distances[t] for t in confident)
+    threshold = max(PRESENCE_MIN_DISTANCE, 3 * reference[int(0.9 * (len(reference) - 1))])
+
+    ranges: list[list[float]] = []
+    step = 1 / PRESENCE_SAMPLE_FPS
+    for t, distance in enumerate(distances):
+        if distance > threshold:
+            continue
+        start, end = max(0.0, t * step - PRESENCE_PAD), min(duration, (t + 1) * step + PRESENCE_PAD)
+        if ranges and start - ranges[-1][1] < PRESENCE_MIN_CLEAN:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    if ranges and ranges[0][0] < PRESENCE_MIN_CLEAN:
+        ranges[0][0] = 0.0
+    if ranges and duration - ranges[-1][1] < PRESENCE_MIN_CLEAN:
+        ranges[-1][1] = duration
+    return [(start, end) for start, end in ranges]
 
 
 def run_propainter(
@@ -912,8 +2023,16 @@ def run_propainter(
     ref_stride: int = 10,
     subvideo_length: int = 80,
     verbose: bool = True,
+    env: dict | None = None,
+    cpu_affinity: set[int] | None = None,
+    cancel: threading.Event | None = None,
 ) -> str | None:
-    """Run ProPainter inference."""
+    """Run ProPainter inference.
+
+    ``env`` and ``cpu_affinity`` let parallel chunk workers pin the process to
+    its own GPU or its own share of the cores. Setting ``cancel`` terminates
+    a run in progress, and it returns None.
+    """
 
     venv_python = propainter_path / ".venv" / "bin" / "python"
     inference_script = propainter_path / "inference_propainter.py"
@@ -944,16 +2063,39 @@ def run_propainter(
         print(f"  Precision: {'fp16' if fp16 else 'fp32'}")
 
     # Always capture output so we can report errors
-    result = subprocess.run(
+    preexec_fn = None
+    if cpu_affinity and hasattr(os, "sched_setaffinity"):
+        preexec_fn = lambda: os.sched_setaffinity(0, cpu_affinity)
+
+    proc = subprocess.Popen(
         cmd,
         cwd=propainter_path,
-        capture_output=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
         text=True,
+        env=env,
+        preexec_fn=preexec_fn,
     )
+    while True:
+        try:
+            _, stderr = proc.communicate(timeout=CANCEL_POLL_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            if cancel is None or not cancel.is_set():
+                continue
+        proc.terminate()
+        try:
+            proc.communicate(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+        if verbose:
+            print("ProPainter run cancelled", file=sys.stderr)
+        return None
 
-    if result.returncode != 0:
-        if result.stderr:
-            print(f"ProPainter error: {result.stderr[-1000:]}", file=sys.stderr)
+    if proc.returncode != 0:
+        if stderr:
+            print(f"ProPainter error: {stderr[-1000:]}", file=sys.stderr)
         return None
 
     # Find output file (ProPainter creates results/<video_name>/<video_name>_inpaint.mp4)
@@ -970,6 +2112,116 @@ def run_propainter(
     return None
 
 
+def probe_peak_memory(
+    propainter_path: Path,
+    video_path: str,
+    mask_path: str,
+    output_dir: str,
+    device: str,
+    fp16: bool = True,
+    neighbor_length: int = 10,
+    ref_stride: int = 10,
+    subvideo_length: int = 80,
+) -> int | None:
+    """Run ProPainter once and return its peak memory use in bytes on ``device``."""
+    venv_python = propainter_path / ".venv" / "bin" / "python"
+    cmd = [
+        str(venv_python), "-c", PROBE_WRAPPER,
+        str(propainter_path / "inference_propainter.py"),
+        "-i", video_path,
+        "-m", mask_path,
+        "-o", output_dir,
+        "--neighbor_length", str(neighbor_length),
+        "--ref_stride", str(ref_stride),
+        "--subvideo_length", str(subvideo_length),
+    ]
+    if fp16:
+        cmd.append("--fp16")
+
+    result = subprocess.run(cmd, cwd=propainter_path, capture_output=True, text=True)
+    peaks = [line.split(" ", 1)[1] for line in result.stderr.splitlines() if line.startswith("PROBE_PEAK ")]
+    if result.returncode != 0 or not peaks:
+        print(f"Probe failed: {result.stderr[-500:]}", file=sys.stderr)
+        return None
+
+    peak = json.loads(peaks[-1])
+    if device == "cuda":
+        return peak["cuda"]
+    if device == "mps":
+        return peak["rss"] + peak["mps"]  # unified memory: host and GPU allocations share RAM
+    return peak["rss"]
+
+
+def calibrate_memory_model(
+    propainter_path: Path,
+    device: str,
+    verbose: bool = True,
+    **propainter_args,
+) -> dict | None:
+    """Measure ProPainter's peak memory on synthetic clips and fit a model.
+
+    Runs one probe per CALIBRATION_RESOLUTIONS x CALIBRATION_FRAMES entry,
+    plus one per resolution spanning CALIBRATION_SUBVIDEOS subvideo batches so
+    the fit isn't extrapolated from clips shorter than one batch. Uses the
+    given ProPainter settings and returns the fitted model with its samples.
+    The model is not saved; see save_memory_model().
+    """
+    subvideo_length = propainter_args.get("subvideo_length", 80)  # probe_peak_memory's default
+    frame_counts = sorted(set(CALIBRATION_FRAMES) | {subvideo_length * CALIBRATION_SUBVIDEOS})
+    samples = []
+    with tempfile.TemporaryDirectory(prefix="dewatermark_calibrate_") as work_dir:
+        for width, height in CALIBRATION_RESOLUTIONS:
+            mask_path = str(Path(work_dir) / f"mask_{width}x{height}.png")
+            region = f"{width * 3 // 4},{height * 3 // 4},{width // 8},{height // 8}"
+            if not create_mask_from_region(region, width, height, mask_path):
+                return None
+            for frames in frame_counts:
+                video_path = str(Path(work_dir) / f"probe_{width}x{height}_{frames}.mp4")
+                result = subprocess.run(
+                    [
+                        "ffmpeg", "-y",
+                        "-f", "lavfi", "-i", f"testsrc2=s={width}x{height}:r=30",
+                        "-frames:v", str(frames),
+                        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+                        video_path,
+                    ],
+                    capture_output=True,
+                    text=True,
+                )
+                if result.returncode != 0:
+                    print(f"Error creating probe clip: {result.stderr[-500:]}", file=sys.stderr)
+                    return None
+
+                if verbose:
+                    print(f"  Probing {width}x{height} x {frames} frames...", end=" ", flush=True)
+                started = time.time()
+                peak = probe_peak_memory(
+                    propainter_path,
+                    video_path,
+                    mask_path,
+                    str(Path(work_dir) / "results"),
+                    device,
+                    **propainter_args,
+                )
+                if not peak:
+                    return None
+                if verbose:
+                    print(f"{peak / 1024 ** 3:.2f}GB peak in {time.time() - started:.0f}s")
+                samples.append({"width": width, "height": height, "frames": frames, "peak_bytes": peak})
+
+    model = fit_memory_model(samples)
+    if not model:
+        print("Error: Probe results did not fit a usable model", file=sys.stderr)
+        return None
+    model.update({
+        "device": device,
+        "settings": propainter_args,
+        "samples": samples,
+        "calibrated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    return model
+
+
 # =============================================================================
 # RunPod Cloud Processing
 # =============================================================================
@@ -994,84 +2246,14 @@ def get_runpod_config() -> dict:
         }
 
 
-def _get_r2_client():
-    """Get boto3 S3 client configured for Cloudflare R2."""
-    sys.path.insert(0, str(Path(__file__).parent))
-    try:
-        from config import get_r2_config
-        r2_config = get_r2_config()
-    except ImportError:
-        r2_config = None
-
-    if not r2_config:
-        return None, None
-
-    try:
-        import boto3
-        from botocore.config import Config
-
-        client = boto3.client(
-            "s3",
-            endpoint_url=r2_config["endpoint_url"],
-            aws_access_key_id=r2_config["access_key_id"],
-            aws_secret_access_key=r2_config["secret_access_key"],
-            config=Config(signature_version="s3v4"),
-        )
-        return client, r2_config
-    except ImportError:
-        print("  boto3 not installed, skipping R2", file=sys.stderr)
-        return None, None
-
-
-def _upload_to_r2(file_path: str, file_name: str) -> tuple[str | None, str | None]:
-    """
-    Upload to Cloudflare R2 and return presigned download URL.
-
-    Returns (url, object_key) tuple. object_key is needed for cleanup.
-    """
-    client, config = _get_r2_client()
-    if not client:
-        return None, None
-
-    import uuid
-    object_key = f"dewatermark/{uuid.uuid4().hex[:8]}_{file_name}"
-
-    try:
-        client.upload_file(file_path, config["bucket_name"], object_key)
-
-        # Generate presigned URL (valid for 2 hours)
-        url = client.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": config["bucket_name"], "Key": object_key},
-            ExpiresIn=7200,
-        )
-        return url, object_key
-    except Exception as e:
-        print(f"  R2 upload error: {e}", file=sys.stderr)
-        return None, None
-
-
-def _delete_from_r2(object_key: str) -> bool:
-    """Delete object from R2 after job completion."""
-    client, config = _get_r2_client()
-    if not client or not object_key:
-        return False
-
-    try:
-        client.delete_object(Bucket=config["bucket_name"], Key=object_key)
-        return True
-    except Exception:
-        return False
-
-
 def _download_from_r2(object_key: str, output_path: str) -> bool:
     """Download object from R2 to local path."""
-    client, config = _get_r2_client()
+    client, config = get_r2_client()
     if not client:
         return False
 
     try:
-        client.download_file(config["bucket_name"], object_key, output_path)
+        download_object(client, config["bucket_name"], object_key, output_path)
         return True
     except Exception as e:
         print(f"  R2 download error: {e}", file=sys.stderr)
@@ -1091,116 +2273,43 @@ def upload_to_runpod_storage(file_path: str, api_key: str) -> tuple[str | None,
     print(f"Uploading {file_name} ({file_size // (1024*1024)}MB)...", file=sys.stderr)
 
     # Try R2 first if configured
-    url, r2_key = _upload_to_r2(file_path, file_name)
+    url, r2_key = upload_input(file_path, "dewatermark")
     if url:
         print(f"  Upload complete (R2): {url[:60]}...", file=sys.stderr)
         return url, r2_key
 
-    # Fall back to free services
-    upload_services = [
-        ("litterbox", _upload_to_litterbox),
-        ("0x0.st", _upload_to_0x0),
-        ("file.io", _upload_to_fileio),
-        ("transfer.sh", _upload_to_transfersh),
-    ]
-
-    for service_name, upload_func in upload_services:
-        try:
-            url = upload_func(file_path, file_name)
-            if url:
-                print(f"  Upload complete ({service_name}): {url[:60]}...", file=sys.stderr)
-                return url, None  # No R2 key for cleanup
-        except Exception as e:
-            print(f"  {service_name} failed: {e}", file=sys.stderr)
-            continue
+    # Fall back to free services, racing them so a slow host can't hold things up
+    url, host = hedged_upload(file_path, ["litterbox", "0x0.st", "file.io", "transfer.sh"])
+    if url:
+        print(f"  Upload complete ({host}): {url[:60]}...", file=sys.stderr)
+        return url, None
 
     print("All upload services failed", file=sys.stderr)
     return None, None
 
 
-def _upload_to_litterbox(file_path: str, file_name: str) -> str | None:
-    """Upload to litterbox.catbox.moe (200MB limit, 24h retention) using curl."""
-    result = subprocess.run(
-        [
-            "curl", "-s",
-            "-F", "reqtype=fileupload",
-            "-F", "time=24h",
-            "-F", f"fileToUpload=@{file_path}",
-            "https://litterbox.catbox.moe/resources/internals/api.php",
-        ],
-        capture_output=True,
-        text=True,
-        timeout=600,
-    )
-    if result.returncode == 0:
-        url = result.stdout.strip()
-        if url.startswith("http"):
-            return url
-        else:
-            raise Exception(f"Unexpected response: {url[:100]}")
-    else:
-        raise Exception(f"curl failed: {result.stderr[:100]}")
-
-
-def _upload_to_0x0(file_path: str, file_name: str) -> str | None:
-    """Upload to 0x0.st (512MB limit, 30 day retention) using curl."""
-    result = subprocess.run(
-        ["curl", "-s", "-F", f"file=@{file_path}", "https://0x0.st"],
-        capture_output=True,
-        text=True,
-        timeout=600,
-    )
-    if result.returncode == 0:
-        url = result.stdout.strip()
-        if url.startswith("http"):
-            return url
-        else:
-            raise Exception(f"Unexpected response: {url[:100]}")
-    else:
-        raise Exception(f"curl failed: {result.stderr[:100]}")
-
-
-def _upload_to_fileio(file_path: str, file_name: str) -> str | None:
-    """Upload to file.io (2GB limit, 1 download then deleted)."""
-    with open(file_path, 'rb') as f:
-        response = requests.post(
-            "https://file.io",
-            files={"file": (file_name, f)},
-            timeout=600,
-        )
-    if response.status_code == 200:
-        data = response.json()
-        if data.get("success"):
-            return data.get("link")
-    return None
-
-
-def _upload_to_transfersh(file_path: str, file_name: str) -> str | None:
-    """Upload to transfer.sh (10GB limit, 14 day retention)."""
-    with open(file_path, 'rb') as f:
-        response = requests.put(
-            f"https://transfer.sh/{file_name}",
-            data=f,
-            headers={"Max-Downloads": "5", "Max-Days": "1"},
-            timeout=600,
-        )
-    if response.status_code == 200:
-        return response.text.strip()
-    return None
-
-
 def submit_runpod_job(
-    endpoint_id: str,
-    api_key: str,
+    client: RunPodClient,
     video_url: str,
     region: str | None = None,
     mask_url: str | None = None,
     r2_config: dict | None = None,
     resize_ratio: str | float = "auto",
+    output_key: str | None = None,
+    roi: bool = False,
+    memory_model: dict | None = None,
+    upscale_to: str | None = None,
+    audio_source: str | None = None,
 ) -> dict | None:
-    """Submit a dewatermark job to RunPod serverless endpoint."""
-    url = f"https://api.runpod.ai/v2/{endpoint_id}/run"
-
+    """Submit a dewatermark job to RunPod serverless endpoint.
+
+    ``output_key`` fixes the R2 key the handler uploads the result to, so the
+    job journal can find it again later. ``roi`` asks the handler to inpaint
+    only a window around the mask (see plan_roi). ``memory_model`` is a
+    calibrated CUDA model the handler sizes "auto" resize ratios from.
+    ``upscale_to`` ("original" or "WxH") and ``audio_source`` ("input" or a
+    URL) have the handler scale the result and mux audio in its final encode.
+    """
     # Handle resize_ratio: "auto" or numeric value
     if resize_ratio == "auto":
         ratio_value = "auto"
@@ -1219,6 +2328,17 @@ def submit_runpod_job(
         payload["input"]["region"] = region
     if mask_url:
         payload["input"]["mask_url"] = mask_url
+    if roi:
+        payload["input"]["roi"] = True
+    if upscale_to:
+        payload["input"]["upscale_to"] = upscale_to
+    if audio_source:
+        payload["input"]["audio_source"] = audio_source
+    if memory_model:
+        payload["input"]["memory_model"] = {
+            "bytes_per_pixel_frame": memory_model["bytes_per_pixel_frame"],
+            "base_bytes": memory_model["base_bytes"],
+        }
 
     # Pass R2 credentials for result upload (if configured)
     if r2_config:
@@ -1228,107 +2348,10 @@ def submit_runpod_job(
             "secret_access_key": r2_config["secret_access_key"],
             "bucket_name": r2_config["bucket_name"],
         }
+        if output_key:
+            payload["input"]["r2"]["output_key"] = output_key
 
-    try:
-        response = requests.post(
-            url,
-            json=payload,
-            headers={"Authorization": f"Bearer {api_key}"},
-            timeout=30,
-        )
-
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Job submission failed: HTTP {response.status_code}", file=sys.stderr)
-            print(f"  Response: {response.text[:500]}", file=sys.stderr)
-            return None
-
-    except Exception as e:
-        print(f"Job submission error: {e}", file=sys.stderr)
-        return None
-
-
-def poll_runpod_job(
-    endpoint_id: str,
-    api_key: str,
-    job_id: str,
-    timeout: int = 1800,
-    poll_interval: int = 5,
-    verbose: bool = True,
-) -> dict | None:
-    """Poll RunPod job until completion or timeout."""
-    url = f"https://api.runpod.ai/v2/{endpoint_id}/status/{job_id}"
-    start_time = time.time()
-    last_status = None
-
-    while time.time() - start_time < timeout:
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": f"Bearer {api_key}"},
-                timeout=30,
-            )
-
-            if response.status_code != 200:
-                print(f"Status check failed: HTTP {response.status_code}", file=sys.stderr)
-                time.sleep(poll_interval)
-                continue
-
-            data = response.json()
-            status = data.get("status")
-
-            # Log status changes
-            if verbose and status != last_status:
-                elapsed = int(time.time() - start_time)
-                print(f"  [{elapsed}s] Status: {status}", file=sys.stderr)
-                last_status = status
-
-            if status == "COMPLETED":
-                return data
-            elif status == "FAILED":
-                print(f"Job failed: {data.get('error', 'Unknown error')}", file=sys.stderr)
-                return data
-            elif status in ["IN_QUEUE", "IN_PROGRESS"]:
-                time.sleep(poll_interval)
-            else:
-                # Unknown status
-                time.sleep(poll_interval)
-
-        except Exception as e:
-            print(f"Status check error: {e}", file=sys.stderr)
-            time.sleep(poll_interval)
-
-    print(f"Job timed out after {timeout}s", file=sys.stderr)
-    return None
-
-
-def download_from_url(url: str, output_path: str, verbose: bool = True) -> bool:
-    """Download file from URL to local path."""
-    try:
-        if verbose:
-            print(f"Downloading result...", file=sys.stderr)
-
-        response = requests.get(url, stream=True, timeout=600)
-        response.raise_for_status()
-
-        total_size = int(response.headers.get('content-length', 0))
-        downloaded = 0
-
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-                downloaded += len(chunk)
-
-        if verbose:
-            size_mb = Path(output_path).stat().st_size // (1024 * 1024)
-            print(f"  Downloaded: {output_path} ({size_mb}MB)", file=sys.stderr)
-
-        return True
-
-    except Exception as e:
-        print(f"Download error: {e}", file=sys.stderr)
-        return False
+    return client.submit(payload)
 
 
 def resolve_preset_region(preset: str, width: int, height: int) -> str | None:
@@ -1482,13 +2505,19 @@ def process_with_runpod(
     upscale: bool = False,
     original_width: int | None = None,
     original_height: int | None = None,
+    resume: bool = False,
+    roi: bool = False,
 ) -> dict:
     """
     Process video using RunPod serverless endpoint.
 
     Args:
-        upscale: If True and resize_ratio < 1.0, upscale output to original resolution
+        upscale: Scale the output back to the original resolution (done by the
+            handler, in the same encode as the audio mux)
         original_width/height: Original video dimensions (for upscaling)
+        resume: Collect an earlier job for the same inputs (from the job journal)
+            instead of submitting a new one
+        roi: Inpaint only a padded window around the watermark, at full resolution
 
     Returns dict with success/error and metadata.
     """
@@ -1520,64 +2549,100 @@ def process_with_runpod(
         else:
             print(f"R2 not configured, using free file hosting (less reliable)", file=sys.stderr)
 
-    # Upload video
-    video_url, video_r2_key = upload_to_runpod_storage(input_path, api_key)
-    if not video_url:
-        return {"error": "Failed to upload video"}
-    if video_r2_key:
-        r2_keys_to_cleanup.append(video_r2_key)
-
-    # Upload mask if provided (instead of region)
-    mask_url = None
-    if mask_path:
-        mask_url, mask_r2_key = upload_to_runpod_storage(mask_path, api_key)
-        if not mask_url:
-            return {"error": "Failed to upload mask"}
-        if mask_r2_key:
-            r2_keys_to_cleanup.append(mask_r2_key)
-
-    # Submit job
-    if verbose:
-        print(f"Submitting job...", file=sys.stderr)
-
-    job_response = submit_runpod_job(
-        endpoint_id=endpoint_id,
-        api_key=api_key,
-        video_url=video_url,
-        region=region,
-        mask_url=mask_url,
-        r2_config=r2_config,
-        resize_ratio=resize_ratio,
-    )
+    client = RunPodClient(endpoint_id, api_key, verbose=verbose)
+    journal = JobJournal()
+    inputs_hash = hash_inputs([input_path, mask_path], {
+        "region": region,
+        "resize_ratio": resize_ratio,
+        "roi": roi,
+        "upscale": upscale,
+        "audio": preserve_audio,
+    })
+
+    # Reattach to an earlier submission of the same inputs instead of paying twice
+    job_response = None
+    if resume:
+        reattached = reattach_job(client, journal, "dewatermark", inputs_hash, object_metadata, verbose)
+        if reattached:
+            entry, job_response = reattached
+            r2_keys_to_cleanup.extend(entry.get("r2_keys", []))
+
+    if job_response is None:
+        # Upload video
+        video_url, video_r2_key = upload_to_runpod_storage(input_path, api_key)
+        if not video_url:
+            return {"error": "Failed to upload video"}
+        if video_r2_key:
+            r2_keys_to_cleanup.append(video_r2_key)
+
+        # Upload mask if provided (instead of region)
+        mask_url = None
+        if mask_path:
+            mask_url, mask_r2_key = upload_to_runpod_storage(mask_path, api_key)
+            if not mask_url:
+                return {"error": "Failed to upload mask"}
+            if mask_r2_key:
+                r2_keys_to_cleanup.append(mask_r2_key)
+
+        # Submit job
+        if verbose:
+            print(f"Submitting job...", file=sys.stderr)
+
+        output_key = new_output_key("dewatermark", ".mp4") if r2_config else None
+        job_response = submit_runpod_job(
+            client,
+            video_url=video_url,
+            region=region,
+            mask_url=mask_url,
+            r2_config=r2_config,
+            resize_ratio=resize_ratio,
+            output_key=output_key,
+            roi=roi,
+            memory_model=load_memory_model("cuda"),
+            upscale_to="original" if upscale else None,
+            audio_source="input" if preserve_audio else None,
+        )
 
-    if not job_response:
-        return {"error": "Failed to submit job"}
+        if not job_response:
+            return {"error": "Failed to submit job"}
+
+        job_id = job_response.get("id")
+        if not job_id:
+            return {"error": f"No job ID in response: {job_response}"}
+
+        journal.record(
+            job_id,
+            tool="dewatermark",
+            endpoint_id=endpoint_id,
+            inputs_hash=inputs_hash,
+            output_path=output_path,
+            r2_keys=r2_keys_to_cleanup,
+            output_key=output_key,
+        )
 
-    job_id = job_response.get("id")
-    if not job_id:
-        return {"error": f"No job ID in response: {job_response}"}
+        if verbose:
+            print(f"Job submitted: {job_id}", file=sys.stderr)
 
+    job_id = job_response["id"]
     if verbose:
-        print(f"Job submitted: {job_id}", file=sys.stderr)
         print(f"Waiting for completion (timeout: {timeout}s)...", file=sys.stderr)
 
     # Poll for completion
-    result = poll_runpod_job(
-        endpoint_id=endpoint_id,
-        api_key=api_key,
-        job_id=job_id,
-        timeout=timeout,
-        verbose=verbose,
-    )
+    # Video length scales the learned runtime into a per-job ETA for polling
+    source_info = get_video_info(input_path)
+    result = client.wait(job_response, timeout=timeout, work=source_info["duration"] if source_info else None)
 
     if not result:
-        return {"error": "Job timed out or failed to get status"}
+        return {"error": f"Job {job_id} timed out locally; it may still finish on RunPod. Re-run with --resume to collect it."}
 
     status = result.get("status")
     if status != "COMPLETED":
         error = result.get("error") or result.get("output", {}).get("error") or "Unknown error"
+        journal.update(job_id, status=FAILED, error=str(error))
         return {"error": f"Job failed: {error}"}
 
+    journal.update(job_id, status=COMPLETED)
+
     # Get output from result
     output = result.get("output", {})
     if isinstance(output, dict) and output.get("error"):
@@ -1593,7 +2658,8 @@ def process_with_runpod(
     if output_r2_key:
         if verbose:
             print(f"Downloading result from R2...", file=sys.stderr)
-        downloaded = _download_from_r2(output_r2_key, output_path)
+        with client.timed("download"):
+            downloaded = _download_from_r2(output_r2_key, output_path)
         if downloaded:
             r2_keys_to_cleanup.append(output_r2_key)
             if verbose:
@@ -1601,13 +2667,22 @@ def process_with_runpod(
                 print(f"  Downloaded: {output_path} ({size_mb}MB)", file=sys.stderr)
 
     if not downloaded and output_url:
-        downloaded = download_from_url(output_url, output_path, verbose=verbose)
+        downloaded = client.download(output_url, output_path)
 
     if not downloaded:
         return {"error": f"No output_url or r2_key in result: {output}"}
 
+    journal.update(job_id, status=COLLECTED)
+
+    # Current handlers scale and mux audio in their own final encode; the
+    # local passes below only run for images that predate that
+    finalized = output.get("finalized") if isinstance(output, dict) else None
+    if finalized and verbose:
+        print(f"  Finalized on the worker: {finalized.get('dimensions')}, "
+              f"{'with' if finalized.get('audio') else 'without'} audio ({finalized.get('encoder')})", file=sys.stderr)
+
     # Restore audio from original (ProPainter strips audio)
-    if preserve_audio:
+    if preserve_audio and not finalized:
         temp_video = output_path + ".noaudio.mp4"
         shutil.move(output_path, temp_video)
         if mux_audio_from_original(temp_video, input_path, output_path, verbose=verbose):
@@ -1620,7 +2695,7 @@ def process_with_runpod(
 
     # Upscale to original resolution if requested
     actual_ratio = resize_ratio if isinstance(resize_ratio, float) else None
-    if upscale and original_width and original_height and actual_ratio and actual_ratio < 1.0:
+    if upscale and original_width and original_height and actual_ratio and actual_ratio < 1.0 and not finalized:
         temp_video = output_path + ".small.mp4"
         shutil.move(output_path, temp_video)
         if upscale_video(temp_video, output_path, original_width, original_height, verbose=verbose):
@@ -1631,12 +2706,11 @@ def process_with_runpod(
             if verbose:
                 print(f"  Warning: Upscale failed, output is at reduced resolution", file=sys.stderr)
 
-    # Cleanup R2 objects
+    # Cleanup R2 objects (in the background; the output is already in place)
     if r2_keys_to_cleanup:
         if verbose:
             print(f"Cleaning up {len(r2_keys_to_cleanup)} R2 objects...", file=sys.stderr)
-        for key in r2_keys_to_cleanup:
-            _delete_from_r2(key)
+        delete_objects(r2_keys_to_cleanup)
 
     elapsed = time.time() - start_time
 
@@ -1645,6 +2719,7 @@ def process_with_runpod(
         "output": output_path,
         "job_id": job_id,
         "processing_time_seconds": round(elapsed, 2),
+        "timings": client.timings,
         "runpod_output": output,
     }
 
@@ -2018,6 +3093,40 @@ def main():
         success = install_propainter(propainter_path, verbose=verbose)
         sys.exit(0 if success else 1)
 
+    # Handle --calibrate
+    if args.calibrate:
+        status = check_propainter_installed(propainter_path)
+        if not status["installed"]:
+            print("Error: ProPainter is not installed. Run with --install first.", file=sys.stderr)
+            sys.exit(1)
+        compute = detect_compute_device()
+        device = compute["device"]
+        if args.auto:
+            profile = get_memory_profile(compute["memory_gb"])
+            settings = {k: profile[k] for k in ("neighbor_length", "ref_stride", "subvideo_length")}
+        else:
+            settings = {
+                "neighbor_length": args.neighbor_length,
+                "ref_stride": args.ref_stride,
+                "subvideo_length": args.subvideo_length,
+            }
+        if verbose:
+            print(f"Calibrating ProPainter memory use on {compute['description']}...")
+        model = calibrate_memory_model(propainter_path, device, verbose=verbose, fp16=not args.fp32, **settings)
+        if not model:
+            sys.exit(1)
+        path = save_memory_model(device, model)
+        if args.json:
+            print(json.dumps(model, indent=2))
+        else:
+            per_frame_mb = model["bytes_per_pixel_frame"] * 1280 * 720 / 1024 ** 2
+            print(f"Measured: {per_frame_mb:.2f}MB per 720p frame (default guess {BYTES_PER_FRAME_720P / 1024 ** 2:.1f}MB), "
+                  f"{model['base_bytes'] / 1024 ** 3:.2f}GB base")
+            print(f"Saved to {path}")
+            if device == "cuda":
+                print("RunPod jobs from this machine pass the model to the handler for resize-ratio sizing.")
+        return
+
     # Handle --setup (RunPod endpoint setup)
     if args.setup:
         result = setup_runpod(gpu_id=args.setup_gpu, verbose=verbose)
@@ -2065,10 +3174,12 @@ def main():
         # Determine resize ratio
         resize_ratio = args.resize_ratio
         if resize_ratio == "auto":
-            suggested_ratio, reason = suggest_resize_ratio(video_duration, video_width, video_height)
-            resize_ratio = suggested_ratio
-            if verbose:
-                print(f"Auto resize-ratio: {resize_ratio} ({reason})", file=sys.stderr)
+            # In ROI mode the handler sizes "auto" for the cropped window instead
+            if not args.roi:
+                suggested_ratio, reason = suggest_resize_ratio(video_duration, video_width, video_height)
+                resize_ratio = suggested_ratio
+                if verbose:
+                    print(f"Auto resize-ratio: {resize_ratio} ({reason})", file=sys.stderr)
         else:
             try:
                 resize_ratio = float(resize_ratio)
@@ -2089,6 +3200,7 @@ def main():
                 "video_duration": f"{video_duration:.1f}s",
                 "resize_ratio": resize_ratio,
                 "upscale": args.upscale,
+                "roi": args.roi,
                 "endpoint_configured": bool(config.get("endpoint_id")),
                 "api_key_configured": bool(config.get("api_key")),
                 "timeout": args.runpod_timeout,
@@ -2115,6 +3227,8 @@ def main():
             upscale=args.upscale,
             original_width=video_width,
             original_height=video_height,
+            resume=args.resume,
+            roi=args.roi,
         )
 
         if result.get("error"):
@@ -2208,6 +3322,8 @@ def main():
             if not create_mask_from_region(args.region, video_width, video_height, mask_path):
                 sys.exit(1)
 
+        roi = plan_roi(args.region, mask_path, video_width, video_height, verbose=verbose) if args.roi else None
+
         # Determine settings for dry-run display
         if args.auto:
             compute = detect_compute_device()
@@ -2228,6 +3344,8 @@ def main():
 
         # Get video info for dry-run display
         video_info = get_video_info(args.input)
+        if video_info and roi:
+            video_info = {**video_info, "width": roi[2], "height": roi[3]}
 
         # Dry run
         if args.dry_run:
@@ -2235,20 +3353,23 @@ def main():
             if args.auto and video_info:
                 compute = detect_compute_device()
                 available_memory = compute["memory_gb"] or 16
+                memory_model = load_memory_model(compute["device"])
                 estimated_memory = estimate_frame_memory_gb(
-                    video_info["width"], video_info["height"], video_info["frame_count"]
+                    video_info["width"], video_info["height"], video_info["frame_count"], memory_model
                 )
                 max_duration = calculate_max_duration(
                     available_memory, video_info["width"], video_info["height"], video_info["fps"],
-                    device=compute.get("device", "cpu")
+                    device=compute.get("device", "cpu"), model=memory_model,
                 )
-                needs_split = video_info["duration"] > max_duration
-                chunk_count = max(1, int(video_info["duration"] / (max_duration * 0.9 - args.overlap)) + 1) if needs_split else 1
+                plan = plan_chunk_workers(compute, video_info, max_duration, args.overlap, args.workers, memory_model)
+                needs_split = video_info["duration"] > max_duration or plan["workers"] > 1
+                chunk_count = max(1, int(video_info["duration"] / (plan["chunk_duration"] - args.overlap)) + 1) if needs_split else 1
             else:
                 estimated_memory = None
                 max_duration = None
                 needs_split = False
                 chunk_count = 1
+                plan = None
 
             result = {
                 "dry_run": True,
@@ -2267,10 +3388,14 @@ def main():
 
             if args.auto and video_info:
                 result["estimated_memory_gb"] = f"{estimated_memory:.1f}"
+                result["memory_model"] = "calibrated" if memory_model else "default"
                 result["max_chunk_duration"] = f"{max_duration:.1f}s"
                 result["needs_splitting"] = needs_split
                 if needs_split:
                     result["estimated_chunks"] = chunk_count
+                    result["parallel_workers"] = plan["workers"]
+            if roi:
+                result["roi_window"] = f"{roi[2]}x{roi[3]} at ({roi[0]},{roi[1]})"
 
             if args.json:
                 print(json.dumps(result, indent=2))
@@ -2299,16 +3424,29 @@ def main():
             compute = detect_compute_device()
             available_memory = compute["memory_gb"] or 16
 
+        # In ROI mode everything below works on the cropped window
+        source_path, target_path = args.input, args.output
+        if roi:
+            if verbose:
+                print("Cropping video to ROI window...")
+            cropped = crop_to_roi(args.input, mask_path, roi, temp_dir, verbose=verbose)
+            if not cropped:
+                sys.exit(1)
+            source_path, mask_path = cropped
+            target_path = str(Path(temp_dir) / "roi_output.mp4")
+
         # Get video info and check if splitting is needed
-        video_info = get_video_info(args.input)
+        video_info = get_video_info(source_path)
         if not video_info:
             print("Error: Could not read video info", file=sys.stderr)
             sys.exit(1)
 
+        memory_model = load_memory_model(compute.get("device", "cpu"))
         estimated_memory = estimate_frame_memory_gb(
             video_info["width"],
             video_info["height"],
             video_info["frame_count"],
+            memory_model,
         )
         max_duration = calculate_max_duration(
             available_memory,
@@ -2316,78 +3454,121 @@ def main():
             video_info["height"],
             video_info["fps"],
             device=compute.get("device", "cpu"),
+            model=memory_model,
         )
 
-        needs_splitting = video_info["duration"] > max_duration and not args.no_split
+        presence = None
+        if args.detect_presence and not args.no_split:
+            if verbose:
+                print("Scanning for watermark presence...")
+            presence = detect_watermark_presence(source_path, mask_path, video_info["duration"], verbose=verbose)
+            if presence is not None:
+                covered = sum(end - start for start, end in presence)
+                if verbose:
+                    spans = ", ".join(f"{start:.1f}-{end:.1f}s" for start, end in presence) or "none"
+                    print(f"Watermark visible for {covered:.1f}s of {video_info['duration']:.1f}s ({spans})")
+                if covered >= video_info["duration"] - 1e-3:
+                    presence = None
+
+        plan = plan_chunk_workers(compute, video_info, max_duration, args.overlap, args.workers, memory_model)
+        needs_splitting = (
+            video_info["duration"] > max_duration or plan["workers"] > 1 or presence is not None
+        ) and not args.no_split
 
         if verbose:
             print(f"Video: {video_info['duration']:.1f}s, {video_info['frame_count']} frames at {video_info['fps']:.1f}fps")
-            print(f"Estimated memory for frames: {estimated_memory:.1f}GB")
+            print(f"Estimated memory for frames: {estimated_memory:.1f}GB ({'calibrated' if memory_model else 'default'} model)")
             print(f"Available memory: {available_memory}GB")
             print(f"Max duration per chunk: {max_duration:.1f}s")
 
         if needs_splitting:
             # Auto-split mode
-            chunk_duration = max_duration * 0.9  # 90% of max for safety margin
+            chunk_duration = plan["chunk_duration"]
             if verbose:
                 print()
-                print(f"Video exceeds memory limit - auto-splitting into ~{chunk_duration:.0f}s chunks with {args.overlap}s overlap")
-
-            # Create chunks directory
-            chunks_dir = str(Path(temp_dir) / "chunks")
-            Path(chunks_dir).mkdir(parents=True, exist_ok=True)
-
-            # Split video
-            if verbose:
-                print("Splitting video...")
-            chunks = split_video_with_overlap(
-                args.input,
-                chunks_dir,
-                chunk_duration,
-                overlap=args.overlap,
-                verbose=verbose,
-            )
-
-            if not chunks:
-                print("Error: Failed to split video", file=sys.stderr)
-                sys.exit(1)
-
-            if verbose:
-                print(f"\nProcessing {len(chunks)} chunks...")
-
-            # Process each chunk
-            for i, chunk in enumerate(chunks):
+                if video_info["duration"] > max_duration:
+                    reason = "Video exceeds memory limit"
+                elif plan["workers"] > 1:
+                    reason = f"{plan['workers']} workers available"
+                else:
+                    reason = "Watermark is not always visible"
+                print(f"{reason} - auto-splitting into ~{chunk_duration:.0f}s chunks with {args.overlap}s overlap")
+
+            cache = None
+            if not args.no_chunk_cache:
+                cache = ChunkCache(hash_inputs([args.input, args.mask], {
+                    "region": None if args.mask else args.region,
+                    "roi": list(roi) if roi else None,
+                    "fp16": not args.fp32,
+                    "neighbor_length": neighbor_length,
+                    "ref_stride": ref_stride,
+                    "subvideo_length": subvideo_length,
+                }))
+            cuts = None
+            if not args.no_scene_cuts:
                 if verbose:
-                    print(f"\n--- Chunk {i+1}/{len(chunks)} ({chunk['start']:.1f}s - {chunk['end']:.1f}s) ---")
-
-                chunk_output_dir = str(Path(temp_dir) / f"results_{i:03d}")
-                result_path = run_propainter(
-                    propainter_path,
-                    chunk["input_path"],
-                    mask_path,
-                    chunk_output_dir,
-                    fp16=not args.fp32,
-                    neighbor_length=neighbor_length,
-                    ref_stride=ref_stride,
-                    subvideo_length=subvideo_length,
-                    verbose=verbose,
+                    print("Detecting scene cuts...")
+                cuts = detect_scene_cuts(source_path)
+                if cuts is None:
+                    print("Warning: Scene detection failed, using fixed chunk windows", file=sys.stderr)
+            cached_windows = cache.windows() if cache else None
+            if presence is None:
+                chunks = plan_chunks(video_info["duration"], chunk_duration, args.overlap, cached_windows, cuts)
+            else:
+                chunks = plan_presence_chunks(
+                    video_info["duration"], presence, chunk_duration, args.overlap, source_path, cached_windows, cuts
                 )
-
-                if not result_path:
-                    print(f"Error: Failed to process chunk {i}", file=sys.stderr)
-                    sys.exit(1)
-
-                chunk["output_path"] = result_path
-
-            # Concatenate chunks
+                # Clean spans are stream-copied when the source can sit next to
+                # ProPainter's output, and re-encoded to match it otherwise
+                width, height = video_info["width"], video_info["height"]
+                padded = (-(-width // PROPAINTER_MACRO_BLOCK) * PROPAINTER_MACRO_BLOCK,
+                          -(-height // PROPAINTER_MACRO_BLOCK) * PROPAINTER_MACRO_BLOCK)
+                copyable = stream_copy_compatible(source_path) and padded == (width, height)
+                for chunk in chunks:
+                    if chunk.get("passthrough") and not copyable:
+                        chunk["reencode"] = True
+                        chunk["scale"] = padded if padded != (width, height) else None
+            cached_count = sum(chunk["cached"] for chunk in chunks)
+            passthrough_count = sum(bool(chunk.get("passthrough")) for chunk in chunks)
+            if verbose and cuts:
+                on_cuts = sum(
+                    any(abs(chunk["start"] - cut) < 1e-3 for cut in cuts)
+                    for chunk in chunks if not chunk.get("passthrough")
+                )
+                print(f"Found {len(cuts)} scene cuts; {on_cuts} chunk boundaries fall on one and need no overlap")
             if verbose:
-                print("\n--- Concatenating chunks ---")
-
-            output_path = Path(args.output)
+                for chunk in chunks:
+                    print(
+                        f"  Chunk {chunk['index']}: {chunk['start']:.1f}s - {chunk['end']:.1f}s "
+                        f"(use {chunk['trim_start']:.1f}s - {chunk['trim_end']:.1f}s)"
+                        + (" [cached]" if chunk["cached"] else "")
+                        + (" [clean, passed through]" if chunk.get("passthrough") else "")
+                    )
+                if cached_count:
+                    print(f"\nReusing {cached_count} cached chunks from an earlier run ({cache.dir})")
+                print(f"\nProcessing {len(chunks) - cached_count - passthrough_count} of {len(chunks)} chunks...")
+
+            output_path = Path(target_path)
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
-            if not concatenate_chunks(chunks, str(output_path), verbose=verbose):
-                print("Error: Failed to concatenate chunks", file=sys.stderr)
+            if not run_chunk_pipeline(
+                source_path,
+                chunks,
+                str(output_path),
+                propainter_path,
+                mask_path,
+                temp_dir,
+                plan,
+                device=compute.get("device", "cpu"),
+                keep_temp=args.keep_temp,
+                cache=cache,
+                verbose=verbose,
+                fp16=not args.fp32,
+                neighbor_length=neighbor_length,
+                ref_stride=ref_stride,
+                subvideo_length=subvideo_length,
+            ):
+                print("Error: Failed to process chunks", file=sys.stderr)
                 sys.exit(1)
 
         else:
@@ -2399,7 +3580,7 @@ def main():
             output_dir = str(Path(temp_dir) / "results")
             result_path = run_propainter(
                 propainter_path,
-                args.input,
+                source_path,
                 mask_path,
                 output_dir,
                 fp16=not args.fp32,
@@ -2414,10 +3595,16 @@ def main():
                 sys.exit(1)
 
             # Move result to output path
-            output_path = Path(args.output)
+            output_path = Path(target_path)
             output_path.parent.mkdir(parents=True, exist_ok=True)
             shutil.move(result_path, str(output_path))
 
+        if roi:
+            output_path = Path(args.output)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            if not composite_roi(args.input, target_path, mask_path, roi, str(output_path), verbose=verbose):
+                sys.exit(1)
+
         # Output result
         result = {
             "success": True,
@@ -2426,8 +3613,13 @@ def main():
             "region": args.region,
             "precision": "fp32" if args.fp32 else "fp16",
         }
+        if roi:
+            result["roi_window"] = list(roi)
         if needs_splitting:
             result["chunks"] = len(chunks)
+            result["cached_chunks"] = cached_count
+        if presence is not None:
+            result["watermark_ranges"] = [[round(start, 2), round(end, 2)] for start, end in presence]
 
         if args.json:
             print(json.dumps(result, indent=2))
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Hedged uploads to the free temporary file hosts, used when R2 is not configured.
+
+The hosts are raced rather than tried strictly one after another. One upload
+starts. If it is still crawling after HEDGE_AFTER seconds, the next eligible
+host starts alongside it, and so on. A host that fails, or whose throughput
+drops to nothing for STALL_TIMEOUT seconds, is abandoned and replaced right
+away. The first URL that comes back wins and every other upload is cancelled.
+Hosts whose size limit is below the file size are never tried.
+
+Bodies are streamed from disk through a counting reader. That reader gives the
+throughput figures, and it lets a losing upload be aborted mid-send.
+
+Usage:
+    from file_hosts import hedged_upload
+
+    url, host = hedged_upload("/path/to/video.mp4", ["litterbox", "0x0.st"])
+"""
+
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import requests
+
+MB = 1024 * 1024
+
+HEDGE_AFTER = 10.0               # seconds before a slow upload gets company
+MIN_THROUGHPUT = 256 * 1024      # bytes/s below which an upload counts as slow
+STALL_TIMEOUT = 30.0             # seconds without progress before giving up on a host
+RATE_WINDOW = 5.0                # seconds of history behind the throughput figure
+POLL_INTERVAL = 0.25
+READ_CHUNK = 256 * 1024
+
+
+class UploadCancelled(Exception):
+    """Raised inside a losing upload to abort its request body."""
+
+
+def _text_url(response: requests.Response) -> str | None:
+    url = response.text.strip()
+    if url.startswith("http"):
+        return url
+    raise ValueError(f"Unexpected response: {url[:100]}")
+
+
+def _fileio_url(response: requests.Response) -> str | None:
+    data = response.json()
+    if data.get("success") and data.get("link"):
+        return data["link"]
+    raise ValueError(f"Unexpected response: {json.dumps(data)[:100]}")
+
+
+@dataclass(frozen=True)
+class FileHost:
+    """A temporary file host and how to upload to it.
+
+    With ``file_field`` set the file is posted as multipart form data under that
+    field name. Without it the raw bytes are PUT to ``<url>/<file name>``.
+    """
+
+    name: str
+    url: str
+    max_bytes: int
+    file_field: str | None = "file"
+    form: dict = field(default_factory=dict)
+    headers: dict = field(default_factory=dict)
+    parse: Callable[[requests.Response], str | None] = _text_url
+
+
+FILE_HOSTS = {
+    host.name: host
+    for host in (
+        FileHost(
+            "litterbox",
+            "https://litterbox.catbox.moe/resources/internals/api.php",
+            200 * MB,  # 24h retention
+            file_field="fileToUpload",
+            form={"reqtype": "fileupload", "time": "24h"},
+        ),
+        FileHost("0x0.st", "https://0x0.st", 512 * MB),  # 30 day retention
+        FileHost("file.io", "https://file.io", 2048 * MB, parse=_fileio_url),  # 1 download then deleted
+        FileHost(
+            "transfer.sh",
+            "https://transfer.sh",
+            10240 * MB,  # 14 day retention
+            file_field=None,
+            headers={"Max-Downloads": "5", "Max-Days": "1"},
+        ),
+    )
+}
+
+
+class _Upload:
+    """One in-flight upload: progress counters, outcome and a cancel switch."""
+
+    def __init__(self, host: FileHost, total: int):
+        self.host = host
+        self.total = total
+        self.sent = 0
+        self.started = time.monotonic()
+        self.last_progress = self.started
+        self.url: str | None = None
+        self.error: str | None = None
+        self.cancel = threading.Event()
+        self.finished = threading.Event()
+        self._samples: deque[tuple[float, int]] = deque([(self.started, 0)])
+
+    def advance(self, count: int) -> None:
+        now = time.monotonic()
+        self.sent += count
+        self.last_progress = now
+        self._samples.append((now, self.sent))
+        while len(self._samples) > 2 and now - self._samples[1][0] > RATE_WINDOW:
+            self._samples.popleft()
+
+    @property
+    def body_sent(self) -> bool:
+        return self.sent >= self.total
+
+    def rate(self) -> float:
+        """Recent upload throughput in bytes/s."""
+        now = time.monotonic()
+        since, sent = self._samples[0]
+        if now - since < 1.0:
+            return float("inf")  # too early to judge
+        return (self.sent - sent) / (now - since)
+
+
+class _Body:
+    """Request body streamed from disk between a prefix and suffix.
+
+    ``len()`` lets requests send a Content-Length instead of chunking.
+    """
+
+    def __init__(self, prefix: bytes, file_path: str, suffix: bytes, upload: _Upload):
+        self._segments = [prefix, file_path, suffix]
+        self._length = len(prefix) + Path(file_path).stat().st_size + len(suffix)
+        self._upload = upload
+        self._file = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._upload.cancel.is_set():
+            raise UploadCancelled(self._upload.host.name)
+        size = READ_CHUNK if size is None or size < 0 else size
+        while self._segments:
+            segment = self._segments[0]
+            if isinstance(segment, bytes):
+                chunk, self._segments[0] = segment[:size], segment[size:]
+                if not self._segments[0]:
+                    self._segments.pop(0)
+            else:
+                if self._file is None:
+                    self._file = open(segment, "rb")
+                chunk = self._file.read(size)
+                if not chunk:
+                    self._file.close()
+                    self._segments.pop(0)
+                    continue
+                self._upload.advance(len(chunk))
+            if chunk:
+                return chunk
+        return b""
+
+
+def _send(upload: _Upload, file_path: str, timeout: float) -> None:
+    host = upload.host
+    file_name = Path(file_path).name
+    headers = dict(host.headers)
+    try:
+        if host.file_field:
+            boundary = uuid.uuid4().hex
+            prefix = "".join(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'
+                for key, value in host.form.items()
+            )
+            prefix += (
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{host.file_field}"; filename="{file_name}"\r\n'
+                "Content-Type: application/octet-stream\r\n\r\n"
+            )
+            body = _Body(prefix.encode(), file_path, f"\r\n--{boundary}--\r\n".encode(), upload)
+            headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+            response = requests.post(host.url, data=body, headers=headers, timeout=(30, timeout))
+        else:
+            body = _Body(b"", file_path, b"", upload)
+            response = requests.put(f"{host.url.rstrip('/')}/{file_name}", data=body, headers=headers, timeout=(30, timeout))
+        response.raise_for_status()
+        upload.url = host.parse(response)
+        if not upload.url:
+            upload.error = "no URL in response"
+    except Exception as e:
+        upload.error = "cancelled" if upload.cancel.is_set() else str(e)[:200]
+    finally:
+        upload.finished.set()
+
+
+def hedged_upload(
+    file_path: str,
+    hosts: list[str | FileHost] | None = None,
+    hedge_after: float = HEDGE_AFTER,
+    min_throughput: float = MIN_THROUGHPUT,
+    stall_timeout: float = STALL_TIMEOUT,
+    timeout: float = 600,
+    verbose: bool = True,
+) -> tuple[str | None, str | None]:
+    """Upload file_path to the first host that accepts it.
+
+    ``hosts`` are names from FILE_HOSTS (or FileHost instances) in order of
+    preference; all known hosts by default. Returns (url, host_name), or
+    (None, None) if every eligible host failed or ``timeout`` ran out.
+    """
+    size = Path(file_path).stat().st_size
+    pending = []
+    for host in hosts or list(FILE_HOSTS):
+        host = FILE_HOSTS[host] if isinstance(host, str) else host
+        if size > host.max_bytes:
+            if verbose:
+                print(f"  Skipping {host.name}: file exceeds its {host.max_bytes // MB}MB limit", file=sys.stderr)
+        else:
+            pending.append(host)
+
+    active: list[_Upload] = []
+    deadline = time.monotonic() + timeout
+    last_start = 0.0
+
+    def start_next() -> None:
+        nonlocal last_start
+        upload = _Upload(pending.pop(0), size)
+        if verbose:
+            print(f"  Uploading to {upload.host.name}...", file=sys.stderr)
+        threading.Thread(
+            target=_send,
+            args=(upload, file_path, timeout),
+            name=f"upload-{upload.host.name}",
+            daemon=True,  # a cancelled upload still waiting on its response must not block exit
+        ).start()
+        active.append(upload)
+        last_start = time.monotonic()
+
+    def cancel_all() -> None:
+        for upload in active:
+            upload.cancel.set()
+
+    while pending or active:
+        now = time.monotonic()
+        if now > deadline:
+            cancel_all()
+            if verbose:
+                print(f"  Uploads timed out after {timeout:.0f}s", file=sys.stderr)
+            return None, None
+
+        for upload in [u for u in active if u.finished.is_set()]:
+            active.remove(upload)
+            if upload.url:
+                cancel_all()
+                return upload.url, upload.host.name
+            if verbose:
+                print(f"  {upload.host.name} failed: {upload.error}", file=sys.stderr)
+            last_start = 0.0  # replace it now rather than after another hedge delay
+
+        for upload in [u for u in active if not u.body_sent and now - u.last_progress > stall_timeout]:
+            if verbose:
+                print(f"  {upload.host.name} stalled, abandoning it", file=sys.stderr)
+            upload.cancel.set()
+            active.remove(upload)  # its thread may stay blocked in a socket write
+            last_start = 0.0
+
+        all_slow = all(not u.body_sent and u.rate() < min_throughput for u in active)
+        if pending and (not active or (now - last_start >= hedge_after and all_slow)):
+            if active and verbose:
+                rate = max(u.rate() for u in active) / 1024
+                print(f"  Slow upload ({rate:.0f}KB/s), also trying {pending[0].name}", file=sys.stderr)
+            start_next()
+            continue
+
+        time.sleep(POLL_INTERVAL)
+
+    return None, None
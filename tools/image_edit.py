@@ -44,7 +44,6 @@ from pathlib import Path
 from typing import Optional
 
 try:
-    import requests
     from PIL import Image
     from dotenv import load_dotenv
 except ImportError as e:
@@ -52,11 +51,18 @@ except ImportError as e:
     print("Install with: pip install requests Pillow python-dotenv")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent))
+from job_journal import JobJournal, hash_inputs, reattach_job
+from runpod_client import LOCAL_TIMEOUT, JobScheduler, RunPodClient
+
 load_dotenv()
 
 RUNPOD_API_KEY = os.getenv("RUNPOD_API_KEY")
 QWEN_EDIT_ENDPOINT = os.getenv("RUNPOD_QWEN_EDIT_ENDPOINT_ID")
 
+# How long /runsync may hold the request (warm edits take ~10-30s)
+SYNC_WAIT_SECONDS = 60
+
 # Background presets
 BACKGROUND_PRESETS = {
     "office": "modern professional office with glass windows and city view",
@@ -162,8 +168,8 @@ def build_prompt(
     return prompt
 
 
-def call_endpoint(payload: dict, timeout: int = 600) -> tuple[dict, float]:
-    """Call RunPod endpoint and return (result, elapsed_seconds)."""
+def make_client() -> RunPodClient:
+    """RunPodClient for the edit endpoint that logs queue/progress changes."""
     if not RUNPOD_API_KEY:
         log("RUNPOD_API_KEY not set in .env", "error")
         sys.exit(1)
@@ -173,66 +179,97 @@ def call_endpoint(payload: dict, timeout: int = 600) -> tuple[dict, float]:
         log("Deploy the endpoint first, then add to .env", "info")
         sys.exit(1)
 
-    headers = {
-        "Authorization": f"Bearer {RUNPOD_API_KEY}",
-        "Content-Type": "application/json"
-    }
+    def report_status(status: str, elapsed: int):
+        if status == "IN_PROGRESS":
+            log(f"[{elapsed}s] Generating...", "dim")
+        elif status == "IN_QUEUE":
+            log(f"[{elapsed}s] Waiting for GPU...", "dim")
+
+    return RunPodClient(QWEN_EDIT_ENDPOINT, RUNPOD_API_KEY, on_status=report_status)
+
 
+def call_endpoint(
+    payload: dict,
+    timeout: int = 600,
+    client: Optional[RunPodClient] = None,
+    job: Optional[dict] = None,
+    on_submit=None,
+) -> tuple[dict, float]:
+    """Call RunPod endpoint and return (result, elapsed_seconds).
+
+    ``job`` is an earlier submission (e.g. reattached from the job journal) to
+    wait for instead of submitting ``payload``. ``on_submit(job)`` is called
+    for a new submission. Errors come back as ``{"error": ..., "status": ...}``
+    with the job's RunPod status, or LOCAL_TIMEOUT if it is still running.
+    """
+    client = client or make_client()
     start = time.time()
 
-    try:
-        # Submit async job
-        run_url = f"https://api.runpod.ai/v2/{QWEN_EDIT_ENDPOINT}/run"
-        response = requests.post(run_url, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        result = response.json()
+    if job is None:
+        # Try /runsync first: a warm worker returns the edit in the same request,
+        # so only cold starts fall through to polling
+        job = client.submit_sync(payload, wait=SYNC_WAIT_SECONDS)
+        if not job or not job.get("id"):
+            return {"error": "job submission failed"}, time.time() - start
+        if on_submit:
+            on_submit(job)
 
-        job_id = result.get("id")
-        status = result.get("status")
+    status = job.get("status")
 
-        if status == "COMPLETED":
-            return result.get("output", result), time.time() - start
+    if status == "COMPLETED":
+        return job.get("output", job), time.time() - start
 
-        if status == "FAILED":
-            return {"error": result.get("error", "Unknown error")}, time.time() - start
+    if status == "FAILED":
+        return {"error": job.get("error", "Unknown error"), "status": status}, time.time() - start
 
-        # Poll for completion
-        log(f"Processing... (cold start may take 5-10 min on first run)", "warn")
-        status_url = f"https://api.runpod.ai/v2/{QWEN_EDIT_ENDPOINT}/status/{job_id}"
+    # Poll for completion
+    log(f"Processing... (cold start may take 5-10 min on first run)", "warn")
+    status_data = client.poll(job["id"], timeout=max(1, timeout - int(time.time() - start)))
 
-        poll_interval = 5
-        last_status = None
-        while time.time() - start < timeout:
-            time.sleep(poll_interval)
-            elapsed = time.time() - start
+    if status_data is None:
+        return {
+            "error": f"job {job['id']} timed out locally; it may still finish on RunPod. Re-run with --resume to collect it.",
+            "status": LOCAL_TIMEOUT,
+        }, time.time() - start
 
-            status_resp = requests.get(status_url, headers=headers, timeout=30)
-            status_data = status_resp.json()
-            status = status_data.get("status")
+    status = status_data.get("status")
+    if status == "COMPLETED":
+        return status_data.get("output", status_data), time.time() - start
 
-            if status != last_status:
-                if status == "IN_PROGRESS":
-                    log(f"[{elapsed:.0f}s] Generating...", "dim")
-                elif status == "IN_QUEUE":
-                    log(f"[{elapsed:.0f}s] Waiting for GPU...", "dim")
-                last_status = status
+    if status == "FAILED":
+        return {"error": status_data.get("error", "Unknown error"), "status": status}, time.time() - start
 
-            if status == "COMPLETED":
-                return status_data.get("output", status_data), time.time() - start
+    return {"error": f"Job {status}", "status": status}, time.time() - start
 
-            if status == "FAILED":
-                error = status_data.get("error", "Unknown error")
-                return {"error": error}, time.time() - start
 
-            if status in ("CANCELLED", "TIMED_OUT"):
-                return {"error": f"Job {status}"}, time.time() - start
+def build_payload(
+    input_paths: list[str],
+    prompt: str,
+    seed: Optional[int] = None,
+    steps: int = 8,
+    guidance: float = 1.0,
+    negative_prompt: Optional[str] = None,
+) -> dict:
+    """Build the endpoint payload: primary image plus up to 2 reference images."""
+    payload = {
+        "input": {
+            "image_base64": encode_image(input_paths[0]),
+            "prompt": prompt,
+            "num_inference_steps": steps,
+            "guidance_scale": guidance,
+        }
+    }
 
-        return {"error": "polling timeout"}, time.time() - start
+    if len(input_paths) > 1:
+        payload["input"]["images_base64"] = [encode_image(p) for p in input_paths[1:3]]
 
-    except requests.exceptions.Timeout:
-        return {"error": "timeout"}, time.time() - start
-    except Exception as e:
-        return {"error": str(e)}, time.time() - start
+    if seed is not None:
+        payload["input"]["seed"] = seed
+
+    if negative_prompt:
+        payload["input"]["negative_prompt"] = negative_prompt
+
+    return payload
 
 
 def edit_image(
@@ -245,10 +282,14 @@ def edit_image(
     negative_prompt: Optional[str] = None,
     open_result: bool = True,
     verbose: bool = False,
+    resume: bool = False,
 ) -> Optional[str]:
     """
     Edit image(s) with the given prompt.
 
+    The job is journalled; with ``resume``, an earlier job for the same inputs
+    that RunPod still knows about is collected instead of submitting again.
+
     Returns output path on success, None on failure.
     """
     # Validate inputs
@@ -266,45 +307,58 @@ def edit_image(
 
     log(f"Prompt: {prompt}", "info")
 
-    # Build payload with primary image + optional reference images
-    payload = {
-        "input": {
-            "image_base64": encode_image(input_paths[0]),
-            "prompt": prompt,
-            "num_inference_steps": steps,
-            "guidance_scale": guidance,
-        }
-    }
-
     if guidance != 1.0:
         log(f"Guidance: {guidance}", "dim")
 
-    # Add additional reference images (up to 2 more for 3 total)
     if len(input_paths) > 1:
         log(f"Multi-image mode: {len(input_paths)} images", "info")
-        payload["input"]["images_base64"] = [encode_image(p) for p in input_paths[1:3]]
-
-    if seed is not None:
-        payload["input"]["seed"] = seed
 
     if negative_prompt:
-        payload["input"]["negative_prompt"] = negative_prompt
         log(f"Negative: {negative_prompt}", "dim")
 
+    # Determine output path
+    if output_path is None:
+        input_stem = Path(input_paths[0]).stem
+        output_path = f"{input_stem}_edited.png"
+
+    client = make_client()
+    journal = JobJournal()
+    params = {"prompt": prompt, "seed": seed, "steps": steps, "guidance": guidance, "negative_prompt": negative_prompt}
+    inputs_hash = hash_inputs(input_paths, params)
+    job = None
+    if resume:
+        # Results come back inline, so there is no R2 object to fall back on
+        reattached = reattach_job(client, journal, "image-edit", inputs_hash, verbose=verbose)
+        if reattached:
+            job = reattached[1]
+    job_id = job["id"] if job else None
+
+    def record(submitted: dict) -> None:
+        nonlocal job_id
+        job_id = submitted["id"]
+        journal.record(
+            job_id,
+            tool="image-edit",
+            endpoint_id=QWEN_EDIT_ENDPOINT,
+            inputs_hash=inputs_hash,
+            output_path=str(output_path),
+            params=params,
+        )
+
     # Call endpoint
-    result, elapsed = call_endpoint(payload)
+    payload = build_payload(input_paths, prompt, seed, steps, guidance, negative_prompt) if job is None else None
+    result, elapsed = call_endpoint(payload, client=client, job=job, on_submit=record)
 
     if "error" in result:
         log(f"Edit failed: {result['error']}", "error")
+        if job_id:
+            journal.settle(job_id, result, False, result["error"])
         return None
 
-    # Determine output path
-    if output_path is None:
-        input_stem = Path(input_paths[0]).stem
-        output_path = f"{input_stem}_edited.png"
-
     # Save result
     decode_and_save(result["edited_image_base64"], output_path)
+    if job_id:
+        journal.settle(job_id, result, True)
 
     # Report results
     inference_ms = result.get("inference_time_ms", 0)
@@ -335,10 +389,17 @@ def batch_edit(
     seed: Optional[int] = None,
     steps: int = 8,
     verbose: bool = False,
+    concurrency: Optional[int] = None,
+    timeout: int = 600,
+    resume: bool = False,
 ) -> tuple[int, int]:
     """
     Batch edit all images in a directory.
 
+    Up to ``concurrency`` jobs (default: the endpoint's max workers) run at once.
+    Jobs are journalled; with ``resume``, an image whose earlier job RunPod still
+    knows about is collected from it instead of being submitted again.
+
     Returns (success_count, fail_count).
     """
     input_path = Path(input_dir)
@@ -360,29 +421,74 @@ def batch_edit(
 
     log(f"Found {len(images)} images to process", "info")
 
+    if not RUNPOD_API_KEY or not QWEN_EDIT_ENDPOINT:
+        log("RUNPOD_API_KEY and RUNPOD_QWEN_EDIT_ENDPOINT_ID must be set in .env", "error")
+        return 0, len(images)
+
+    # Keep several edits in flight; results are saved as each one finishes
+    client = RunPodClient(QWEN_EDIT_ENDPOINT, RUNPOD_API_KEY, verbose=verbose)
+    scheduler = JobScheduler(client, max_in_flight=concurrency, timeout=timeout)
+    log(f"Up to {scheduler.max_in_flight} edits in parallel", "dim")
+
+    journal = JobJournal()
+    params = {"prompt": prompt, "seed": seed, "steps": steps}
+    inputs_hashes: dict[Path, str] = {}
+    job_ids: dict[Path, str] = {}
+
+    def jobs():
+        for img_path in images:
+            inputs_hashes[img_path] = hash_inputs([str(img_path)], params)
+            if resume:
+                # Results come back inline, so there is no R2 object to fall back on
+                reattached = reattach_job(client, journal, "image-edit", inputs_hashes[img_path], verbose=verbose)
+                if reattached:
+                    job_ids[img_path] = reattached[1]["id"]
+                    yield img_path, None, None, reattached[1]
+                    continue
+            yield img_path, build_payload([str(img_path)], prompt, seed=seed, steps=steps)
+
+    def record(img_path: Path, job: dict) -> None:
+        job_ids[img_path] = job["id"]
+        journal.record(
+            job["id"],
+            tool="image-edit",
+            endpoint_id=QWEN_EDIT_ENDPOINT,
+            inputs_hash=inputs_hashes[img_path],
+            output_path=str(output_path / f"{img_path.stem}_edited.png"),
+            params=params,
+        )
+
     success = 0
     fail = 0
+    start = time.time()
 
-    for i, img_path in enumerate(images, 1):
-        log(f"\n[{i}/{len(images)}] Processing {img_path.name}...", "info")
-        out_file = output_path / f"{img_path.stem}_edited.png"
-
-        result = edit_image(
-            input_paths=[str(img_path)],
-            prompt=prompt,
-            output_path=str(out_file),
-            seed=seed,
-            steps=steps,
-            open_result=False,
-            verbose=verbose,
-        )
-
-        if result:
-            success += 1
+    for img_path, result in scheduler.run(jobs(), on_submit=record):
+        done = success + fail + 1
+        output = result.get("output", {}) if result else {}
+
+        if not result:
+            error = "failed to submit"
+        elif result.get("status") == LOCAL_TIMEOUT:
+            error = f"job {result['id']} timed out locally; it may still finish on RunPod. Re-run with --resume to collect it."
+        elif result.get("status") != "COMPLETED":
+            error = result.get("error") or f"Job {result.get('status')}"
+        elif "error" in output:
+            error = output["error"]
         else:
+            error = None
+
+        if error:
+            log(f"[{done}/{len(images)}] {img_path.name}: {error}", "error")
             fail += 1
+        else:
+            out_file = output_path / f"{img_path.stem}_edited.png"
+            decode_and_save(output["edited_image_base64"], str(out_file))
+            log(f"[{done}/{len(images)}] Saved: {out_file}", "success")
+            success += 1
+        if img_path in job_ids:
+            journal.settle(job_ids[img_path], result, error is None, error)
 
-    log(f"\nBatch complete: {success} success, {fail} failed", "success" if fail == 0 else "warn")
+    log(f"\nBatch complete: {success} success, {fail} failed in {time.time() - start:.1f}s", "success" if fail == 0 else "warn")
     return success, fail
 
 
@@ -441,6 +547,8 @@ Examples:
     adv_group.add_argument("--steps", type=int, default=8, help="Inference steps (default: 8)")
     adv_group.add_argument("--guidance", "-g", type=float, default=1.0, help="Guidance scale - higher = follows prompt more strictly (default: 1.0)")
     adv_group.add_argument("--negative", "-n", help="Negative prompt - things to avoid")
+    adv_group.add_argument("--concurrency", type=int, help="Max parallel jobs for --input-dir (default: endpoint's max workers)")
+    adv_group.add_argument("--resume", action="store_true", help="Collect earlier unfinished jobs for the same inputs instead of resubmitting")
     adv_group.add_argument("--verbose", action="store_true", help="Show detailed output")
 
     # Utility
@@ -490,6 +598,8 @@ Examples:
             seed=args.seed,
             steps=args.steps,
             verbose=args.verbose,
+            concurrency=args.concurrency,
+            resume=args.resume,
         )
     else:
         edit_image(
@@ -502,6 +612,7 @@ Examples:
             negative_prompt=args.negative,
             open_result=not args.no_open,
             verbose=args.verbose,
+            resume=args.resume,
         )
 
 
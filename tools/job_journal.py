@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+On-disk journal of RunPod job submissions, so finished GPU work can be collected
+after the local client gave up (timeout, Ctrl-C, laptop asleep).
+
+Every submission is appended to <state dir>/jobs.jsonl with its tool, endpoint,
+job id, a hash of the inputs, the R2 keys involved and the intended output path.
+Later records for the same job id supersede earlier ones.
+
+Tools use it like this:
+
+    journal = JobJournal()
+    digest = hash_inputs([video_path], {"region": region})
+    if resume:
+        reattached = reattach_job(client, journal, "dewatermark", digest, object_metadata)
+    ...
+    journal.record(job_id, tool="dewatermark", endpoint_id=..., inputs_hash=digest, ...)
+    journal.update(job_id, status="collected")
+
+Usage (inspect the journal):
+    python tools/job_journal.py            # unfinished jobs
+    python tools/job_journal.py --all      # everything
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import get_state_dir
+
+# Statuses a journal entry moves through
+SUBMITTED = "submitted"      # job accepted by RunPod, result not yet seen
+COMPLETED = "completed"      # RunPod reported COMPLETED, output not yet saved locally
+COLLECTED = "collected"      # output written to output_path
+FAILED = "failed"            # job failed/cancelled, or its result expired
+UNFINISHED = (SUBMITTED, COMPLETED)
+
+# RunPod statuses after which a journalled job can't produce a result anymore
+UNRECOVERABLE = ("FAILED", "CANCELLED", "TIMED_OUT", "NOT_FOUND")
+STATUS_RETRIES = 3
+STATUS_RETRY_DELAY = 5.0
+
+_hash_cache: dict[tuple, str] = {}
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file's contents, memoised per (path, size, mtime)."""
+    stat = Path(path).stat()
+    cache_key = (str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns)
+    if cache_key not in _hash_cache:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        _hash_cache[cache_key] = digest.hexdigest()
+    return _hash_cache[cache_key]
+
+
+def hash_inputs(paths: list[str | None], params: dict | None = None) -> str:
+    """Hash input file contents plus the job parameters that affect the result."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update((file_sha256(path) if path else "-").encode())
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def new_output_key(tool: str, extension: str) -> str:
+    """Pick the R2 key a handler should upload its result to.
+
+    Choosing it client-side means the result can be found again even after
+    RunPod has forgotten the job's status.
+    """
+    return f"{tool}/results/{uuid.uuid4().hex}{extension}"
+
+
+class JobJournal:
+    """Append-only JSONL journal of RunPod jobs."""
+
+    def __init__(self, path: Path | None = None):
+        self.path = path or get_state_dir() / "jobs.jsonl"
+        self._lock = threading.Lock()
+
+    def _append(self, entry: dict) -> None:
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def entries(self) -> dict[str, dict]:
+        """Latest state of every journalled job, keyed by job id."""
+        jobs: dict[str, dict] = {}
+        if not self.path.exists():
+            return jobs
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn write from a killed process
+                job_id = entry.get("job_id")
+                if job_id:
+                    jobs.setdefault(job_id, {}).update(entry)
+        return jobs
+
+    def record(
+        self,
+        job_id: str,
+        tool: str,
+        endpoint_id: str,
+        inputs_hash: str,
+        output_path: str,
+        r2_keys: list[str] | None = None,
+        output_key: str | None = None,
+        params: dict | None = None,
+    ) -> None:
+        """Record a fresh submission."""
+        self._append({
+            "job_id": job_id,
+            "tool": tool,
+            "endpoint_id": endpoint_id,
+            "inputs_hash": inputs_hash,
+            "output_path": str(output_path),
+            "r2_keys": r2_keys or [],
+            "output_key": output_key,
+            "params": params or {},
+            "status": SUBMITTED,
+            "submitted_at": time.time(),
+        })
+
+    def update(self, job_id: str, **fields) -> None:
+        """Record a status change or extra fields for an existing job."""
+        self._append({"job_id": job_id, "updated_at": time.time(), **fields})
+
+    def settle(self, job_id: str, result: dict | None, collected: bool, error: str | None = None) -> None:
+        """Record how a job ended: output saved, finished but not saved, or failed.
+
+        A job the client stopped waiting for (status LOCAL_TIMEOUT) stays
+        SUBMITTED so --resume can still collect it.
+        """
+        if result and result.get("status") == "LOCAL_TIMEOUT":
+            return
+        if collected:
+            self.update(job_id, status=COLLECTED)
+        elif result and result.get("status") == "COMPLETED":
+            self.update(job_id, status=COMPLETED)
+        else:
+            self.update(job_id, status=FAILED, error=error or (result or {}).get("error") or "timed out")
+
+    def get(self, job_id: str) -> dict | None:
+        return self.entries().get(job_id)
+
+    def find_unfinished(self, tool: str, inputs_hash: str, endpoint_id: str | None = None) -> dict | None:
+        """Most recent unfinished job for these exact inputs, if any."""
+        matches = [
+            entry for entry in self.entries().values()
+            if entry.get("tool") == tool
+            and entry.get("inputs_hash") == inputs_hash
+            and entry.get("status") in UNFINISHED
+            and (endpoint_id is None or entry.get("endpoint_id") == endpoint_id)
+        ]
+        if not matches:
+            return None
+        return max(matches, key=lambda e: e.get("submitted_at", 0))
+
+    def unfinished(self, tool: str | None = None) -> list[dict]:
+        return sorted(
+            (
+                entry for entry in self.entries().values()
+                if entry.get("status") in UNFINISHED and (tool is None or entry.get("tool") == tool)
+            ),
+            key=lambda e: e.get("submitted_at", 0),
+        )
+
+
+def reattach_job(
+    client,
+    journal: JobJournal,
+    tool: str,
+    inputs_hash: str,
+    r2_metadata: Callable[[str], dict | None] | None = None,
+    verbose: bool = True,
+) -> tuple[dict, dict] | None:
+    """Find an earlier submission of the same inputs and reconnect to it.
+
+    Returns ``(journal_entry, job)`` where ``job`` is a status response that can be
+    handed to ``client.wait()``. It is either still running or already finished.
+    If RunPod no longer knows the job but ``r2_metadata`` still finds its result
+    object in R2, a synthetic COMPLETED response pointing at that key is
+    returned. A handler that stored a JSON "finalized" metadata field on the
+    object gets it back as ``output["finalized"]``, as in its own response. Returns None
+    when there is nothing to reattach to and the job has to be submitted again.
+
+    Only an explicit FAILED/CANCELLED/TIMED_OUT status or a 404 counts as
+    unrecoverable. If the status can't be fetched at all, the job is handed
+    back as IN_QUEUE so the caller's poll keeps retrying instead of
+    submitting a duplicate of a job that may still be running.
+    """
+    entry = journal.find_unfinished(tool, inputs_hash, endpoint_id=client.endpoint_id)
+    if not entry:
+        if verbose:
+            print("No earlier job for these inputs in the journal, submitting a new one", file=sys.stderr)
+        return None
+
+    job_id = entry["job_id"]
+    if verbose:
+        print(f"Reattaching to job {job_id} (submitted {time.ctime(entry.get('submitted_at', 0))})", file=sys.stderr)
+
+    data = None
+    for attempt in range(STATUS_RETRIES):
+        data = client.status(job_id, report_missing=True)
+        if data is not None:
+            break
+        if attempt < STATUS_RETRIES - 1:
+            time.sleep(STATUS_RETRY_DELAY)
+    if data is None:
+        if verbose:
+            print(f"  Could not fetch the status of job {job_id}, waiting on it anyway", file=sys.stderr)
+        return entry, {"id": job_id, "status": "IN_QUEUE"}
+
+    status = data.get("status")
+    if status not in UNRECOVERABLE:
+        data.setdefault("id", job_id)
+        return entry, data
+
+    output_key = entry.get("output_key")
+    metadata = r2_metadata(output_key) if output_key and r2_metadata else None
+    if metadata is not None:
+        if verbose:
+            print(f"  Job status expired, but its result is still in R2: {output_key}", file=sys.stderr)
+        output = {"r2_key": output_key}
+        if metadata.get("finalized"):
+            output["finalized"] = json.loads(metadata["finalized"])
+        return entry, {"id": job_id, "status": "COMPLETED", "output": output}
+
+    if verbose:
+        print(f"  Job {job_id} can't be recovered (status: {status}), submitting a new one", file=sys.stderr)
+    journal.update(job_id, status=FAILED, error=f"not recoverable (status: {status})")
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show journalled RunPod jobs")
+    parser.add_argument("--all", action="store_true", help="Include collected and failed jobs")
+    parser.add_argument("--tool", help="Only show jobs for this tool")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+    args = parser.parse_args()
+
+    journal = JobJournal()
+    if args.all:
+        jobs = sorted(journal.entries().values(), key=lambda e: e.get("submitted_at", 0))
+        if args.tool:
+            jobs = [j for j in jobs if j.get("tool") == args.tool]
+    else:
+        jobs = journal.unfinished(args.tool)
+
+    if args.json:
+        print(json.dumps(jobs, indent=2))
+        return
+
+    if not jobs:
+        print("No jobs")
+        return
+
+    for job in jobs:
+        submitted = time.strftime("%Y-%m-%d %H:%M", time.localtime(job.get("submitted_at", 0)))
+        print(f"{submitted}  {job.get('tool', '?'):12} {job['job_id']}  {job.get('status', '?'):10} -> {job.get('output_path')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -42,11 +42,17 @@ import base64
 import json
 import os
 import sys
-import time
 from pathlib import Path
 
 import requests
 
+sys.path.insert(0, str(Path(__file__).parent))
+from file_hosts import hedged_upload
+from job_journal import COLLECTED, COMPLETED, FAILED, JobJournal, hash_inputs, new_output_key, reattach_job
+from r2_storage import delete_objects, get_r2_client, object_metadata, upload_input
+from runpod_client import LOCAL_TIMEOUT, RUNSYNC_WAIT_SECONDS, TERMINAL_STATUSES, JobScheduler, RunPodClient
+from transfer import download_object
+
 # Docker image for RunPod endpoint
 QWEN3_TTS_DOCKER_IMAGE = "ghcr.io/conalmullan/video-toolkit-qwen3-tts:latest"
 QWEN3_TTS_TEMPLATE_NAME = "video-toolkit-qwen3-tts"
@@ -119,80 +125,14 @@ def get_runpod_config() -> dict:
     }
 
 
-def _get_r2_client():
-    """Get boto3 S3 client configured for Cloudflare R2."""
-    sys.path.insert(0, str(Path(__file__).parent))
-    try:
-        from config import get_r2_config
-        r2_config = get_r2_config()
-    except ImportError:
-        r2_config = None
-
-    if not r2_config:
-        return None, None
-
-    try:
-        import boto3
-        from botocore.config import Config
-
-        client = boto3.client(
-            "s3",
-            endpoint_url=r2_config["endpoint_url"],
-            aws_access_key_id=r2_config["access_key_id"],
-            aws_secret_access_key=r2_config["secret_access_key"],
-            config=Config(signature_version="s3v4"),
-        )
-        return client, r2_config
-    except ImportError:
-        print("  boto3 not installed, skipping R2", file=sys.stderr)
-        return None, None
-
-
-def _upload_to_r2(file_path: str, prefix: str) -> tuple[str | None, str | None]:
-    """Upload to Cloudflare R2 and return presigned download URL."""
-    client, config = _get_r2_client()
-    if not client:
-        return None, None
-
-    import uuid
-    file_name = Path(file_path).name
-    object_key = f"{prefix}/{uuid.uuid4().hex[:8]}_{file_name}"
-
-    try:
-        client.upload_file(file_path, config["bucket_name"], object_key)
-
-        url = client.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": config["bucket_name"], "Key": object_key},
-            ExpiresIn=7200,
-        )
-        return url, object_key
-    except Exception as e:
-        print(f"  R2 upload error: {e}", file=sys.stderr)
-        return None, None
-
-
-def _delete_from_r2(object_key: str) -> bool:
-    """Delete object from R2 after job completion."""
-    client, config = _get_r2_client()
-    if not client or not object_key:
-        return False
-
-    try:
-        client.delete_object(Bucket=config["bucket_name"], Key=object_key)
-        return True
-    except Exception:
-        return False
-
-
 def _download_from_r2(object_key: str, output_path: str) -> bool:
     """Download object from R2 to local path."""
-    client, config = _get_r2_client()
+    client, config = get_r2_client()
     if not client:
         return False
 
     try:
-        client.download_file(config["bucket_name"], object_key, output_path)
+        download_object(client, config["bucket_name"], object_key, output_path)
         return True
     except Exception as e:
         print(f"  R2 download error: {e}", file=sys.stderr)
@@ -206,64 +146,21 @@ def upload_to_storage(file_path: str, prefix: str) -> tuple[str | None, str | No
 
     print(f"Uploading {file_name} ({file_size // 1024}KB)...", file=sys.stderr)
 
-    url, r2_key = _upload_to_r2(file_path, prefix)
+    url, r2_key = upload_input(file_path, prefix)
     if url:
         print(f"  Upload complete (R2)", file=sys.stderr)
         return url, r2_key
 
-    # Fall back to free services
-    for service_name, upload_func in [("litterbox", _upload_to_litterbox), ("0x0.st", _upload_to_0x0)]:
-        try:
-            url = upload_func(file_path, file_name)
-            if url:
-                print(f"  Upload complete ({service_name})", file=sys.stderr)
-                return url, None
-        except Exception as e:
-            print(f"  {service_name} failed: {e}", file=sys.stderr)
-            continue
+    # Fall back to free services, racing them so a slow host can't hold things up
+    url, host = hedged_upload(file_path, ["litterbox", "0x0.st"])
+    if url:
+        print(f"  Upload complete ({host})", file=sys.stderr)
+        return url, None
 
     print("All upload services failed", file=sys.stderr)
     return None, None
 
 
-def _upload_to_litterbox(file_path: str, file_name: str) -> str | None:
-    """Upload to litterbox.catbox.moe (200MB limit, 24h retention)."""
-    import subprocess
-    result = subprocess.run(
-        [
-            "curl", "-s",
-            "-F", "reqtype=fileupload",
-            "-F", "time=24h",
-            "-F", f"fileToUpload=@{file_path}",
-            "https://litterbox.catbox.moe/resources/internals/api.php",
-        ],
-        capture_output=True,
-        text=True,
-        timeout=300,
-    )
-    if result.returncode == 0:
-        url = result.stdout.strip()
-        if url.startswith("http"):
-            return url
-    return None
-
-
-def _upload_to_0x0(file_path: str, file_name: str) -> str | None:
-    """Upload to 0x0.st (512MB limit, 30 day retention)."""
-    import subprocess
-    result = subprocess.run(
-        ["curl", "-s", "-F", f"file=@{file_path}", "https://0x0.st"],
-        capture_output=True,
-        text=True,
-        timeout=300,
-    )
-    if result.returncode == 0:
-        url = result.stdout.strip()
-        if url.startswith("http"):
-            return url
-    return None
-
-
 def get_audio_duration(file_path: str) -> float | None:
     """Get audio duration in seconds using ffprobe."""
     import subprocess
@@ -285,9 +182,7 @@ def get_audio_duration(file_path: str) -> float | None:
     return None
 
 
-def submit_runpod_job(
-    endpoint_id: str,
-    api_key: str,
+def build_job_payload(
     text: str,
     mode: str = "custom_voice",
     speaker: str = "Ryan",
@@ -299,10 +194,9 @@ def submit_runpod_job(
     r2_config: dict | None = None,
     temperature: float | None = None,
     top_p: float | None = None,
-) -> dict | None:
-    """Submit a Qwen3-TTS job to RunPod serverless endpoint."""
-    url = f"https://api.runpod.ai/v2/{endpoint_id}/run"
-
+    output_key: str | None = None,
+) -> dict:
+    """Build the RunPod job payload for one Qwen3-TTS generation."""
     payload = {
         "input": {
             "text": text,
@@ -332,125 +226,34 @@ def submit_runpod_job(
             "secret_access_key": r2_config["secret_access_key"],
             "bucket_name": r2_config["bucket_name"],
         }
+        if output_key:
+            payload["input"]["r2"]["output_key"] = output_key
 
-    try:
-        response = requests.post(
-            url,
-            json=payload,
-            headers={"Authorization": f"Bearer {api_key}"},
-            timeout=30,
-        )
+    return payload
 
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Job submission failed: HTTP {response.status_code}", file=sys.stderr)
-            print(f"  Response: {response.text[:500]}", file=sys.stderr)
-            return None
-
-    except Exception as e:
-        print(f"Job submission error: {e}", file=sys.stderr)
-        return None
 
-
-def poll_runpod_job(
-    endpoint_id: str,
-    api_key: str,
-    job_id: str,
-    timeout: int = 300,
-    poll_interval: int = 3,
-    verbose: bool = True,
+def submit_runpod_job(
+    client: RunPodClient,
+    text: str,
+    sync_wait: float | None = RUNSYNC_WAIT_SECONDS,
+    **payload_options,
 ) -> dict | None:
-    """Poll RunPod job until completion or timeout."""
-    url = f"https://api.runpod.ai/v2/{endpoint_id}/status/{job_id}"
-    start_time = time.time()
-    last_status = None
-
-    while time.time() - start_time < timeout:
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": f"Bearer {api_key}"},
-                timeout=30,
-            )
-
-            if response.status_code != 200:
-                print(f"Status check failed: HTTP {response.status_code}", file=sys.stderr)
-                time.sleep(poll_interval)
-                continue
-
-            data = response.json()
-            status = data.get("status")
-
-            if verbose and status != last_status:
-                elapsed = int(time.time() - start_time)
-                print(f"  [{elapsed}s] Status: {status}", file=sys.stderr)
-                last_status = status
-
-            if status == "COMPLETED":
-                return data
-            elif status == "FAILED":
-                print(f"Job failed: {data.get('error', 'Unknown error')}", file=sys.stderr)
-                return data
-            elif status in ["IN_QUEUE", "IN_PROGRESS"]:
-                time.sleep(poll_interval)
-            else:
-                time.sleep(poll_interval)
-
-        except Exception as e:
-            print(f"Status check error: {e}", file=sys.stderr)
-            time.sleep(poll_interval)
-
-    print(f"Job timed out after {timeout}s", file=sys.stderr)
-    return None
-
-
-def download_from_url(url: str, output_path: str, verbose: bool = True) -> bool:
-    """Download file from URL to local path."""
-    try:
-        if verbose:
-            print(f"Downloading result...", file=sys.stderr)
-
-        response = requests.get(url, stream=True, timeout=300)
-        response.raise_for_status()
-
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-
-        if verbose:
-            size_kb = Path(output_path).stat().st_size // 1024
-            print(f"  Downloaded: {output_path} ({size_kb}KB)", file=sys.stderr)
-
-        return True
+    """Submit a Qwen3-TTS job to RunPod serverless endpoint.
 
-    except Exception as e:
-        print(f"Download error: {e}", file=sys.stderr)
-        return False
+    With ``sync_wait``, the job goes through /runsync so a warm worker returns
+    the result directly; otherwise (or if it is still queued) the caller polls.
+    """
+    payload = build_job_payload(text, **payload_options)
+    if sync_wait:
+        return client.submit_sync(payload, wait=sync_wait)
+    return client.submit(payload)
 
 
-def generate_audio(
-    text: str,
-    output_path: str,
-    speaker: str = "Ryan",
-    language: str = "Auto",
-    instruct: str = "",
-    ref_audio: str | None = None,
-    ref_text: str | None = None,
-    output_format: str = "mp3",
-    timeout: int = 300,
-    verbose: bool = True,
-    temperature: float | None = None,
-    top_p: float | None = None,
-) -> dict:
-    """Generate audio using Qwen3-TTS via RunPod.
+def _resolve_runpod_setup(ref_audio: str | None, ref_text: str | None) -> dict:
+    """Check config and clone inputs shared by single and batch generation.
 
-    This is the main entry point, importable by voiceover.py.
-    Returns dict with: success, output, duration_seconds, duration_frames_30fps
+    Returns dict with api_key, endpoint_id, r2_config and mode, or an error dict.
     """
-    start_time = time.time()
-    r2_keys_to_cleanup = []
-
     config = get_runpod_config()
     api_key = config.get("api_key")
     endpoint_id = config.get("endpoint_id")
@@ -468,66 +271,25 @@ def generate_audio(
     except ImportError:
         r2_config = None
 
-    # Determine mode
     mode = "clone" if ref_audio else "custom_voice"
-
-    # Upload reference audio for clone mode
-    ref_audio_url = None
     if mode == "clone":
         if not Path(ref_audio).exists():
             return {"success": False, "error": f"Reference audio not found: {ref_audio}"}
         if not ref_text:
             return {"success": False, "error": "ref_text is required for voice cloning"}
 
-        ref_audio_url, ref_r2_key = upload_to_storage(ref_audio, "qwen3-tts/input")
-        if not ref_audio_url:
-            return {"success": False, "error": "Failed to upload reference audio"}
-        if ref_r2_key:
-            r2_keys_to_cleanup.append(ref_r2_key)
+    return {"api_key": api_key, "endpoint_id": endpoint_id, "r2_config": r2_config, "mode": mode}
 
-    if verbose:
-        print(f"Using RunPod endpoint: {endpoint_id}", file=sys.stderr)
-        if mode == "clone":
-            print(f"Mode: voice clone", file=sys.stderr)
-        else:
-            print(f"Speaker: {speaker}, Language: {language}", file=sys.stderr)
-
-    # Submit job
-    job_response = submit_runpod_job(
-        endpoint_id=endpoint_id,
-        api_key=api_key,
-        text=text,
-        mode=mode,
-        speaker=speaker,
-        language=language,
-        instruct=instruct,
-        ref_audio_url=ref_audio_url,
-        ref_text=ref_text,
-        output_format=output_format,
-        r2_config=r2_config,
-        temperature=temperature,
-        top_p=top_p,
-    )
-
-    if not job_response:
-        return {"success": False, "error": "Failed to submit job"}
-
-    job_id = job_response.get("id")
-    if not job_id:
-        return {"success": False, "error": f"No job ID in response: {job_response}"}
-
-    if verbose:
-        print(f"Job submitted: {job_id}", file=sys.stderr)
-
-    # Poll for completion
-    result = poll_runpod_job(
-        endpoint_id=endpoint_id,
-        api_key=api_key,
-        job_id=job_id,
-        timeout=timeout,
-        verbose=verbose,
-    )
 
+def _collect_job_output(
+    client: RunPodClient,
+    result: dict | None,
+    output_path: str,
+    text: str,
+    r2_keys_to_cleanup: list,
+    verbose: bool = True,
+) -> dict:
+    """Turn a finished job's status JSON into a saved audio file and result dict."""
     if not result:
         return {"success": False, "error": "Job timed out or failed to get status"}
 
@@ -550,7 +312,8 @@ def generate_audio(
     if output_r2_key:
         if verbose:
             print(f"Downloading result from R2...", file=sys.stderr)
-        downloaded = _download_from_r2(output_r2_key, output_path)
+        with client.timed("download"):
+            downloaded = _download_from_r2(output_r2_key, output_path)
         if downloaded:
             r2_keys_to_cleanup.append(output_r2_key)
             if verbose:
@@ -558,7 +321,7 @@ def generate_audio(
                 print(f"  Downloaded: {output_path} ({size_kb}KB)", file=sys.stderr)
 
     if not downloaded and output_url:
-        downloaded = download_from_url(output_url, output_path, verbose=verbose)
+        downloaded = client.download(output_url, output_path)
 
     if not downloaded:
         audio_base64 = output.get("audio_base64")
@@ -572,10 +335,6 @@ def generate_audio(
     if not downloaded:
         return {"success": False, "error": f"No audio in result: {list(output.keys()) if isinstance(output, dict) else output}"}
 
-    # Cleanup R2 objects
-    for key in r2_keys_to_cleanup:
-        _delete_from_r2(key)
-
     duration = get_audio_duration(output_path)
 
     result_dict = {
@@ -590,6 +349,247 @@ def generate_audio(
     return result_dict
 
 
+def generate_audio(
+    text: str,
+    output_path: str,
+    speaker: str = "Ryan",
+    language: str = "Auto",
+    instruct: str = "",
+    ref_audio: str | None = None,
+    ref_text: str | None = None,
+    output_format: str = "mp3",
+    timeout: int = 300,
+    verbose: bool = True,
+    temperature: float | None = None,
+    top_p: float | None = None,
+    resume: bool = False,
+) -> dict:
+    """Generate audio using Qwen3-TTS via RunPod.
+
+    This is the main entry point, importable by voiceover.py.
+    Returns dict with: success, output, duration_seconds, duration_frames_30fps
+
+    With ``resume``, an earlier job for the same text and voice settings is
+    looked up in the job journal and collected instead of submitting a new one.
+    """
+    r2_keys_to_cleanup = []
+
+    setup = _resolve_runpod_setup(ref_audio, ref_text)
+    if "error" in setup:
+        return setup
+    endpoint_id, mode = setup["endpoint_id"], setup["mode"]
+
+    if verbose:
+        print(f"Using RunPod endpoint: {endpoint_id}", file=sys.stderr)
+        if mode == "clone":
+            print(f"Mode: voice clone", file=sys.stderr)
+        else:
+            print(f"Speaker: {speaker}, Language: {language}", file=sys.stderr)
+
+    client = RunPodClient(endpoint_id, setup["api_key"], verbose=verbose)
+    journal = JobJournal()
+    params = {
+        "mode": mode,
+        "speaker": speaker,
+        "language": language,
+        "instruct": instruct,
+        "ref_text": ref_text,
+        "output_format": output_format,
+        "temperature": temperature,
+        "top_p": top_p,
+    }
+    inputs_hash = hash_inputs([ref_audio], {"text": text, **params})
+
+    job_response = None
+    if resume:
+        reattached = reattach_job(client, journal, "qwen3-tts", inputs_hash, object_metadata, verbose)
+        if reattached:
+            entry, job_response = reattached
+            r2_keys_to_cleanup.extend(entry.get("r2_keys", []))
+
+    if job_response is None:
+        # Upload reference audio for clone mode
+        ref_audio_url = None
+        if mode == "clone":
+            ref_audio_url, ref_r2_key = upload_to_storage(ref_audio, "qwen3-tts/input")
+            if not ref_audio_url:
+                return {"success": False, "error": "Failed to upload reference audio"}
+            if ref_r2_key:
+                r2_keys_to_cleanup.append(ref_r2_key)
+
+        # Submit job
+        output_key = new_output_key("qwen3-tts", f".{output_format}") if setup["r2_config"] else None
+        job_response = submit_runpod_job(
+            client,
+            text=text,
+            ref_audio_url=ref_audio_url,
+            r2_config=setup["r2_config"],
+            output_key=output_key,
+            **params,
+        )
+
+        if not job_response:
+            return {"success": False, "error": "Failed to submit job"}
+
+        job_id = job_response.get("id")
+        if not job_id:
+            return {"success": False, "error": f"No job ID in response: {job_response}"}
+
+        journal.record(
+            job_id,
+            tool="qwen3-tts",
+            endpoint_id=endpoint_id,
+            inputs_hash=inputs_hash,
+            output_path=output_path,
+            r2_keys=r2_keys_to_cleanup,
+            output_key=output_key,
+            params=params,
+        )
+
+        if verbose and job_response.get("status") not in TERMINAL_STATUSES:
+            print(f"Job submitted: {job_id}", file=sys.stderr)
+
+    job_id = job_response["id"]
+
+    # Poll for completion (no-op if /runsync already returned the result)
+    result = client.wait(job_response, timeout=timeout, work=len(text))
+
+    if not result:
+        # Leave the inputs in place so the job can still finish and be collected
+        return {"success": False, "error": f"Job {job_id} timed out locally; it may still finish on RunPod. Re-run with --resume to collect it."}
+
+    result_dict = _collect_job_output(client, result, output_path, text, r2_keys_to_cleanup, verbose=verbose)
+    if result_dict.get("success"):
+        journal.update(job_id, status=COLLECTED)
+    elif result.get("status") == "COMPLETED":
+        journal.update(job_id, status=COMPLETED)
+    else:
+        journal.update(job_id, status=FAILED, error=result_dict.get("error"))
+
+    # Cleanup R2 objects (in the background)
+    delete_objects(r2_keys_to_cleanup)
+
+    if result_dict.get("success"):
+        result_dict["timings"] = client.timings
+    return result_dict
+
+
+def generate_audio_batch(
+    items: list[dict],
+    speaker: str = "Ryan",
+    language: str = "Auto",
+    ref_audio: str | None = None,
+    ref_text: str | None = None,
+    output_format: str = "mp3",
+    timeout: int = 300,
+    verbose: bool = True,
+    temperature: float | None = None,
+    top_p: float | None = None,
+    max_in_flight: int | None = None,
+    resume: bool = False,
+):
+    """Generate many clips concurrently, yielding ``(index, result)`` as each finishes.
+
+    ``items`` are dicts with ``text``, ``output_path`` and optional ``instruct``.
+    Up to ``max_in_flight`` jobs (default: the endpoint's workersMax) run at once;
+    the reference audio for clone mode is uploaded once for the whole batch.
+    Each result has the same shape as :func:`generate_audio`'s.
+
+    Every job is journalled like a single :func:`generate_audio` job, and with
+    ``resume`` a clip whose earlier job is still in the journal is collected
+    from it instead of being submitted again.
+    """
+    setup = _resolve_runpod_setup(ref_audio, ref_text)
+    if "error" in setup:
+        for index in range(len(items)):
+            yield index, dict(setup)
+        return
+    mode = setup["mode"]
+
+    input_keys = []  # uploads every new job in the batch reads
+    ref_audio_url = None
+    if mode == "clone":
+        ref_audio_url, ref_r2_key = upload_to_storage(ref_audio, "qwen3-tts/input")
+        if not ref_audio_url:
+            for index in range(len(items)):
+                yield index, {"success": False, "error": "Failed to upload reference audio"}
+            return
+        if ref_r2_key:
+            input_keys.append(ref_r2_key)
+    r2_keys_to_cleanup = list(input_keys)
+    still_running: set[str] = set()  # inputs of jobs left running on RunPod
+
+    client = RunPodClient(setup["endpoint_id"], setup["api_key"], verbose=verbose)
+    scheduler = JobScheduler(client, max_in_flight=max_in_flight, timeout=timeout)
+    journal = JobJournal()
+    submitted: dict[int, dict] = {}  # index -> what journal.record needs
+    job_ids: dict[int, str] = {}
+    job_keys: dict[int, list] = {}  # index -> the R2 inputs of that clip's job
+
+    def jobs():
+        for index, item in enumerate(items):
+            # Same keys as generate_audio's, so either path can resume the other's jobs
+            params = {
+                "mode": mode,
+                "speaker": speaker,
+                "language": language,
+                "instruct": item.get("instruct", ""),
+                "ref_text": ref_text,
+                "output_format": output_format,
+                "temperature": temperature,
+                "top_p": top_p,
+            }
+            inputs_hash = hash_inputs([ref_audio], {"text": item["text"], **params})
+            if resume:
+                reattached = reattach_job(client, journal, "qwen3-tts", inputs_hash, object_metadata, verbose)
+                if reattached:
+                    entry, job = reattached
+                    job_keys[index] = entry.get("r2_keys", [])
+                    r2_keys_to_cleanup.extend(job_keys[index])
+                    job_ids[index] = job["id"]
+                    yield index, None, len(item["text"]), job
+                    continue
+
+            output_key = new_output_key("qwen3-tts", f".{output_format}") if setup["r2_config"] else None
+            submitted[index] = {"inputs_hash": inputs_hash, "output_key": output_key, "params": params}
+            job_keys[index] = input_keys
+            payload = build_job_payload(
+                item["text"],
+                ref_audio_url=ref_audio_url,
+                r2_config=setup["r2_config"],
+                output_key=output_key,
+                **params,
+            )
+            yield index, payload, len(item["text"])
+
+    def record(index: int, job: dict) -> None:
+        job_ids[index] = job["id"]
+        journal.record(
+            job["id"],
+            tool="qwen3-tts",
+            endpoint_id=setup["endpoint_id"],
+            output_path=str(items[index]["output_path"]),
+            r2_keys=job_keys[index],
+            **submitted[index],
+        )
+
+    try:
+        for index, result in scheduler.run(jobs(), on_submit=record):
+            item = items[index]
+            if result and result.get("status") == LOCAL_TIMEOUT:
+                still_running.update(job_keys.get(index, []))
+                result_dict = {"success": False, "error": f"Job {result['id']} timed out locally; it may still finish on RunPod. Re-run with --resume to collect it."}
+            else:
+                result_dict = _collect_job_output(
+                    client, result, str(item["output_path"]), item["text"], r2_keys_to_cleanup, verbose=verbose,
+                )
+            if index in job_ids:
+                journal.settle(job_ids[index], result, bool(result_dict.get("success")), result_dict.get("error"))
+            yield index, result_dict
+    finally:
+        delete_objects([key for key in r2_keys_to_cleanup if key not in still_running])
+
+
 # =============================================================================
 # RunPod Setup (GraphQL API)
 # =============================================================================
@@ -998,6 +998,11 @@ Examples:
         default=300,
         help="RunPod job timeout in seconds (default: 300)",
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Collect an earlier job for the same text and voice instead of resubmitting (see tools/job_journal.py)",
+    )
     parser.add_argument(
         "--setup",
         action="store_true",
@@ -1126,6 +1131,7 @@ def main():
         verbose=verbose,
         temperature=args.temperature,
         top_p=args.top_p,
+        resume=args.resume,
     )
 
     if not result.get("success"):
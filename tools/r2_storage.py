@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Shared Cloudflare R2 access for the RunPod tools: one pooled client per
+process, batched background cleanup, and a content-addressed upload cache.
+
+Inputs are stored once under cache/<sha256>/<filename> and kept for
+R2_CACHE_TTL_DAYS (default 7) instead of being deleted after each job, so
+re-running a tool on the same video, portrait or reference audio skips the
+upload entirely. A HEAD request decides whether the bytes need sending at all,
+and presigned URLs are remembered locally and reused while they stay valid.
+
+Expired cache objects are swept at most once a day, in the background, from
+whichever tool uploads next. The same cache/ prefix can also be given an R2 lifecycle rule.
+
+Usage:
+    from r2_storage import delete_objects, get_r2_client, object_exists, object_metadata, upload_cached, upload_input
+
+    client, r2_config = get_r2_client()
+    url = upload_cached(client, r2_config, "/path/to/video.mp4")
+    delete_objects(["dewatermark/results/abc.mp4"])  # returns immediately
+"""
+
+import json
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import get_r2_cache_ttl_days, get_r2_config, get_state_dir
+from job_journal import file_sha256
+from transfer import upload_file
+
+CACHE_PREFIX = "cache/"
+PRESIGN_EXPIRES = 24 * 3600      # URLs handed to jobs stay valid for a day
+PRESIGN_MIN_REMAINING = 2 * 3600  # reuse a URL only if a queued job can still fetch it
+SWEEP_INTERVAL = 24 * 3600
+POOL_CONNECTIONS = 32  # covers TRANSFER_CONCURRENCY parts plus background cleanup
+DELETE_BATCH = 1000    # S3 DeleteObjects limit
+
+_index_lock = threading.Lock()
+_client_lock = threading.Lock()
+_clients: dict[tuple, object] = {}
+
+
+def get_r2_client():
+    """Get the process-wide boto3 S3 client for R2, and the R2 config.
+
+    Returns (None, None) if R2 is not configured or boto3 is missing. The
+    client is built once per set of credentials and reused, so its connection
+    pool stays warm across uploads, downloads and deletes.
+    """
+    r2_config = get_r2_config()
+    if not r2_config:
+        return None, None
+
+    cache_key = (r2_config["endpoint_url"], r2_config["access_key_id"], r2_config["secret_access_key"])
+    with _client_lock:
+        client = _clients.get(cache_key)
+        if client is None:
+            try:
+                import boto3
+                from botocore.config import Config
+            except ImportError:
+                print("  boto3 not installed, skipping R2", file=sys.stderr)
+                return None, None
+
+            client = boto3.client(
+                "s3",
+                endpoint_url=r2_config["endpoint_url"],
+                aws_access_key_id=r2_config["access_key_id"],
+                aws_secret_access_key=r2_config["secret_access_key"],
+                config=Config(
+                    signature_version="s3v4",
+                    max_pool_connections=POOL_CONNECTIONS,
+                    retries={"max_attempts": 5, "mode": "adaptive"},
+                ),
+            )
+            _clients[cache_key] = client
+    return client, r2_config
+
+
+def object_metadata(object_key: str) -> dict | None:
+    """User metadata of an object in the configured R2 bucket, or None if it is gone."""
+    client, r2_config = get_r2_client()
+    if not client:
+        return None
+    head = _head(client, r2_config["bucket_name"], object_key)
+    return head.get("Metadata", {}) if head is not None else None
+
+
+def object_exists(object_key: str) -> bool:
+    """Check whether an object is still present in the configured R2 bucket."""
+    return object_metadata(object_key) is not None
+
+
+def _delete_batches(client, bucket: str, keys: list[str]) -> None:
+    for start in range(0, len(keys), DELETE_BATCH):
+        batch = keys[start:start + DELETE_BATCH]
+        try:
+            response = client.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+            for error in response.get("Errors", []):
+                print(f"  R2 cleanup failed for {error.get('Key')}: {error.get('Message')}", file=sys.stderr)
+        except Exception as e:
+            print(f"  R2 cleanup error: {e}", file=sys.stderr)
+
+
+def delete_objects(keys: list[str], background: bool = True) -> threading.Thread | None:
+    """Delete R2 objects in batches of up to 1000 keys per request.
+
+    With ``background`` (the default) the deletes run on a separate thread and
+    this returns at once. The thread is not a daemon, so the interpreter still
+    finishes the cleanup before exiting.
+    """
+    keys = [key for key in dict.fromkeys(keys) if key]
+    if not keys:
+        return None
+    client, r2_config = get_r2_client()
+    if not client:
+        return None
+
+    if not background:
+        _delete_batches(client, r2_config["bucket_name"], keys)
+        return None
+
+    thread = threading.Thread(
+        target=_delete_batches,
+        args=(client, r2_config["bucket_name"], keys),
+        name="r2-cleanup",
+    )
+    thread.start()
+    return thread
+
+
+def _index_path() -> Path:
+    return get_state_dir() / "r2-cache.json"
+
+
+def _load_index() -> dict:
+    try:
+        return json.loads(_index_path().read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(index: dict) -> None:
+    path = _index_path()
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(index, indent=2))
+    tmp.replace(path)
+
+
+def cache_enabled() -> bool:
+    return get_r2_cache_ttl_days() > 0
+
+
+def cache_key(file_path: str) -> str:
+    """Object key for a file's contents in the upload cache."""
+    return f"{CACHE_PREFIX}{file_sha256(file_path)}/{Path(file_path).name}"
+
+
+def _head(client, bucket: str, object_key: str) -> dict | None:
+    try:
+        return client.head_object(Bucket=bucket, Key=object_key)
+    except Exception:
+        return None
+
+
+def _presigned_url(client, r2_config: dict, object_key: str, index: dict) -> str:
+    """Reuse the indexed presigned URL for object_key, or sign a fresh one."""
+    bucket_index = index.setdefault(r2_config["bucket_name"], {})
+    entry = bucket_index.get(object_key, {})
+    now = time.time()
+    if entry.get("url") and entry.get("expires_at", 0) - now > PRESIGN_MIN_REMAINING:
+        return entry["url"]
+
+    url = client.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": r2_config["bucket_name"], "Key": object_key},
+        ExpiresIn=PRESIGN_EXPIRES,
+    )
+    bucket_index[object_key] = {"url": url, "expires_at": now + PRESIGN_EXPIRES}
+    return url
+
+
+def upload_cached(client, r2_config: dict, file_path: str, verbose: bool = True) -> str | None:
+    """Make file_path available in R2 and return a presigned URL for it.
+
+    The object is uploaded only if no object with the same content hash exists.
+    Cache hits older than half the TTL are copied onto themselves so that the
+    retention clock restarts for inputs that are still in use.
+    """
+    bucket = r2_config["bucket_name"]
+    ttl_days = get_r2_cache_ttl_days()
+    object_key = cache_key(file_path)
+
+    try:
+        head = _head(client, bucket, object_key)
+        if head is None:
+            upload_file(client, bucket, file_path, object_key, verbose=verbose)
+        else:
+            if verbose:
+                print(f"  Already in R2 cache: {object_key}", file=sys.stderr)
+            age = datetime.now(timezone.utc) - head["LastModified"]
+            if age > timedelta(days=ttl_days / 2):
+                client.copy_object(
+                    Bucket=bucket,
+                    Key=object_key,
+                    CopySource={"Bucket": bucket, "Key": object_key},
+                    MetadataDirective="REPLACE",
+                    Metadata=head.get("Metadata", {}),
+                    ContentType=head.get("ContentType", "binary/octet-stream"),
+                )
+
+        with _index_lock:
+            index = _load_index()
+            url = _presigned_url(client, r2_config, object_key, index)
+            due_for_sweep = time.time() - index.get("_last_sweep", 0) > SWEEP_INTERVAL
+            if due_for_sweep:
+                index["_last_sweep"] = time.time()
+            _save_index(index)
+    except Exception as e:
+        print(f"  R2 upload error: {e}", file=sys.stderr)
+        return None
+
+    if due_for_sweep:
+        threading.Thread(
+            target=sweep_expired,
+            args=(client, r2_config, ttl_days),
+            kwargs={"verbose": verbose},
+            name="r2-cache-sweep",
+        ).start()
+    return url
+
+
+def upload_input(file_path: str, prefix: str) -> tuple[str | None, str | None]:
+    """Upload a job input to R2 and return (presigned_url, cleanup_key).
+
+    With the upload cache enabled the input goes through upload_cached() and is
+    kept for R2_CACHE_TTL_DAYS, so cleanup_key is None. Otherwise it is stored
+    under ``prefix``/ with a unique name and its key is returned for deletion
+    once the job is done. Returns (None, None) if R2 is not configured or the
+    upload fails.
+    """
+    client, r2_config = get_r2_client()
+    if not client:
+        return None, None
+    if cache_enabled():
+        return upload_cached(client, r2_config, file_path), None
+
+    object_key = f"{prefix}/{uuid.uuid4().hex[:8]}_{Path(file_path).name}"
+    try:
+        upload_file(client, r2_config["bucket_name"], file_path, object_key)
+        url = client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": r2_config["bucket_name"], "Key": object_key},
+            ExpiresIn=7200,
+        )
+        return url, object_key
+    except Exception as e:
+        print(f"  R2 upload error: {e}", file=sys.stderr)
+        return None, None
+
+
+def sweep_expired(client, r2_config: dict, ttl_days: float | None = None, verbose: bool = True) -> int:
+    """Delete cache objects not uploaded or refreshed within the TTL."""
+    bucket = r2_config["bucket_name"]
+    if ttl_days is None:
+        ttl_days = get_r2_cache_ttl_days()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=ttl_days)
+
+    deleted = []
+    try:
+        paginator = client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=CACHE_PREFIX):
+            deleted.extend(obj["Key"] for obj in page.get("Contents", []) if obj["LastModified"] < cutoff)
+    except Exception as e:
+        print(f"  R2 cache sweep error: {e}", file=sys.stderr)
+    _delete_batches(client, bucket, deleted)
+
+    if deleted:
+        with _index_lock:
+            index = _load_index()
+            bucket_index = index.get(bucket, {})
+            for key in deleted:
+                bucket_index.pop(key, None)
+            _save_index(index)
+        if verbose:
+            print(f"  Removed {len(deleted)} expired objects from R2 cache", file=sys.stderr)
+    return len(deleted)
@@ -0,0 +1,743 @@
+#!/usr/bin/env python3
+"""
+Shared RunPod serverless client used by every remote tool.
+
+All RunPod-backed tools (dewatermark, upscale, sadtalker, qwen3_tts, image_edit)
+submit, poll and download through this module instead of carrying their own
+copies. Requests go through one process-wide keep-alive session, so status
+polls reuse an open connection instead of paying a TCP + TLS handshake each time.
+
+Usage:
+    from runpod_client import RunPodClient
+
+    client = RunPodClient(endpoint_id, api_key)
+    job = client.submit({"input": {...}})
+    result = client.poll(job["id"], timeout=600)
+    client.download(result["output"]["output_url"], "out.mp4")
+    print(client.timings)   # submit/queue/run/download seconds
+
+    # asyncio callers
+    client = AsyncRunPodClient(endpoint_id, api_key)
+    result = await client.run({"input": {...}}, timeout=600)
+
+    # Short jobs: try /runsync first, fall back to polling if still queued
+    result = client.run({"input": {...}}, timeout=300, sync_wait=30)
+
+Polling is adaptive (see AdaptivePoller): the first check comes quickly, the
+interval backs off while a job sits in IN_QUEUE, and it tightens as the job
+approaches its expected finish time. Expected run times are learned per
+endpoint from completed jobs and kept in <state dir>/runpod-runtimes.json.
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import get_state_dir
+from transfer import download_url
+
+RUNPOD_API_URL = "https://api.runpod.ai/v2"
+RUNPOD_GRAPHQL_URL = "https://api.runpod.io/graphql"
+
+TERMINAL_STATUSES = ("COMPLETED", "FAILED", "CANCELLED", "TIMED_OUT")
+NOT_FOUND = "NOT_FOUND"  # status(..., report_missing=True) for a job RunPod doesn't know
+LOCAL_TIMEOUT = "LOCAL_TIMEOUT"  # JobScheduler gave up waiting; the job is left running
+
+# Default bound on how long /runsync holds the request open before we fall
+# back to polling. Warm TTS/upscale/edit jobs finish well inside this.
+RUNSYNC_WAIT_SECONDS = 30
+
+# Connection pool size per host. Large enough for a batch of concurrent
+# polls plus downloads without requests discarding connections.
+POOL_MAXSIZE = 32
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide keep-alive session (created on first use)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _format_size(num_bytes: int) -> str:
+    if num_bytes >= 1024 * 1024:
+        return f"{num_bytes / (1024 * 1024):.1f}MB"
+    return f"{num_bytes // 1024}KB"
+
+
+def download_from_url(url: str, output_path: str, verbose: bool = True, timeout: int = 600) -> bool:
+    """Download file from URL to local path over the shared session.
+
+    Uses parallel ranged GETs when the server allows them; an interrupted
+    download resumes from its .part file on the next call.
+    """
+    try:
+        if verbose:
+            print("Downloading result...", file=sys.stderr)
+
+        download_url(get_session(), url, output_path, timeout=timeout, verbose=verbose)
+
+        if verbose:
+            size = _format_size(Path(output_path).stat().st_size)
+            print(f"  Downloaded: {output_path} ({size})", file=sys.stderr)
+
+        return True
+
+    except Exception as e:
+        print(f"Download error: {e}", file=sys.stderr)
+        return False
+
+
+class RuntimeStats:
+    """Per-endpoint moving averages of queue and run time, persisted as JSON.
+
+    When callers pass a ``work`` figure (seconds of video, characters of text)
+    the run time is also tracked per unit of work, so a 10-minute video gets a
+    proportionally longer ETA than a 30-second clip on the same endpoint.
+    """
+
+    ALPHA = 0.3
+
+    def __init__(self, path: Path | None = None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._data: dict | None = None
+
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            self._path = get_state_dir() / "runpod-runtimes.json"
+        return self._path
+
+    def _load(self) -> dict:
+        if self._data is None:
+            try:
+                self._data = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def expected_run(self, endpoint_id: str, work: float | None = None) -> float | None:
+        """Expected execution seconds for a job on this endpoint, if known."""
+        with self._lock:
+            entry = self._load().get(endpoint_id)
+        if not entry:
+            return None
+        if work and entry.get("run_per_unit"):
+            return entry["run_per_unit"] * work
+        return entry.get("run")
+
+    def record(self, endpoint_id: str, queue: float | None, run: float | None, work: float | None = None) -> None:
+        if run is None:
+            return
+        with self._lock:
+            data = self._load()
+            entry = data.setdefault(endpoint_id, {"samples": 0})
+
+            def ema(key: str, value: float) -> None:
+                old = entry.get(key)
+                entry[key] = value if old is None else old + self.ALPHA * (value - old)
+
+            ema("run", run)
+            if queue is not None:
+                ema("queue", queue)
+            if work:
+                ema("run_per_unit", run / work)
+            entry["samples"] += 1
+
+            try:
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(data, indent=2))
+                os.replace(tmp, self.path)
+            except OSError:
+                pass
+
+
+_runtime_stats = RuntimeStats()
+
+
+class AdaptivePoller:
+    """Choose the delay before the next status check from what the job is doing.
+
+    - IN_QUEUE: start at ``queue_interval`` and back off geometrically; cold
+      starts take minutes and polling fast doesn't make them shorter.
+    - IN_PROGRESS with an ETA (handler progress updates, or the learned
+      per-endpoint runtime): wait a fraction of the remaining time, so checks
+      cluster around the expected finish.
+    - IN_PROGRESS without an ETA, or past it: back off gently from
+      ``min_interval``.
+
+    Every interval gets +/-``jitter`` so concurrent jobs don't poll in lockstep.
+    """
+
+    def __init__(
+        self,
+        expected_run: float | None = None,
+        min_interval: float = 0.5,
+        max_interval: float = 15.0,
+        queue_interval: float = 1.0,
+        jitter: float = 0.2,
+    ):
+        self.expected_run = expected_run
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self._queue_interval = queue_interval
+        self._run_interval = min_interval
+        self._run_started: float | None = None
+
+    def _remaining(self, data: dict, now: float) -> float | None:
+        """Seconds until the job is expected to finish, or None if unknown."""
+        run_elapsed = now - self._run_started
+        output = data.get("output")
+        progress = output.get("progress") if isinstance(output, dict) else None
+        if isinstance(progress, (int, float)) and 0 < progress < 1 and run_elapsed > 0:
+            return run_elapsed / progress * (1 - progress)
+        if self.expected_run:
+            return self.expected_run - run_elapsed
+        return None
+
+    def next_interval(self, data: dict) -> float:
+        status = data.get("status")
+        now = time.time()
+
+        if status == "IN_QUEUE":
+            interval = self._queue_interval
+            self._queue_interval = min(self.max_interval, self._queue_interval * 1.5)
+        elif status == "IN_PROGRESS":
+            if self._run_started is None:
+                self._run_started = now
+            remaining = self._remaining(data, now)
+            if remaining is not None and remaining > self.min_interval:
+                interval = remaining / 4
+            else:
+                interval = self._run_interval
+                self._run_interval = min(self.max_interval, self._run_interval * 1.3)
+        else:
+            interval = self.min_interval
+
+        interval = max(self.min_interval, min(self.max_interval, interval))
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class RunPodClient:
+    """Submit, poll and download jobs for one RunPod serverless endpoint.
+
+    ``timings`` accumulates wall-clock seconds for each phase of the most
+    recent job: ``submit``, ``queue`` and ``run`` (from RunPod's delayTime /
+    executionTime when reported) and ``download``.
+    """
+
+    def __init__(
+        self,
+        endpoint_id: str,
+        api_key: str,
+        verbose: bool = True,
+        on_status: Callable[[str, int], None] | None = None,
+    ):
+        self.endpoint_id = endpoint_id
+        self.api_key = api_key
+        self.verbose = verbose
+        self.on_status = on_status
+        self.session = get_session()
+        self.stats = _runtime_stats
+        self.timings: dict[str, float] = {}
+
+    @property
+    def base_url(self) -> str:
+        return f"{RUNPOD_API_URL}/{self.endpoint_id}"
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    @contextmanager
+    def timed(self, phase: str):
+        """Add the duration of the enclosed block to ``timings[phase]``."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.timings[phase] = round(self.timings.get(phase, 0.0) + time.time() - start, 2)
+
+    def _record_runpod_times(self, data: dict) -> None:
+        """Take queue/run durations from RunPod's own accounting when present."""
+        if data.get("delayTime") is not None:
+            self.timings["queue"] = round(data["delayTime"] / 1000, 2)
+        if data.get("executionTime") is not None:
+            self.timings["run"] = round(data["executionTime"] / 1000, 2)
+
+    def submit(self, payload: dict, timeout: int = 30) -> dict | None:
+        """POST a job to ``/run``. Returns the response JSON (with ``id``) or None."""
+        self.timings = {}
+        try:
+            with self.timed("submit"):
+                response = self.session.post(
+                    f"{self.base_url}/run",
+                    json=payload,
+                    headers=self.headers,
+                    timeout=timeout,
+                )
+
+            if response.status_code == 200:
+                return response.json()
+
+            print(f"Job submission failed: HTTP {response.status_code}", file=sys.stderr)
+            print(f"  Response: {response.text[:500]}", file=sys.stderr)
+            return None
+
+        except Exception as e:
+            print(f"Job submission error: {e}", file=sys.stderr)
+            return None
+
+    def submit_sync(self, payload: dict, wait: float = RUNSYNC_WAIT_SECONDS) -> dict | None:
+        """POST a job to ``/runsync``, letting RunPod hold the request up to ``wait`` seconds.
+
+        Returns the response JSON: a terminal status with ``output`` when the job
+        finished in time, otherwise the job ``id`` with IN_QUEUE/IN_PROGRESS so the
+        caller can keep polling. Falls back to a plain ``/run`` submit only if the
+        endpoint has no sync route (HTTP 404/405), i.e. when no job was created.
+        After a timeout or any other failure the job may already exist, so this
+        returns None rather than risking a second, billed copy of it.
+        """
+        self.timings = {}
+        try:
+            with self.timed("submit"):
+                response = self.session.post(
+                    f"{self.base_url}/runsync",
+                    params={"wait": int(wait * 1000)},
+                    json=payload,
+                    headers=self.headers,
+                    timeout=wait + 30,
+                )
+        except requests.exceptions.Timeout:
+            print("runsync timed out; the job may still run on the endpoint, not resubmitting", file=sys.stderr)
+            return None
+        except Exception as e:
+            print(f"runsync error: {e}", file=sys.stderr)
+            return None
+
+        if response.status_code == 200:
+            return response.json()
+        if response.status_code in (404, 405):
+            print(f"runsync not available (HTTP {response.status_code}), using /run", file=sys.stderr)
+            return self.submit(payload)
+
+        print(f"Job submission failed: HTTP {response.status_code}", file=sys.stderr)
+        print(f"  Response: {response.text[:500]}", file=sys.stderr)
+        return None
+
+    def status(self, job_id: str, timeout: int = 30, report_missing: bool = False) -> dict | None:
+        """Fetch a job's current status. Returns the status JSON or None on error.
+
+        With ``report_missing``, an HTTP 404 comes back as status NOT_FOUND
+        instead of None, so callers can tell a purged job from a network error.
+        """
+        try:
+            response = self.session.get(
+                f"{self.base_url}/status/{job_id}",
+                headers=self.headers,
+                timeout=timeout,
+            )
+            if response.status_code == 404 and report_missing:
+                return {"id": job_id, "status": NOT_FOUND}
+            if response.status_code != 200:
+                print(f"Status check failed: HTTP {response.status_code}", file=sys.stderr)
+                return None
+            return response.json()
+        except Exception as e:
+            print(f"Status check error: {e}", file=sys.stderr)
+            return None
+
+    def cancel(self, job_id: str) -> bool:
+        """Ask RunPod to cancel a queued or running job."""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/cancel/{job_id}",
+                headers=self.headers,
+                timeout=30,
+            )
+            return response.status_code == 200
+        except Exception:
+            return False
+
+    def _report_status(self, status: str, elapsed: int) -> None:
+        if self.on_status:
+            self.on_status(status, elapsed)
+        elif self.verbose:
+            print(f"  [{elapsed}s] Status: {status}", file=sys.stderr)
+
+    def _observe(self, data: dict, last_status: str | None, start_time: float, work: float | None = None) -> bool:
+        """Handle one status response. Returns True once the job is terminal."""
+        status = data.get("status")
+        if status != last_status:
+            self._report_status(status, int(time.time() - start_time))
+
+        if status in TERMINAL_STATUSES:
+            self._finish(data, work)
+            if status != "COMPLETED":
+                print(f"Job {status.lower()}: {data.get('error', 'Unknown error')}", file=sys.stderr)
+            return True
+        return False
+
+    def _finish(self, data: dict, work: float | None) -> None:
+        """Record RunPod's timings for a terminal job and feed the runtime stats."""
+        self._record_runpod_times(data)
+        if data.get("status") == "COMPLETED":
+            self.stats.record(self.endpoint_id, self.timings.get("queue"), self.timings.get("run"), work)
+
+    def make_poller(self, work: float | None = None) -> AdaptivePoller:
+        """Build a poller seeded with this endpoint's learned runtime."""
+        return AdaptivePoller(expected_run=self.stats.expected_run(self.endpoint_id, work))
+
+    def poll(
+        self,
+        job_id: str,
+        timeout: int = 600,
+        poll_interval: float | None = None,
+        work: float | None = None,
+    ) -> dict | None:
+        """Poll until the job reaches a terminal status.
+
+        Uses adaptive intervals unless a fixed ``poll_interval`` is given.
+        ``work`` is an optional size hint (e.g. seconds of media) that scales
+        the learned ETA. Returns the final status JSON (check ``status`` for
+        COMPLETED vs FAILED/CANCELLED/TIMED_OUT), or None on timeout.
+        """
+        start_time = time.time()
+        last_status = None
+        poller = None if poll_interval else self.make_poller(work)
+
+        while time.time() - start_time < timeout:
+            data = self.status(job_id)
+            if data is not None:
+                if self._observe(data, last_status, start_time, work):
+                    return data
+                last_status = data.get("status")
+            interval = poll_interval or (poller.next_interval(data) if data else 5)
+            time.sleep(max(0, min(interval, timeout - (time.time() - start_time))))
+
+        print(f"Job timed out after {timeout}s", file=sys.stderr)
+        return None
+
+    def wait(
+        self,
+        job: dict,
+        timeout: int = 600,
+        poll_interval: float | None = None,
+        work: float | None = None,
+    ) -> dict | None:
+        """Return ``job`` if a sync submit already finished it, otherwise poll for it."""
+        if job.get("status") in TERMINAL_STATUSES:
+            self._report_status(job["status"], 0)
+            self._finish(job, work)
+            return job
+        return self.poll(job["id"], timeout=timeout, poll_interval=poll_interval, work=work)
+
+    def run(
+        self,
+        payload: dict,
+        timeout: int = 600,
+        poll_interval: float | None = None,
+        sync_wait: float | None = None,
+        work: float | None = None,
+    ) -> dict | None:
+        """Submit a job and poll it to completion.
+
+        With ``sync_wait``, the job goes through ``/runsync`` first so short jobs
+        on a warm worker return without any polling at all.
+        """
+        start_time = time.time()
+        if sync_wait:
+            job = self.submit_sync(payload, wait=min(sync_wait, timeout))
+        else:
+            job = self.submit(payload)
+        if not job or not job.get("id"):
+            return None
+        remaining = max(1, timeout - int(time.time() - start_time))
+        return self.wait(job, timeout=remaining, poll_interval=poll_interval, work=work)
+
+    def download(self, url: str, output_path: str, timeout: int = 600) -> bool:
+        """Download a job artifact over the shared session, timing the transfer."""
+        with self.timed("download"):
+            return download_from_url(url, output_path, verbose=self.verbose, timeout=timeout)
+
+
+class AsyncRunPodClient:
+    """asyncio variant of :class:`RunPodClient`.
+
+    HTTP calls run in worker threads over the same pooled session; waits
+    between polls use ``asyncio.sleep`` so many jobs can be awaited at once.
+    """
+
+    def __init__(
+        self,
+        endpoint_id: str,
+        api_key: str,
+        verbose: bool = True,
+        on_status: Callable[[str, int], None] | None = None,
+    ):
+        self._client = RunPodClient(endpoint_id, api_key, verbose=verbose, on_status=on_status)
+
+    @property
+    def timings(self) -> dict[str, float]:
+        """Phase timings of the most recently submitted job only.
+
+        Every submit resets the wrapped client's timings, so when several jobs
+        are awaited together their phases overwrite each other. Use separate
+        clients for per-job timings.
+        """
+        return self._client.timings
+
+    async def submit(self, payload: dict) -> dict | None:
+        return await asyncio.to_thread(self._client.submit, payload)
+
+    async def submit_sync(self, payload: dict, wait: float = RUNSYNC_WAIT_SECONDS) -> dict | None:
+        return await asyncio.to_thread(self._client.submit_sync, payload, wait)
+
+    async def status(self, job_id: str) -> dict | None:
+        return await asyncio.to_thread(self._client.status, job_id)
+
+    async def cancel(self, job_id: str) -> bool:
+        return await asyncio.to_thread(self._client.cancel, job_id)
+
+    async def poll(
+        self,
+        job_id: str,
+        timeout: int = 600,
+        poll_interval: float | None = None,
+        work: float | None = None,
+    ) -> dict | None:
+        start_time = time.time()
+        last_status = None
+        poller = None if poll_interval else self._client.make_poller(work)
+
+        while time.time() - start_time < timeout:
+            data = await self.status(job_id)
+            if data is not None:
+                if self._client._observe(data, last_status, start_time, work):
+                    return data
+                last_status = data.get("status")
+            interval = poll_interval or (poller.next_interval(data) if data else 5)
+            await asyncio.sleep(max(0, min(interval, timeout - (time.time() - start_time))))
+
+        print(f"Job timed out after {timeout}s", file=sys.stderr)
+        return None
+
+    async def wait(
+        self,
+        job: dict,
+        timeout: int = 600,
+        poll_interval: float | None = None,
+        work: float | None = None,
+    ) -> dict | None:
+        if job.get("status") in TERMINAL_STATUSES:
+            self._client._report_status(job["status"], 0)
+            self._client._finish(job, work)
+            return job
+        return await self.poll(job["id"], timeout=timeout, poll_interval=poll_interval, work=work)
+
+    async def run(
+        self,
+        payload: dict,
+        timeout: int = 600,
+        poll_interval: float | None = None,
+        sync_wait: float | None = None,
+        work: float | None = None,
+    ) -> dict | None:
+        start_time = time.time()
+        if sync_wait:
+            job = await self.submit_sync(payload, wait=min(sync_wait, timeout))
+        else:
+            job = await self.submit(payload)
+        if not job or not job.get("id"):
+            return None
+        remaining = max(1, timeout - int(time.time() - start_time))
+        return await self.wait(job, timeout=remaining, poll_interval=poll_interval, work=work)
+
+    async def download(self, url: str, output_path: str, timeout: int = 600) -> bool:
+        return await asyncio.to_thread(self._client.download, url, output_path, timeout)
+
+
+_workers_max_cache: dict[str, int | None] = {}
+
+
+def get_endpoint_workers_max(endpoint_id: str, api_key: str) -> int | None:
+    """Look up an endpoint's workersMax via the GraphQL API (cached per process)."""
+    if endpoint_id in _workers_max_cache:
+        return _workers_max_cache[endpoint_id]
+
+    workers_max = None
+    try:
+        response = get_session().post(
+            RUNPOD_GRAPHQL_URL,
+            json={"query": "query { myself { endpoints { id workersMax } } }"},
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=30,
+        )
+        if response.status_code == 200:
+            endpoints = response.json().get("data", {}).get("myself", {}).get("endpoints", [])
+            for endpoint in endpoints:
+                if endpoint.get("id") == endpoint_id:
+                    workers_max = endpoint.get("workersMax")
+                    break
+    except Exception as e:
+        print(f"Could not look up endpoint workers: {e}", file=sys.stderr)
+
+    _workers_max_cache[endpoint_id] = workers_max
+    return workers_max
+
+
+class _InFlight:
+    __slots__ = ("key", "work", "poller", "started", "deadline", "next_check", "last_status")
+
+    def __init__(self, key, work: float | None, poller: AdaptivePoller, timeout: float):
+        now = time.time()
+        self.key = key
+        self.work = work
+        self.poller = poller
+        self.started = now
+        self.deadline = now + timeout
+        self.next_check = now
+        self.last_status = None
+
+
+class JobScheduler:
+    """Fan a batch of jobs out to one endpoint with up to N in flight at once.
+
+    New jobs are submitted as slots free up. All in-flight jobs are polled from
+    a single loop, each on its own adaptive schedule, and results are yielded in
+    completion order. A batch therefore takes about as long as its slowest job,
+    not the sum of all of them.
+
+    ``max_in_flight`` defaults to the endpoint's workersMax. Jobs beyond that
+    would only sit in RunPod's queue.
+
+    Usage:
+        scheduler = JobScheduler(client, timeout=300)
+        for key, result in scheduler.run((name, payload) for name, payload in jobs):
+            ...  # result is the final status JSON, or None if the submit failed
+
+    A job still unfinished after ``timeout`` is left running on RunPod and
+    yields ``{"id": job_id, "status": LOCAL_TIMEOUT}``, so journalled work can
+    be collected later with --resume.
+    """
+
+    DEFAULT_MAX_IN_FLIGHT = 4
+
+    def __init__(self, client: RunPodClient, max_in_flight: int | None = None, timeout: int = 600):
+        self.client = client
+        self.timeout = timeout
+
+        workers_max = get_endpoint_workers_max(client.endpoint_id, client.api_key)
+        if max_in_flight is None:
+            max_in_flight = workers_max or self.DEFAULT_MAX_IN_FLIGHT
+        elif workers_max:
+            max_in_flight = min(max_in_flight, workers_max)
+        self.max_in_flight = max(1, max_in_flight)
+
+    def _log(self, key, message: str) -> None:
+        if self.client.verbose:
+            print(f"  [{key}] {message}", file=sys.stderr)
+
+    def _finish(self, key, data: dict, work: float | None) -> None:
+        status = data.get("status")
+        if status == "COMPLETED":
+            queue = data["delayTime"] / 1000 if data.get("delayTime") is not None else None
+            run = data["executionTime"] / 1000 if data.get("executionTime") is not None else None
+            self.client.stats.record(self.client.endpoint_id, queue, run, work)
+        else:
+            self._log(key, f"{status}: {data.get('error', 'Unknown error')}")
+
+    def run(self, jobs, on_submit=None):
+        """Submit ``(key, payload)`` or ``(key, payload, work)`` items and yield ``(key, result)``.
+
+        A fourth item, ``(key, None, work, job)``, hands over a job that was
+        submitted earlier (e.g. one reattached from the job journal) so it is
+        only polled. ``on_submit(key, job)`` is called for every new
+        submission, before it is polled, so callers can journal it.
+        """
+        pending = iter(jobs)
+        exhausted = False
+        in_flight: dict[str, _InFlight] = {}
+
+        if self.client.verbose:
+            print(f"Running up to {self.max_in_flight} jobs concurrently", file=sys.stderr)
+
+        while True:
+            # Top up the in-flight set
+            while not exhausted and len(in_flight) < self.max_in_flight:
+                try:
+                    item = next(pending)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                key, payload = item[0], item[1]
+                work = item[2] if len(item) > 2 else None
+                job = item[3] if len(item) > 3 else None
+                if job is None:
+                    job = self.client.submit(payload)
+                    if not job or not job.get("id"):
+                        yield key, None
+                        continue
+                    if on_submit:
+                        on_submit(key, job)
+                if job.get("status") in TERMINAL_STATUSES:
+                    self._finish(key, job, work)
+                    yield key, job
+                    continue
+
+                in_flight[job["id"]] = _InFlight(key, work, self.client.make_poller(work), self.timeout)
+                self._log(key, f"submitted {job['id']}")
+
+            if not in_flight:
+                return
+
+            # Check whichever job is due next
+            job_id, entry = min(in_flight.items(), key=lambda kv: kv[1].next_check)
+            delay = entry.next_check - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+            data = self.client.status(job_id)
+            now = time.time()
+
+            if data is not None:
+                status = data.get("status")
+                if status != entry.last_status:
+                    self._log(entry.key, f"{status} ({int(now - entry.started)}s)")
+                    entry.last_status = status
+                if status in TERMINAL_STATUSES:
+                    del in_flight[job_id]
+                    self._finish(entry.key, data, entry.work)
+                    yield entry.key, data
+                    continue
+
+            if now >= entry.deadline:
+                del in_flight[job_id]
+                self._log(entry.key, f"timed out locally after {self.timeout}s, leaving {job_id} running")
+                yield entry.key, {"id": job_id, "status": LOCAL_TIMEOUT}
+                continue
+
+            entry.next_check = now + (entry.poller.next_interval(data) if data else 5)
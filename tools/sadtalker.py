@@ -38,6 +38,13 @@ from pathlib import Path
 
 import requests
 
+sys.path.insert(0, str(Path(__file__).parent))
+from file_hosts import hedged_upload
+from job_journal import COLLECTED, COMPLETED, FAILED, JobJournal, hash_inputs, new_output_key, reattach_job
+from r2_storage import cache_enabled, delete_objects, get_r2_client, object_exists, object_metadata, upload_input
+from runpod_client import RunPodClient
+from transfer import download_object
+
 # Docker image for RunPod endpoint
 SADTALKER_DOCKER_IMAGE = "ghcr.io/conalmullan/video-toolkit-sadtalker:latest"
 SADTALKER_TEMPLATE_NAME = "video-toolkit-sadtalker"
@@ -97,80 +104,14 @@ def get_runpod_config() -> dict:
     }
 
 
-def _get_r2_client():
-    """Get boto3 S3 client configured for Cloudflare R2."""
-    sys.path.insert(0, str(Path(__file__).parent))
-    try:
-        from config import get_r2_config
-        r2_config = get_r2_config()
-    except ImportError:
-        r2_config = None
-
-    if not r2_config:
-        return None, None
-
-    try:
-        import boto3
-        from botocore.config import Config
-
-        client = boto3.client(
-            "s3",
-            endpoint_url=r2_config["endpoint_url"],
-            aws_access_key_id=r2_config["access_key_id"],
-            aws_secret_access_key=r2_config["secret_access_key"],
-            config=Config(signature_version="s3v4"),
-        )
-        return client, r2_config
-    except ImportError:
-        print("  boto3 not installed, skipping R2", file=sys.stderr)
-        return None, None
-
-
-def _upload_to_r2(file_path: str, prefix: str) -> tuple[str | None, str | None]:
-    """Upload to Cloudflare R2 and return presigned download URL."""
-    client, config = _get_r2_client()
-    if not client:
-        return None, None
-
-    import uuid
-    file_name = Path(file_path).name
-    object_key = f"{prefix}/{uuid.uuid4().hex[:8]}_{file_name}"
-
-    try:
-        client.upload_file(file_path, config["bucket_name"], object_key)
-
-        url = client.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": config["bucket_name"], "Key": object_key},
-            ExpiresIn=7200,
-        )
-        return url, object_key
-    except Exception as e:
-        print(f"  R2 upload error: {e}", file=sys.stderr)
-        return None, None
-
-
-def _delete_from_r2(object_key: str) -> bool:
-    """Delete object from R2 after job completion."""
-    client, config = _get_r2_client()
-    if not client or not object_key:
-        return False
-
-    try:
-        client.delete_object(Bucket=config["bucket_name"], Key=object_key)
-        return True
-    except Exception:
-        return False
-
-
 def _download_from_r2(object_key: str, output_path: str) -> bool:
     """Download object from R2 to local path."""
-    client, config = _get_r2_client()
+    client, config = get_r2_client()
     if not client:
         return False
 
     try:
-        client.download_file(config["bucket_name"], object_key, output_path)
+        download_object(client, config["bucket_name"], object_key, output_path)
         return True
     except Exception as e:
         print(f"  R2 download error: {e}", file=sys.stderr)
@@ -185,72 +126,23 @@ def upload_to_storage(file_path: str, prefix: str) -> tuple[str | None, str | No
     print(f"Uploading {file_name} ({file_size // 1024}KB)...", file=sys.stderr)
 
     # Try R2 first if configured
-    url, r2_key = _upload_to_r2(file_path, prefix)
+    url, r2_key = upload_input(file_path, prefix)
     if url:
         print(f"  Upload complete (R2)", file=sys.stderr)
         return url, r2_key
 
-    # Fall back to free services
-    upload_services = [
-        ("litterbox", _upload_to_litterbox),
-        ("0x0.st", _upload_to_0x0),
-    ]
-
-    for service_name, upload_func in upload_services:
-        try:
-            url = upload_func(file_path, file_name)
-            if url:
-                print(f"  Upload complete ({service_name})", file=sys.stderr)
-                return url, None
-        except Exception as e:
-            print(f"  {service_name} failed: {e}", file=sys.stderr)
-            continue
+    # Fall back to free services, racing them so a slow host can't hold things up
+    url, host = hedged_upload(file_path, ["litterbox", "0x0.st"])
+    if url:
+        print(f"  Upload complete ({host})", file=sys.stderr)
+        return url, None
 
     print("All upload services failed", file=sys.stderr)
     return None, None
 
 
-def _upload_to_litterbox(file_path: str, file_name: str) -> str | None:
-    """Upload to litterbox.catbox.moe (200MB limit, 24h retention)."""
-    import subprocess
-    result = subprocess.run(
-        [
-            "curl", "-s",
-            "-F", "reqtype=fileupload",
-            "-F", "time=24h",
-            "-F", f"fileToUpload=@{file_path}",
-            "https://litterbox.catbox.moe/resources/internals/api.php",
-        ],
-        capture_output=True,
-        text=True,
-        timeout=300,
-    )
-    if result.returncode == 0:
-        url = result.stdout.strip()
-        if url.startswith("http"):
-            return url
-    return None
-
-
-def _upload_to_0x0(file_path: str, file_name: str) -> str | None:
-    """Upload to 0x0.st (512MB limit, 30 day retention)."""
-    import subprocess
-    result = subprocess.run(
-        ["curl", "-s", "-F", f"file=@{file_path}", "https://0x0.st"],
-        capture_output=True,
-        text=True,
-        timeout=300,
-    )
-    if result.returncode == 0:
-        url = result.stdout.strip()
-        if url.startswith("http"):
-            return url
-    return None
-
-
 def submit_runpod_job(
-    endpoint_id: str,
-    api_key: str,
+    client: RunPodClient,
     image_url: str,
     audio_url: str,
     still_mode: bool = False,
@@ -260,10 +152,9 @@ def submit_runpod_job(
     expression_scale: float = 1.0,
     pose_style: int = 0,
     r2_config: dict | None = None,
+    output_key: str | None = None,
 ) -> dict | None:
     """Submit a SadTalker job to RunPod serverless endpoint."""
-    url = f"https://api.runpod.ai/v2/{endpoint_id}/run"
-
     payload = {
         "input": {
             "image_url": image_url,
@@ -274,6 +165,7 @@ def submit_runpod_job(
             "size": size,
             "expression_scale": expression_scale,
             "pose_style": pose_style,
+            "face_cache": cache_enabled(),
         }
     }
 
@@ -285,101 +177,10 @@ def submit_runpod_job(
             "secret_access_key": r2_config["secret_access_key"],
             "bucket_name": r2_config["bucket_name"],
         }
+        if output_key:
+            payload["input"]["r2"]["output_key"] = output_key
 
-    try:
-        response = requests.post(
-            url,
-            json=payload,
-            headers={"Authorization": f"Bearer {api_key}"},
-            timeout=30,
-        )
-
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Job submission failed: HTTP {response.status_code}", file=sys.stderr)
-            print(f"  Response: {response.text[:500]}", file=sys.stderr)
-            return None
-
-    except Exception as e:
-        print(f"Job submission error: {e}", file=sys.stderr)
-        return None
-
-
-def poll_runpod_job(
-    endpoint_id: str,
-    api_key: str,
-    job_id: str,
-    timeout: int = 600,
-    poll_interval: int = 5,
-    verbose: bool = True,
-) -> dict | None:
-    """Poll RunPod job until completion or timeout."""
-    url = f"https://api.runpod.ai/v2/{endpoint_id}/status/{job_id}"
-    start_time = time.time()
-    last_status = None
-
-    while time.time() - start_time < timeout:
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": f"Bearer {api_key}"},
-                timeout=30,
-            )
-
-            if response.status_code != 200:
-                print(f"Status check failed: HTTP {response.status_code}", file=sys.stderr)
-                time.sleep(poll_interval)
-                continue
-
-            data = response.json()
-            status = data.get("status")
-
-            if verbose and status != last_status:
-                elapsed = int(time.time() - start_time)
-                print(f"  [{elapsed}s] Status: {status}", file=sys.stderr)
-                last_status = status
-
-            if status == "COMPLETED":
-                return data
-            elif status == "FAILED":
-                print(f"Job failed: {data.get('error', 'Unknown error')}", file=sys.stderr)
-                return data
-            elif status in ["IN_QUEUE", "IN_PROGRESS"]:
-                time.sleep(poll_interval)
-            else:
-                time.sleep(poll_interval)
-
-        except Exception as e:
-            print(f"Status check error: {e}", file=sys.stderr)
-            time.sleep(poll_interval)
-
-    print(f"Job timed out after {timeout}s", file=sys.stderr)
-    return None
-
-
-def download_from_url(url: str, output_path: str, verbose: bool = True) -> bool:
-    """Download file from URL to local path."""
-    try:
-        if verbose:
-            print(f"Downloading result...", file=sys.stderr)
-
-        response = requests.get(url, stream=True, timeout=300)
-        response.raise_for_status()
-
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-
-        if verbose:
-            size_kb = Path(output_path).stat().st_size // 1024
-            print(f"  Downloaded: {output_path} ({size_kb}KB)", file=sys.stderr)
-
-        return True
-
-    except Exception as e:
-        print(f"Download error: {e}", file=sys.stderr)
-        return False
+    return client.submit(payload)
 
 
 def retrieve_job_result(
@@ -404,23 +205,31 @@ def retrieve_job_result(
         print(f"Retrieving job: {job_id}", file=sys.stderr)
 
     # Get job status
-    url = f"https://api.runpod.ai/v2/{endpoint_id}/status/{job_id}"
+    client = RunPodClient(endpoint_id, api_key, verbose=verbose)
     try:
-        response = requests.get(
-            url,
-            headers={"Authorization": f"Bearer {api_key}"},
-            timeout=30,
-        )
+        data = client.status(job_id)
+        if data is None:
+            return {"error": "Failed to get job status"}
 
-        if response.status_code != 200:
-            return {"error": f"Failed to get job status: HTTP {response.status_code}"}
-
-        data = response.json()
         status = data.get("status")
 
         if verbose:
             print(f"  Status: {status}", file=sys.stderr)
 
+        journal = JobJournal()
+        entry = journal.get(job_id) or {}
+        output_key = entry.get("output_key")
+
+        # RunPod forgets finished jobs after a while; the journalled R2 key outlives that
+        if status != "COMPLETED" and output_key and object_exists(output_key):
+            if verbose:
+                print(f"  Job status expired, downloading journalled result: {output_key}", file=sys.stderr)
+            if not _download_from_r2(output_key, output_path):
+                return {"error": "Failed to download video"}
+            delete_objects([output_key])
+            journal.update(job_id, status=COLLECTED)
+            return {"output": output_path, "job_id": job_id}
+
         if status != "COMPLETED":
             return {"error": f"Job not completed. Status: {status}"}
 
@@ -439,9 +248,12 @@ def retrieve_job_result(
             print(f"  Downloading from: {video_url[:80]}...", file=sys.stderr)
 
         # Download the video
-        if not download_from_url(video_url, output_path, verbose=verbose):
+        if not client.download(video_url, output_path):
             return {"error": "Failed to download video"}
 
+        if entry:
+            journal.update(job_id, status=COLLECTED)
+
         return {
             "output": output_path,
             "job_id": job_id,
@@ -465,8 +277,13 @@ def process_with_runpod(
     pose_style: int = 0,
     timeout: int = 600,
     verbose: bool = True,
+    resume: bool = False,
 ) -> dict:
-    """Process image+audio using RunPod serverless endpoint."""
+    """Process image+audio using RunPod serverless endpoint.
+
+    With ``resume``, an earlier job for the same image, audio and settings is
+    looked up in the job journal and collected instead of submitting a new one.
+    """
     start_time = time.time()
     r2_keys_to_cleanup = []
 
@@ -492,8 +309,8 @@ def process_with_runpod(
         print("Warning: R2 not configured. Video will be returned as base64.", file=sys.stderr)
 
     # Auto-calculate timeout if not specified
+    audio_duration = get_audio_duration(audio_path)
     if timeout <= 0:
-        audio_duration = get_audio_duration(audio_path)
         if audio_duration:
             timeout = calculate_timeout(audio_duration)
             if verbose:
@@ -506,65 +323,91 @@ def process_with_runpod(
     if verbose:
         print(f"Using RunPod endpoint: {endpoint_id}", file=sys.stderr)
 
-    # Upload image
-    image_url, image_r2_key = upload_to_storage(image_path, "sadtalker/input")
-    if not image_url:
-        return {"error": "Failed to upload image"}
-    if image_r2_key:
-        r2_keys_to_cleanup.append(image_r2_key)
-
-    # Upload audio
-    audio_url, audio_r2_key = upload_to_storage(audio_path, "sadtalker/input")
-    if not audio_url:
-        return {"error": "Failed to upload audio"}
-    if audio_r2_key:
-        r2_keys_to_cleanup.append(audio_r2_key)
-
-    # Submit job
-    if verbose:
-        print(f"Submitting job (size={size}, enhancer={enhancer})...", file=sys.stderr)
-
-    job_response = submit_runpod_job(
-        endpoint_id=endpoint_id,
-        api_key=api_key,
-        image_url=image_url,
-        audio_url=audio_url,
-        still_mode=still_mode,
-        enhancer=enhancer,
-        preprocess=preprocess,
-        size=size,
-        expression_scale=expression_scale,
-        pose_style=pose_style,
-        r2_config=r2_config,
-    )
+    client = RunPodClient(endpoint_id, api_key, verbose=verbose)
+    journal = JobJournal()
+    params = {
+        "still_mode": still_mode,
+        "enhancer": enhancer,
+        "preprocess": preprocess,
+        "size": size,
+        "expression_scale": expression_scale,
+        "pose_style": pose_style,
+    }
+    inputs_hash = hash_inputs([image_path, audio_path], params)
+
+    job_response = None
+    if resume:
+        reattached = reattach_job(client, journal, "sadtalker", inputs_hash, object_metadata, verbose)
+        if reattached:
+            entry, job_response = reattached
+            r2_keys_to_cleanup.extend(entry.get("r2_keys", []))
+
+    if job_response is None:
+        # Upload image
+        image_url, image_r2_key = upload_to_storage(image_path, "sadtalker/input")
+        if not image_url:
+            return {"error": "Failed to upload image"}
+        if image_r2_key:
+            r2_keys_to_cleanup.append(image_r2_key)
+
+        # Upload audio
+        audio_url, audio_r2_key = upload_to_storage(audio_path, "sadtalker/input")
+        if not audio_url:
+            return {"error": "Failed to upload audio"}
+        if audio_r2_key:
+            r2_keys_to_cleanup.append(audio_r2_key)
+
+        # Submit job
+        if verbose:
+            print(f"Submitting job (size={size}, enhancer={enhancer})...", file=sys.stderr)
+
+        output_key = new_output_key("sadtalker", ".mp4") if r2_config else None
+        job_response = submit_runpod_job(
+            client,
+            image_url=image_url,
+            audio_url=audio_url,
+            r2_config=r2_config,
+            output_key=output_key,
+            **params,
+        )
 
-    if not job_response:
-        return {"error": "Failed to submit job"}
+        if not job_response:
+            return {"error": "Failed to submit job"}
+
+        job_id = job_response.get("id")
+        if not job_id:
+            return {"error": f"No job ID in response: {job_response}"}
+
+        journal.record(
+            job_id,
+            tool="sadtalker",
+            endpoint_id=endpoint_id,
+            inputs_hash=inputs_hash,
+            output_path=output_path,
+            r2_keys=r2_keys_to_cleanup,
+            output_key=output_key,
+            params=params,
+        )
 
-    job_id = job_response.get("id")
-    if not job_id:
-        return {"error": f"No job ID in response: {job_response}"}
+        if verbose:
+            print(f"Job submitted: {job_id}", file=sys.stderr)
 
-    if verbose:
-        print(f"Job submitted: {job_id}", file=sys.stderr)
+    job_id = job_response["id"]
 
     # Poll for completion
-    result = poll_runpod_job(
-        endpoint_id=endpoint_id,
-        api_key=api_key,
-        job_id=job_id,
-        timeout=timeout,
-        verbose=verbose,
-    )
+    result = client.wait(job_response, timeout=timeout, work=audio_duration)
 
     if not result:
-        return {"error": "Job timed out or failed to get status"}
+        return {"error": f"Job {job_id} timed out locally; it may still finish on RunPod. Re-run with --resume to collect it."}
 
     status = result.get("status")
     if status != "COMPLETED":
         error = result.get("error") or result.get("output", {}).get("error") or "Unknown error"
+        journal.update(job_id, status=FAILED, error=str(error))
         return {"error": f"Job failed: {error}"}
 
+    journal.update(job_id, status=COMPLETED)
+
     # Get output from result
     output = result.get("output", {})
     if isinstance(output, dict) and output.get("error"):
@@ -580,7 +423,8 @@ def process_with_runpod(
     if output_r2_key:
         if verbose:
             print(f"Downloading result from R2...", file=sys.stderr)
-        downloaded = _download_from_r2(output_r2_key, output_path)
+        with client.timed("download"):
+            downloaded = _download_from_r2(output_r2_key, output_path)
         if downloaded:
             r2_keys_to_cleanup.append(output_r2_key)
             if verbose:
@@ -588,7 +432,7 @@ def process_with_runpod(
                 print(f"  Downloaded: {output_path} ({size_kb}KB)", file=sys.stderr)
 
     if not downloaded and output_url:
-        downloaded = download_from_url(output_url, output_path, verbose=verbose)
+        downloaded = client.download(output_url, output_path)
 
     if not downloaded:
         # Try base64 fallback
@@ -604,10 +448,10 @@ def process_with_runpod(
     if not downloaded:
         return {"error": f"No video in result: {list(output.keys()) if isinstance(output, dict) else output}"}
 
-    # Cleanup R2 objects
-    if r2_keys_to_cleanup:
-        for key in r2_keys_to_cleanup:
-            _delete_from_r2(key)
+    journal.update(job_id, status=COLLECTED)
+
+    # Cleanup R2 objects (in the background)
+    delete_objects(r2_keys_to_cleanup)
 
     elapsed = time.time() - start_time
 
@@ -616,6 +460,7 @@ def process_with_runpod(
         "output": output_path,
         "job_id": job_id,
         "processing_time_seconds": round(elapsed, 2),
+        "timings": client.timings,
         "duration_seconds": output.get("duration_seconds"),
         "chunks_processed": output.get("chunks_processed"),
     }
@@ -1027,6 +872,11 @@ Examples:
         metavar="JOB_ID",
         help="Retrieve results from a completed job (e.g., if previous run timed out)",
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Collect an earlier job for the same image and audio instead of resubmitting (see tools/job_journal.py)",
+    )
     parser.add_argument(
         "--setup",
         action="store_true",
@@ -1140,6 +990,7 @@ def main():
         pose_style=pose_style,
         timeout=args.timeout,
         verbose=verbose,
+        resume=args.resume,
     )
 
     if result.get("error"):
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Parallel, resumable file transfers for R2 objects and presigned URLs.
+
+Large files move in fixed-size parts over several connections at once:
+multipart uploads to R2, ranged GETs for downloads. An interrupted transfer
+picks up where it stopped on the next run. Uploads reattach to their multipart
+upload (tracked under <state dir>/uploads/), and downloads keep a
+<output>.part file with a sidecar listing the finished parts.
+
+Integrity: every part is sent with Content-MD5, which R2 checks on arrival.
+Uploads store the file's SHA-256 as object metadata ("sha256"). Downloads
+verify that digest when the object has one, and always verify the size.
+
+Tuning (env):
+    TRANSFER_CONCURRENCY    parallel connections per transfer (default 8)
+    TRANSFER_PART_SIZE_MB   part size in MB (default 16, minimum 5)
+
+Usage:
+    from transfer import download_object, download_url, upload_file
+
+    upload_file(s3_client, bucket, "in.mp4", "dewatermark/in.mp4")
+    download_object(s3_client, bucket, "dewatermark/results/x.mp4", "out.mp4")
+    download_url(session, presigned_url, "out.mp4")
+"""
+
+import base64
+import hashlib
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import get_state_dir, get_transfer_settings
+from job_journal import file_sha256
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3/R2 minimum for every part but the last
+STREAM_CHUNK = 1024 * 1024
+
+
+class TransferError(Exception):
+    """A transfer finished with missing or corrupt data."""
+
+
+def _settings(part_size: int | None, concurrency: int | None) -> tuple[int, int]:
+    settings = get_transfer_settings()
+    part_size = max(MIN_PART_SIZE, part_size or settings["part_size"])
+    return part_size, max(1, concurrency or settings["concurrency"])
+
+
+def _part_ranges(size: int, part_size: int) -> list[tuple[int, int]]:
+    """Inclusive byte ranges covering ``size`` bytes."""
+    return [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)] or [(0, -1)]
+
+
+def _md5_b64(data: bytes) -> str:
+    return base64.b64encode(hashlib.md5(data).digest()).decode()
+
+
+def _read_range(file_path: str, start: int, end: int) -> bytes:
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start + 1)
+
+
+# =============================================================================
+# Uploads
+# =============================================================================
+
+def _upload_state_path(bucket: str, object_key: str, digest: str) -> Path:
+    name = hashlib.sha256(f"{bucket}/{object_key}/{digest}".encode()).hexdigest()[:32]
+    state_dir = get_state_dir() / "uploads"
+    state_dir.mkdir(exist_ok=True)
+    return state_dir / f"{name}.json"
+
+
+def _uploaded_parts(client, bucket: str, object_key: str, upload_id: str) -> dict[int, dict]:
+    parts = {}
+    paginator = client.get_paginator("list_parts")
+    for page in paginator.paginate(Bucket=bucket, Key=object_key, UploadId=upload_id):
+        for part in page.get("Parts", []):
+            parts[part["PartNumber"]] = part
+    return parts
+
+
+def _abort_upload(client, bucket: str, object_key: str, upload_id: str, state_path: Path) -> None:
+    """Discard a multipart upload and its stored parts, and forget it locally."""
+    try:
+        client.abort_multipart_upload(Bucket=bucket, Key=object_key, UploadId=upload_id)
+    except Exception:
+        pass  # already aborted or expired
+    state_path.unlink(missing_ok=True)
+
+
+def upload_file(
+    client,
+    bucket: str,
+    file_path: str,
+    object_key: str,
+    content_type: str | None = None,
+    part_size: int | None = None,
+    concurrency: int | None = None,
+    verbose: bool = True,
+) -> str:
+    """Upload file_path to object_key, in parallel parts if it is large.
+
+    Re-running after an interruption uploads only the parts that are missing.
+    Uploads that R2 rejects are aborted so their parts are not left billed.
+    Returns the file's SHA-256, which is also stored in the object's metadata.
+    """
+    part_size, concurrency = _settings(part_size, concurrency)
+    size = Path(file_path).stat().st_size
+    digest = file_sha256(file_path)
+    extra = {"Metadata": {"sha256": digest}}
+    if content_type:
+        extra["ContentType"] = content_type
+
+    if size <= part_size:
+        body = _read_range(file_path, 0, size - 1)
+        client.put_object(Bucket=bucket, Key=object_key, Body=body, ContentMD5=_md5_b64(body), **extra)
+        return digest
+
+    ranges = _part_ranges(size, part_size)
+    state_path = _upload_state_path(bucket, object_key, digest)
+    upload_id = None
+    done: dict[int, str] = {}
+
+    if state_path.exists():
+        try:
+            upload_id = json.loads(state_path.read_text())["upload_id"]
+            for number, part in _uploaded_parts(client, bucket, object_key, upload_id).items():
+                start, end = ranges[number - 1]
+                if part["Size"] == end - start + 1:
+                    done[number] = part["ETag"]
+            if verbose:
+                print(f"  Resuming upload: {len(done)}/{len(ranges)} parts already in R2", file=sys.stderr)
+        except Exception:
+            # Upload was aborted, expired or no longer matches the file: start over
+            if upload_id:
+                _abort_upload(client, bucket, object_key, upload_id, state_path)
+            upload_id, done = None, {}
+
+    if not upload_id:
+        upload_id = client.create_multipart_upload(Bucket=bucket, Key=object_key, **extra)["UploadId"]
+        state_path.write_text(json.dumps({"upload_id": upload_id, "bucket": bucket, "key": object_key}))
+
+    def send(number: int) -> tuple[int, str]:
+        start, end = ranges[number - 1]
+        body = _read_range(file_path, start, end)
+        response = client.upload_part(
+            Bucket=bucket,
+            Key=object_key,
+            UploadId=upload_id,
+            PartNumber=number,
+            Body=body,
+            ContentMD5=_md5_b64(body),
+        )
+        return number, response["ETag"]
+
+    todo = [number for number in range(1, len(ranges) + 1) if number not in done]
+    try:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(todo)) or 1) as pool:
+            for number, etag in pool.map(send, todo):
+                done[number] = etag
+
+        client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=object_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": n, "ETag": done[n]} for n in sorted(done)]},
+        )
+    except Exception as e:
+        from botocore.exceptions import BotoCoreError
+
+        # Connection errors leave the upload to resume; anything else would fail again
+        if not isinstance(e, BotoCoreError):
+            _abort_upload(client, bucket, object_key, upload_id, state_path)
+        raise
+    state_path.unlink(missing_ok=True)
+    return digest
+
+
+# =============================================================================
+# Downloads
+# =============================================================================
+
+def _download_parts(
+    fetch_range: Callable[[int, int], Iterable[bytes]],
+    size: int,
+    validator: str,
+    output_path: str,
+    part_size: int,
+    concurrency: int,
+    sha256: str | None = None,
+    verbose: bool = True,
+) -> None:
+    """Fetch ``size`` bytes as parallel ranges into output_path.
+
+    ``validator`` identifies the remote version (usually its ETag). Progress in
+    an existing .part file is only reused if it was made against the same one.
+    """
+    output = Path(output_path)
+    part_path = output.with_name(output.name + ".part")
+    state_path = output.with_name(output.name + ".part.json")
+    ranges = _part_ranges(size, part_size)
+
+    done: set[int] = set()
+    if part_path.exists() and state_path.exists():
+        try:
+            state = json.loads(state_path.read_text())
+            if (state.get("validator"), state.get("size"), state.get("part_size")) == (validator, size, part_size):
+                done = set(state.get("done", []))
+        except ValueError:
+            pass
+
+    if done:
+        if verbose:
+            print(f"  Resuming download: {len(done)}/{len(ranges)} parts already on disk", file=sys.stderr)
+    else:
+        with open(part_path, "wb") as f:
+            f.truncate(size)
+
+    lock = threading.Lock()
+
+    def save_state() -> None:
+        state_path.write_text(json.dumps({
+            "validator": validator,
+            "size": size,
+            "part_size": part_size,
+            "done": sorted(done),
+        }))
+
+    def fetch(index: int) -> None:
+        start, end = ranges[index]
+        written = 0
+        with open(part_path, "r+b") as f:
+            f.seek(start)
+            for chunk in fetch_range(start, end):
+                f.write(chunk)
+                written += len(chunk)
+        if written != end - start + 1:
+            raise TransferError(f"Part {index + 1}: got {written} bytes, expected {end - start + 1}")
+        with lock:
+            done.add(index)
+            save_state()
+
+    save_state()
+    todo = [index for index in range(len(ranges)) if index not in done and size > 0]
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(todo)) or 1) as pool:
+        list(pool.map(fetch, todo))
+
+    if part_path.stat().st_size != size:
+        raise TransferError(f"Size mismatch: {part_path.stat().st_size} != {size}")
+    if sha256 and file_sha256(str(part_path)) != sha256:
+        part_path.unlink(missing_ok=True)
+        state_path.unlink(missing_ok=True)
+        raise TransferError("SHA-256 mismatch, discarded the download")
+
+    part_path.replace(output)
+    state_path.unlink(missing_ok=True)
+
+
+def download_object(
+    client,
+    bucket: str,
+    object_key: str,
+    output_path: str,
+    part_size: int | None = None,
+    concurrency: int | None = None,
+    verbose: bool = True,
+) -> None:
+    """Download an R2 object with parallel ranged GETs, verifying its checksum."""
+    part_size, concurrency = _settings(part_size, concurrency)
+    head = client.head_object(Bucket=bucket, Key=object_key)
+    etag = head["ETag"]
+
+    def fetch_range(start: int, end: int) -> Iterable[bytes]:
+        response = client.get_object(Bucket=bucket, Key=object_key, Range=f"bytes={start}-{end}", IfMatch=etag)
+        return response["Body"].iter_chunks(STREAM_CHUNK)
+
+    _download_parts(
+        fetch_range,
+        head["ContentLength"],
+        etag,
+        output_path,
+        part_size,
+        concurrency,
+        sha256=head.get("Metadata", {}).get("sha256"),
+        verbose=verbose,
+    )
+
+
+def download_url(
+    session,
+    url: str,
+    output_path: str,
+    timeout: int = 600,
+    sha256: str | None = None,
+    part_size: int | None = None,
+    concurrency: int | None = None,
+    verbose: bool = True,
+) -> None:
+    """Download a URL with parallel ranged GETs when the server supports them.
+
+    Servers that ignore Range headers get a plain single-stream download.
+    """
+    part_size, concurrency = _settings(part_size, concurrency)
+
+    probe = session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=timeout)
+    probe.raise_for_status()
+    content_range = probe.headers.get("Content-Range", "")
+    total = content_range.rsplit("/", 1)[-1]
+
+    if probe.status_code != 206 or not total.isdigit():
+        with open(output_path, "wb") as f:
+            for chunk in probe.iter_content(chunk_size=STREAM_CHUNK):
+                f.write(chunk)
+        if sha256 and file_sha256(output_path) != sha256:
+            raise TransferError("SHA-256 mismatch")
+        return
+
+    probe.close()
+    size = int(total)
+    etag = probe.headers.get("ETag")
+
+    def fetch_range(start: int, end: int) -> Iterable[bytes]:
+        headers = {"Range": f"bytes={start}-{end}"}
+        if etag:
+            headers["If-Match"] = etag
+        response = session.get(url, headers=headers, stream=True, timeout=timeout)
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise TransferError("Server stopped honouring range requests")
+        return response.iter_content(chunk_size=STREAM_CHUNK)
+
+    # Presigned URLs differ per signature, so resume on the object path instead
+    validator = etag or f"{url.split('?', 1)[0]}:{size}"
+    _download_parts(fetch_range, size, validator, output_path, part_size, concurrency, sha256, verbose)
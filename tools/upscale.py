@@ -8,6 +8,9 @@ Usage:
     # Cloud processing via RunPod (works from any machine)
     python tools/upscale.py --input image.jpg --output upscaled.png --runpod
 
+    # Batch a whole directory (several jobs in flight at once)
+    python tools/upscale.py --input-dir ./images --output-dir ./upscaled --runpod
+
     # Specify model and scale
     python tools/upscale.py --input image.jpg --output upscaled.png --model anime --scale 4 --runpod
 
@@ -41,6 +44,13 @@ from pathlib import Path
 
 import requests
 
+sys.path.insert(0, str(Path(__file__).parent))
+from file_hosts import hedged_upload
+from job_journal import COLLECTED, COMPLETED, FAILED, JobJournal, hash_inputs, new_output_key, reattach_job
+from r2_storage import delete_objects, get_r2_client, object_metadata, upload_input
+from runpod_client import LOCAL_TIMEOUT, RUNSYNC_WAIT_SECONDS, TERMINAL_STATUSES, JobScheduler, RunPodClient
+from transfer import download_object
+
 # Docker image for RunPod endpoint
 REALESRGAN_DOCKER_IMAGE = "ghcr.io/conalmullan/video-toolkit-realesrgan:v2"
 REALESRGAN_TEMPLATE_NAME = "video-toolkit-realesrgan-v2"
@@ -69,80 +79,14 @@ def get_runpod_config() -> dict:
     }
 
 
-def _get_r2_client():
-    """Get boto3 S3 client configured for Cloudflare R2."""
-    sys.path.insert(0, str(Path(__file__).parent))
-    try:
-        from config import get_r2_config
-        r2_config = get_r2_config()
-    except ImportError:
-        r2_config = None
-
-    if not r2_config:
-        return None, None
-
-    try:
-        import boto3
-        from botocore.config import Config
-
-        client = boto3.client(
-            "s3",
-            endpoint_url=r2_config["endpoint_url"],
-            aws_access_key_id=r2_config["access_key_id"],
-            aws_secret_access_key=r2_config["secret_access_key"],
-            config=Config(signature_version="s3v4"),
-        )
-        return client, r2_config
-    except ImportError:
-        print("  boto3 not installed, skipping R2", file=sys.stderr)
-        return None, None
-
-
-def _upload_to_r2(file_path: str, file_name: str) -> tuple[str | None, str | None]:
-    """Upload to Cloudflare R2 and return presigned download URL."""
-    client, config = _get_r2_client()
-    if not client:
-        return None, None
-
-    import uuid
-    object_key = f"upscale/{uuid.uuid4().hex[:8]}_{file_name}"
-
-    try:
-        client.upload_file(file_path, config["bucket_name"], object_key)
-
-        # Generate presigned URL (valid for 2 hours)
-        url = client.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": config["bucket_name"], "Key": object_key},
-            ExpiresIn=7200,
-        )
-        return url, object_key
-    except Exception as e:
-        print(f"  R2 upload error: {e}", file=sys.stderr)
-        return None, None
-
-
-def _delete_from_r2(object_key: str) -> bool:
-    """Delete object from R2 after job completion."""
-    client, config = _get_r2_client()
-    if not client or not object_key:
-        return False
-
-    try:
-        client.delete_object(Bucket=config["bucket_name"], Key=object_key)
-        return True
-    except Exception:
-        return False
-
-
 def _download_from_r2(object_key: str, output_path: str) -> bool:
     """Download object from R2 to local path."""
-    client, config = _get_r2_client()
+    client, config = get_r2_client()
     if not client:
         return False
 
     try:
-        client.download_file(config["bucket_name"], object_key, output_path)
+        download_object(client, config["bucket_name"], object_key, output_path)
         return True
     except Exception as e:
         print(f"  R2 download error: {e}", file=sys.stderr)
@@ -157,82 +101,31 @@ def upload_to_storage(file_path: str, api_key: str) -> tuple[str | None, str | N
     print(f"Uploading {file_name} ({file_size // 1024}KB)...", file=sys.stderr)
 
     # Try R2 first if configured
-    url, r2_key = _upload_to_r2(file_path, file_name)
+    url, r2_key = upload_input(file_path, "upscale")
     if url:
         print(f"  Upload complete (R2)", file=sys.stderr)
         return url, r2_key
 
-    # Fall back to free services
-    upload_services = [
-        ("litterbox", _upload_to_litterbox),
-        ("0x0.st", _upload_to_0x0),
-    ]
-
-    for service_name, upload_func in upload_services:
-        try:
-            url = upload_func(file_path, file_name)
-            if url:
-                print(f"  Upload complete ({service_name})", file=sys.stderr)
-                return url, None
-        except Exception as e:
-            print(f"  {service_name} failed: {e}", file=sys.stderr)
-            continue
+    # Fall back to free services, racing them so a slow host can't hold things up
+    url, host = hedged_upload(file_path, ["litterbox", "0x0.st"])
+    if url:
+        print(f"  Upload complete ({host})", file=sys.stderr)
+        return url, None
 
     print("All upload services failed", file=sys.stderr)
     return None, None
 
 
-def _upload_to_litterbox(file_path: str, file_name: str) -> str | None:
-    """Upload to litterbox.catbox.moe (200MB limit, 24h retention)."""
-    import subprocess
-    result = subprocess.run(
-        [
-            "curl", "-s",
-            "-F", "reqtype=fileupload",
-            "-F", "time=24h",
-            "-F", f"fileToUpload=@{file_path}",
-            "https://litterbox.catbox.moe/resources/internals/api.php",
-        ],
-        capture_output=True,
-        text=True,
-        timeout=300,
-    )
-    if result.returncode == 0:
-        url = result.stdout.strip()
-        if url.startswith("http"):
-            return url
-    return None
-
-
-def _upload_to_0x0(file_path: str, file_name: str) -> str | None:
-    """Upload to 0x0.st (512MB limit, 30 day retention)."""
-    import subprocess
-    result = subprocess.run(
-        ["curl", "-s", "-F", f"file=@{file_path}", "https://0x0.st"],
-        capture_output=True,
-        text=True,
-        timeout=300,
-    )
-    if result.returncode == 0:
-        url = result.stdout.strip()
-        if url.startswith("http"):
-            return url
-    return None
-
-
-def submit_runpod_job(
-    endpoint_id: str,
-    api_key: str,
+def build_job_payload(
     image_url: str,
     scale: int = 4,
     model: str = "general",
     face_enhance: bool = False,
     output_format: str = "png",
     r2_config: dict | None = None,
-) -> dict | None:
-    """Submit an upscale job to RunPod serverless endpoint."""
-    url = f"https://api.runpod.ai/v2/{endpoint_id}/run"
-
+    output_key: str | None = None,
+) -> dict:
+    """Build the RunPod job payload for one upscale."""
     payload = {
         "input": {
             "operation": "upscale",
@@ -252,101 +145,63 @@ def submit_runpod_job(
             "secret_access_key": r2_config["secret_access_key"],
             "bucket_name": r2_config["bucket_name"],
         }
+        if output_key:
+            payload["input"]["r2"]["output_key"] = output_key
 
-    try:
-        response = requests.post(
-            url,
-            json=payload,
-            headers={"Authorization": f"Bearer {api_key}"},
-            timeout=30,
-        )
-
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Job submission failed: HTTP {response.status_code}", file=sys.stderr)
-            print(f"  Response: {response.text[:500]}", file=sys.stderr)
-            return None
-
-    except Exception as e:
-        print(f"Job submission error: {e}", file=sys.stderr)
-        return None
+    return payload
 
 
-def poll_runpod_job(
-    endpoint_id: str,
-    api_key: str,
-    job_id: str,
-    timeout: int = 300,
-    poll_interval: int = 2,
-    verbose: bool = True,
+def submit_runpod_job(
+    client: RunPodClient,
+    image_url: str,
+    scale: int = 4,
+    model: str = "general",
+    face_enhance: bool = False,
+    output_format: str = "png",
+    r2_config: dict | None = None,
+    sync_wait: float | None = RUNSYNC_WAIT_SECONDS,
+    output_key: str | None = None,
 ) -> dict | None:
-    """Poll RunPod job until completion or timeout."""
-    url = f"https://api.runpod.ai/v2/{endpoint_id}/status/{job_id}"
-    start_time = time.time()
-    last_status = None
-
-    while time.time() - start_time < timeout:
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": f"Bearer {api_key}"},
-                timeout=30,
-            )
-
-            if response.status_code != 200:
-                print(f"Status check failed: HTTP {response.status_code}", file=sys.stderr)
-                time.sleep(poll_interval)
-                continue
-
-            data = response.json()
-            status = data.get("status")
-
-            if verbose and status != last_status:
-                elapsed = int(time.time() - start_time)
-                print(f"  [{elapsed}s] Status: {status}", file=sys.stderr)
-                last_status = status
-
-            if status == "COMPLETED":
-                return data
-            elif status == "FAILED":
-                print(f"Job failed: {data.get('error', 'Unknown error')}", file=sys.stderr)
-                return data
-            elif status in ["IN_QUEUE", "IN_PROGRESS"]:
-                time.sleep(poll_interval)
-            else:
-                time.sleep(poll_interval)
-
-        except Exception as e:
-            print(f"Status check error: {e}", file=sys.stderr)
-            time.sleep(poll_interval)
-
-    print(f"Job timed out after {timeout}s", file=sys.stderr)
-    return None
+    """Submit an upscale job to RunPod serverless endpoint.
 
+    Goes through /runsync unless ``sync_wait`` is None; on a warm worker the
+    upscaled image is usually ready in the same request.
+    """
+    payload = build_job_payload(image_url, scale, model, face_enhance, output_format, r2_config, output_key)
+    if sync_wait:
+        return client.submit_sync(payload, wait=sync_wait)
+    return client.submit(payload)
 
-def download_from_url(url: str, output_path: str, verbose: bool = True) -> bool:
-    """Download file from URL to local path."""
-    try:
-        if verbose:
-            print(f"Downloading result...", file=sys.stderr)
 
-        response = requests.get(url, stream=True, timeout=300)
-        response.raise_for_status()
+def _save_job_output(
+    client: RunPodClient,
+    output: dict,
+    output_path: str,
+    r2_keys_to_cleanup: list,
+    verbose: bool = True,
+) -> bool:
+    """Download a finished job's image (R2 first, then URL) to output_path."""
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    downloaded = False
 
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+    output_r2_key = output.get("r2_key") if isinstance(output, dict) else None
+    output_url = output.get("output_url") if isinstance(output, dict) else None
 
+    if output_r2_key:
         if verbose:
-            size_kb = Path(output_path).stat().st_size // 1024
-            print(f"  Downloaded: {output_path} ({size_kb}KB)", file=sys.stderr)
+            print(f"Downloading result from R2...", file=sys.stderr)
+        with client.timed("download"):
+            downloaded = _download_from_r2(output_r2_key, output_path)
+        if downloaded:
+            r2_keys_to_cleanup.append(output_r2_key)
+            if verbose:
+                size_kb = Path(output_path).stat().st_size // 1024
+                print(f"  Downloaded: {output_path} ({size_kb}KB)", file=sys.stderr)
 
-        return True
+    if not downloaded and output_url:
+        downloaded = client.download(output_url, output_path)
 
-    except Exception as e:
-        print(f"Download error: {e}", file=sys.stderr)
-        return False
+    return downloaded
 
 
 def process_with_runpod(
@@ -358,8 +213,13 @@ def process_with_runpod(
     output_format: str = "png",
     timeout: int = 300,
     verbose: bool = True,
+    resume: bool = False,
 ) -> dict:
-    """Process image using RunPod serverless endpoint."""
+    """Process image using RunPod serverless endpoint.
+
+    With ``resume``, an earlier job for the same image and settings is looked up
+    in the job journal and collected instead of submitting a new one.
+    """
     start_time = time.time()
     r2_keys_to_cleanup = []
 
@@ -384,87 +244,92 @@ def process_with_runpod(
     if verbose:
         print(f"Using RunPod endpoint: {endpoint_id}", file=sys.stderr)
 
-    # Upload image
-    image_url, image_r2_key = upload_to_storage(input_path, api_key)
-    if not image_url:
-        return {"error": "Failed to upload image"}
-    if image_r2_key:
-        r2_keys_to_cleanup.append(image_r2_key)
+    client = RunPodClient(endpoint_id, api_key, verbose=verbose)
+    journal = JobJournal()
+    params = {"scale": scale, "model": model, "face_enhance": face_enhance, "output_format": output_format}
+    inputs_hash = hash_inputs([input_path], params)
+
+    job_response = None
+    if resume:
+        reattached = reattach_job(client, journal, "upscale", inputs_hash, object_metadata, verbose)
+        if reattached:
+            entry, job_response = reattached
+            r2_keys_to_cleanup.extend(entry.get("r2_keys", []))
+
+    if job_response is None:
+        # Upload image
+        image_url, image_r2_key = upload_to_storage(input_path, api_key)
+        if not image_url:
+            return {"error": "Failed to upload image"}
+        if image_r2_key:
+            r2_keys_to_cleanup.append(image_r2_key)
+
+        # Submit job
+        if verbose:
+            print(f"Submitting job (scale={scale}, model={model})...", file=sys.stderr)
+
+        output_key = new_output_key("upscale", f".{output_format}") if r2_config else None
+        job_response = submit_runpod_job(
+            client,
+            image_url=image_url,
+            scale=scale,
+            model=model,
+            face_enhance=face_enhance,
+            output_format=output_format,
+            r2_config=r2_config,
+            output_key=output_key,
+        )
 
-    # Submit job
-    if verbose:
-        print(f"Submitting job (scale={scale}, model={model})...", file=sys.stderr)
-
-    job_response = submit_runpod_job(
-        endpoint_id=endpoint_id,
-        api_key=api_key,
-        image_url=image_url,
-        scale=scale,
-        model=model,
-        face_enhance=face_enhance,
-        output_format=output_format,
-        r2_config=r2_config,
-    )
+        if not job_response:
+            return {"error": "Failed to submit job"}
+
+        job_id = job_response.get("id")
+        if not job_id:
+            return {"error": f"No job ID in response: {job_response}"}
+
+        journal.record(
+            job_id,
+            tool="upscale",
+            endpoint_id=endpoint_id,
+            inputs_hash=inputs_hash,
+            output_path=output_path,
+            r2_keys=r2_keys_to_cleanup,
+            output_key=output_key,
+            params=params,
+        )
 
-    if not job_response:
-        return {"error": "Failed to submit job"}
+        if verbose and job_response.get("status") not in TERMINAL_STATUSES:
+            print(f"Job submitted: {job_id}", file=sys.stderr)
 
-    job_id = job_response.get("id")
-    if not job_id:
-        return {"error": f"No job ID in response: {job_response}"}
+    job_id = job_response["id"]
 
-    if verbose:
-        print(f"Job submitted: {job_id}", file=sys.stderr)
-
-    # Poll for completion
-    result = poll_runpod_job(
-        endpoint_id=endpoint_id,
-        api_key=api_key,
-        job_id=job_id,
-        timeout=timeout,
-        verbose=verbose,
-    )
+    # Poll for completion (no-op if /runsync already returned the result)
+    result = client.wait(job_response, timeout=timeout)
 
     if not result:
-        return {"error": "Job timed out or failed to get status"}
+        return {"error": f"Job {job_id} timed out locally; it may still finish on RunPod. Re-run with --resume to collect it."}
 
     status = result.get("status")
     if status != "COMPLETED":
         error = result.get("error") or result.get("output", {}).get("error") or "Unknown error"
+        journal.update(job_id, status=FAILED, error=str(error))
         return {"error": f"Job failed: {error}"}
 
+    journal.update(job_id, status=COMPLETED)
+
     # Get output from result
     output = result.get("output", {})
     if isinstance(output, dict) and output.get("error"):
         return {"error": output["error"]}
 
     # Download result
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    downloaded = False
-
-    output_r2_key = output.get("r2_key") if isinstance(output, dict) else None
-    output_url = output.get("output_url") if isinstance(output, dict) else None
-
-    if output_r2_key:
-        if verbose:
-            print(f"Downloading result from R2...", file=sys.stderr)
-        downloaded = _download_from_r2(output_r2_key, output_path)
-        if downloaded:
-            r2_keys_to_cleanup.append(output_r2_key)
-            if verbose:
-                size_kb = Path(output_path).stat().st_size // 1024
-                print(f"  Downloaded: {output_path} ({size_kb}KB)", file=sys.stderr)
-
-    if not downloaded and output_url:
-        downloaded = download_from_url(output_url, output_path, verbose=verbose)
-
-    if not downloaded:
+    if not _save_job_output(client, output, output_path, r2_keys_to_cleanup, verbose=verbose):
         return {"error": f"No output_url or r2_key in result: {output}"}
 
-    # Cleanup R2 objects
-    if r2_keys_to_cleanup:
-        for key in r2_keys_to_cleanup:
-            _delete_from_r2(key)
+    journal.update(job_id, status=COLLECTED)
+
+    # Cleanup R2 objects (in the background)
+    delete_objects(r2_keys_to_cleanup)
 
     elapsed = time.time() - start_time
 
@@ -473,10 +338,134 @@ def process_with_runpod(
         "output": output_path,
         "job_id": job_id,
         "processing_time_seconds": round(elapsed, 2),
+        "timings": client.timings,
         "runpod_output": output,
     }
 
 
+def process_batch_with_runpod(
+    input_paths: list[str],
+    output_dir: str,
+    scale: int = 4,
+    model: str = "general",
+    face_enhance: bool = False,
+    output_format: str = "png",
+    timeout: int = 300,
+    verbose: bool = True,
+    max_in_flight: int | None = None,
+    resume: bool = False,
+) -> dict:
+    """Upscale many images with several RunPod jobs in flight at once.
+
+    Each image is uploaded only when a job slot frees up, and results are
+    downloaded as they complete. Outputs are written to
+    ``output_dir/<stem>_<scale>x.<format>``. Jobs are journalled, and with
+    ``resume`` images whose earlier job is still in the journal are collected
+    from it instead of being uploaded and submitted again.
+    """
+    start_time = time.time()
+    r2_keys_to_cleanup = []
+
+    config = get_runpod_config()
+    api_key = config.get("api_key")
+    endpoint_id = config.get("endpoint_id")
+
+    if not api_key:
+        return {"error": "RUNPOD_API_KEY not set. Add to .env file."}
+    if not endpoint_id:
+        return {"error": "RUNPOD_UPSCALE_ENDPOINT_ID not set. Run with --setup first."}
+
+    sys.path.insert(0, str(Path(__file__).parent))
+    try:
+        from config import get_r2_config
+        r2_config = get_r2_config()
+    except ImportError:
+        r2_config = None
+
+    client = RunPodClient(endpoint_id, api_key, verbose=verbose)
+    scheduler = JobScheduler(client, max_in_flight=max_in_flight, timeout=timeout)
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    journal = JobJournal()
+    params = {"scale": scale, "model": model, "face_enhance": face_enhance, "output_format": output_format}
+    outputs = []
+    failed = []
+    submitted: dict[str, dict] = {}  # input path -> what journal.record needs
+    job_ids: dict[str, str] = {}
+    job_keys: dict[str, list] = {}  # input path -> the R2 inputs of its job
+    still_running: set[str] = set()  # inputs of jobs left running on RunPod
+
+    def output_path_for(input_path: str) -> str:
+        return str(Path(output_dir) / f"{Path(input_path).stem}_{scale}x.{output_format}")
+
+    def jobs():
+        for input_path in input_paths:
+            inputs_hash = hash_inputs([input_path], params)
+            if resume:
+                reattached = reattach_job(client, journal, "upscale", inputs_hash, object_metadata, verbose)
+                if reattached:
+                    entry, job = reattached
+                    job_keys[input_path] = entry.get("r2_keys", [])
+                    r2_keys_to_cleanup.extend(job_keys[input_path])
+                    job_ids[input_path] = job["id"]
+                    yield input_path, None, None, job
+                    continue
+
+            image_url, image_r2_key = upload_to_storage(input_path, api_key)
+            if not image_url:
+                failed.append({"input": input_path, "error": "Failed to upload image"})
+                continue
+            job_keys[input_path] = [image_r2_key] if image_r2_key else []
+            r2_keys_to_cleanup.extend(job_keys[input_path])
+            output_key = new_output_key("upscale", f".{output_format}") if r2_config else None
+            submitted[input_path] = {
+                "inputs_hash": inputs_hash,
+                "output_key": output_key,
+                "r2_keys": job_keys[input_path],
+            }
+            payload = build_job_payload(image_url, scale, model, face_enhance, output_format, r2_config, output_key)
+            yield input_path, payload
+
+    def record(input_path: str, job: dict) -> None:
+        job_ids[input_path] = job["id"]
+        journal.record(
+            job["id"],
+            tool="upscale",
+            endpoint_id=endpoint_id,
+            output_path=output_path_for(input_path),
+            params=params,
+            **submitted[input_path],
+        )
+
+    for input_path, result in scheduler.run(jobs(), on_submit=record):
+        output = result.get("output", {}) if result else {}
+        output_path = output_path_for(input_path)
+        error = None
+        if result and result.get("status") == LOCAL_TIMEOUT:
+            still_running.update(job_keys.get(input_path, []))
+            error = f"Job {result['id']} timed out locally; it may still finish on RunPod. Re-run with --resume to collect it."
+        elif not result or result.get("status") != "COMPLETED" or output.get("error"):
+            error = output.get("error") or (result or {}).get("error") or (f"Job {result['status']}" if result else "Job failed to submit")
+        elif _save_job_output(client, output, output_path, r2_keys_to_cleanup, verbose=verbose):
+            outputs.append({"input": input_path, "output": output_path, "job_id": result.get("id")})
+        else:
+            error = f"No output_url or r2_key in result: {output}"
+
+        if error:
+            failed.append({"input": input_path, "error": error})
+        if input_path in job_ids:
+            journal.settle(job_ids[input_path], result, error is None, error)
+
+    delete_objects([key for key in r2_keys_to_cleanup if key not in still_running])
+
+    return {
+        "success": not failed,
+        "outputs": outputs,
+        "failed": failed,
+        "processing_time_seconds": round(time.time() - start_time, 2),
+    }
+
+
 # =============================================================================
 # RunPod Setup (GraphQL API)
 # =============================================================================
@@ -802,6 +791,9 @@ Examples:
   # With face enhancement
   python tools/upscale.py --input portrait.jpg --output portrait_4x.png --face-enhance --runpod
 
+  # Batch: every image in a folder, several jobs in parallel
+  python tools/upscale.py --input-dir ./frames --output-dir ./frames_4x --runpod
+
   # Setup RunPod endpoint (first-time)
   python tools/upscale.py --setup
         """,
@@ -817,6 +809,21 @@ Examples:
         type=str,
         help="Output image file path",
     )
+    parser.add_argument(
+        "--input-dir",
+        type=str,
+        help="Directory of images to upscale in one batch (use with --output-dir)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        help="Output directory for --input-dir (default: <input-dir>_upscaled)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Max parallel RunPod jobs for --input-dir (default: endpoint's max workers)",
+    )
     parser.add_argument(
         "--scale", "-s",
         type=int,
@@ -856,6 +863,11 @@ Examples:
         default=300,
         help="RunPod job timeout in seconds (default: 300)",
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Collect an earlier RunPod job for the same image instead of resubmitting (see tools/job_journal.py)",
+    )
     parser.add_argument(
         "--setup",
         action="store_true",
@@ -897,6 +909,53 @@ def main():
             sys.exit(1)
         sys.exit(0)
 
+    # Batch mode
+    if args.input_dir:
+        input_dir = Path(args.input_dir)
+        if not input_dir.is_dir():
+            print(f"Error: Input directory not found: {args.input_dir}", file=sys.stderr)
+            sys.exit(1)
+        if not args.runpod:
+            print("Error: --input-dir requires --runpod", file=sys.stderr)
+            sys.exit(1)
+
+        extensions = {".jpg", ".jpeg", ".png", ".webp"}
+        input_paths = sorted(str(f) for f in input_dir.iterdir() if f.suffix.lower() in extensions)
+        if not input_paths:
+            print(f"Error: No images found in {args.input_dir}", file=sys.stderr)
+            sys.exit(1)
+
+        output_dir = args.output_dir or f"{args.input_dir.rstrip('/')}_upscaled"
+        if verbose:
+            print(f"Upscaling {len(input_paths)} images with RunPod cloud GPU...")
+
+        result = process_batch_with_runpod(
+            input_paths=input_paths,
+            output_dir=output_dir,
+            scale=args.scale,
+            model=args.model,
+            face_enhance=args.face_enhance,
+            output_format=args.format,
+            timeout=args.runpod_timeout,
+            verbose=verbose,
+            max_in_flight=args.concurrency,
+            resume=args.resume,
+        )
+
+        if args.json:
+            print(json.dumps(result, indent=2))
+        elif "error" in result:
+            print(f"Error: {result['error']}", file=sys.stderr)
+        else:
+            print(f"Upscaled {len(result['outputs'])}/{len(input_paths)} images to {output_dir}")
+            for failure in result["failed"]:
+                print(f"  Failed: {failure['input']}: {failure['error']}")
+            print(f"  Processing time: {result['processing_time_seconds']:.1f}s")
+
+        if not result.get("success"):
+            sys.exit(1)
+        return
+
     # Validate required arguments
     if not args.input:
         print("Error: --input is required", file=sys.stderr)
@@ -947,6 +1006,7 @@ def main():
             output_format=args.format,
             timeout=args.runpod_timeout,
             verbose=verbose,
+            resume=args.resume,
         )
 
         if result.get("error"):
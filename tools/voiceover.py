@@ -198,6 +198,16 @@ Examples:
         type=float,
         help="Qwen3-TTS nucleus sampling (default: model default ~0.8, range: 0.1-1.0)",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Qwen3-TTS max scenes in flight with --scene-dir (default: endpoint's max workers)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Qwen3-TTS: collect earlier unfinished jobs for the same text and settings instead of resubmitting",
+    )
 
     # Brand integration
     parser.add_argument(
@@ -311,6 +321,7 @@ def generate_single_audio_qwen3(
     ref_text: str | None = None,
     temperature: float | None = None,
     top_p: float | None = None,
+    resume: bool = False,
 ) -> dict:
     """Generate a single audio file from script text using Qwen3-TTS. Returns result dict."""
     from qwen3_tts import generate_audio
@@ -328,6 +339,7 @@ def generate_single_audio_qwen3(
         verbose=False,
         temperature=temperature,
         top_p=top_p,
+        resume=resume,
     )
 
 
@@ -353,18 +365,25 @@ def process_scene_directory(
     ref_text: str | None = None,
     temperature: float | None = None,
     top_p: float | None = None,
+    max_in_flight: int | None = None,
+    resume: bool = False,
 ) -> list[dict]:
-    """Process all .txt files in directory, generate .mp3 for each."""
+    """Process all .txt files in directory, generate .mp3 for each.
+
+    Qwen3 scenes run as concurrent RunPod jobs (up to ``max_in_flight``);
+    ElevenLabs scenes are generated one at a time.
+    """
     txt_files = sorted(scene_dir.glob("*.txt"))
 
     if not txt_files:
         print(f"Error: No .txt files found in {scene_dir}", file=sys.stderr)
         sys.exit(1)
 
-    results = []
     total_duration = 0.0
     total_chars = 0
 
+    # Parse every scene first so qwen3 jobs can be fanned out together
+    scenes = []
     for txt_file in txt_files:
         mp3_file = txt_file.with_suffix(".mp3")
         script = txt_file.read_text().strip()
@@ -390,8 +409,14 @@ def process_scene_directory(
                 script = script.split("\n", 1)[1].strip() if "\n" in script else ""
 
         total_chars += len(script)
+        scenes.append({"txt_file": txt_file, "mp3_file": mp3_file, "script": script, "instruct": scene_instruct})
 
-        if dry_run:
+    if dry_run:
+        results = []
+        for scene in scenes:
+            txt_file, mp3_file, script, scene_instruct = (
+                scene["txt_file"], scene["mp3_file"], scene["script"], scene["instruct"]
+            )
             scene_result = {
                 "dry_run": True,
                 "script": str(txt_file),
@@ -404,27 +429,46 @@ def process_scene_directory(
             if not json_output:
                 tone_note = f" [instruct: {scene_instruct}]" if scene_instruct != instruct else ""
                 print(f"  {txt_file.name} → {mp3_file.name} ({len(script)} chars){tone_note}")
-        else:
-            if not json_output:
-                print(f"Generating {mp3_file.name}...", file=sys.stderr)
-
-            if provider == "qwen3":
-                result = generate_single_audio_qwen3(
-                    script=script,
-                    output_path=mp3_file,
-                    speaker=speaker,
-                    language=language,
-                    instruct=scene_instruct,
-                    ref_audio=ref_audio,
-                    ref_text=ref_text,
-                    temperature=temperature,
-                    top_p=top_p,
-                )
-            else:
-                result = generate_single_audio(
+        return results, total_duration, total_chars
+
+    results = [None] * len(scenes)
+
+    if provider == "qwen3":
+        # All scenes go to RunPod at once (up to the endpoint's worker limit);
+        # each is reported as soon as its job finishes
+        from qwen3_tts import generate_audio_batch
+
+        if not json_output:
+            print(f"Submitting {len(scenes)} scenes to Qwen3-TTS...", file=sys.stderr)
+
+        items = [
+            {"text": scene["script"], "output_path": scene["mp3_file"], "instruct": scene["instruct"]}
+            for scene in scenes
+        ]
+        for scene in scenes:
+            scene["mp3_file"].parent.mkdir(parents=True, exist_ok=True)
+
+        generated = generate_audio_batch(
+            items,
+            speaker=speaker,
+            language=language,
+            ref_audio=ref_audio,
+            ref_text=ref_text,
+            verbose=False,
+            temperature=temperature,
+            top_p=top_p,
+            max_in_flight=max_in_flight,
+            resume=resume,
+        )
+    else:
+        def generate_sequentially():
+            for index, scene in enumerate(scenes):
+                if not json_output:
+                    print(f"Generating {scene['mp3_file'].name}...", file=sys.stderr)
+                yield index, generate_single_audio(
                     client=client,
-                    script=script,
-                    output_path=mp3_file,
+                    script=scene["script"],
+                    output_path=scene["mp3_file"],
                     voice_id=voice_id,
                     model=model,
                     stability=stability,
@@ -432,15 +476,23 @@ def process_scene_directory(
                     style=style,
                     speed=speed,
                 )
-            result["script"] = str(txt_file)
-            results.append(result)
 
-            if result.get("duration_seconds"):
-                total_duration += result["duration_seconds"]
+        generated = generate_sequentially()
 
-            if not json_output:
+    for index, result in generated:
+        scene = scenes[index]
+        result["script"] = str(scene["txt_file"])
+        results[index] = result
+
+        if result.get("duration_seconds"):
+            total_duration += result["duration_seconds"]
+
+        if not json_output:
+            if result.get("success", True) and not result.get("error"):
                 duration_str = f" ({result.get('duration_seconds', '?')}s)"
-                print(f"  {mp3_file.name}{duration_str}", file=sys.stderr)
+                print(f"  {scene['mp3_file'].name}{duration_str}", file=sys.stderr)
+            else:
+                print(f"  {scene['mp3_file'].name}: {result.get('error')}", file=sys.stderr)
 
     return results, total_duration, total_chars
 
@@ -684,6 +736,8 @@ def main():
             ref_text=args.ref_text,
             temperature=args.temperature,
             top_p=args.top_p,
+            max_in_flight=args.concurrency,
+            resume=args.resume,
         )
 
         # Build final result
@@ -785,6 +839,7 @@ def main():
             ref_text=args.ref_text,
             temperature=args.temperature,
             top_p=args.top_p,
+            resume=args.resume,
         )
     else:
         result = generate_single_audio(